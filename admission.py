@@ -0,0 +1,327 @@
+"""
+Admission control and load shedding for the upload endpoints.
+
+Bursts of uploads (storms, flooding) used to queue inside the server until
+every request was slow. Requests to the classification endpoints now pass
+three checks before their body is read:
+
+  1. a per-client token bucket (CIVIC_CLIENT_RATE per second, bursts of
+     CIVIC_CLIENT_BURST); empty bucket -> 429 with Retry-After
+  2. a global limit on requests being processed (CIVIC_MAX_CONCURRENT);
+     when full, requests wait in a priority queue, full submissions ahead
+     of previews
+  3. queue-time shedding: a request that cannot start within its class's
+     wait budget, or arrives when the queue is full, gets 503 with
+     Retry-After instead of adding to the backlog
+
+Quick-classify previews are shed first: they may only use
+CIVIC_PREVIEW_SHARE of the concurrency limit, have a much shorter wait
+budget, and are turned away at once while submissions are waiting.
+
+A request holds its slot until its response body has been sent, so a
+streamed /api/batch-submit counts for as long as it is producing
+reports. Batches are also capped at CIVIC_MAX_CONCURRENT_BATCHES at a
+time, and each is charged one token per file (`charge`); the client's
+bucket may go negative, which delays its next requests until repaid.
+
+All limits are per server. A worker of a multi-worker server enforces
+its share, the configured value divided by the live worker count
+(`share_limits`, kept current by cluster.py), so the server as a whole
+admits what is configured. Client buckets are split the same way: a
+client whose connections all land on one worker gets that worker's share
+of its rate.
+
+Shed counts, waits, in-flight and queued requests are exported through
+METRICS; /api/admission returns the same as JSON.
+"""
+
+from collections import OrderedDict
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+
+from observability import METRICS, logger
+
+
+ADMISSION_ENABLED = os.environ.get("CIVIC_ADMISSION", "on").lower() not in ("0", "off", "false", "no")
+
+CLIENT_RATE = float(os.environ.get("CIVIC_CLIENT_RATE", 2.0))
+CLIENT_BURST = float(os.environ.get("CIVIC_CLIENT_BURST", 20))
+MAX_CLIENTS = int(os.environ.get("CIVIC_MAX_TRACKED_CLIENTS", 50000))
+CLIENT_ID_HEADER = os.environ.get("CIVIC_CLIENT_ID_HEADER", "").lower()  # e.g. x-forwarded-for behind a proxy
+
+MAX_CONCURRENT = int(os.environ.get("CIVIC_MAX_CONCURRENT", 2 * (os.cpu_count() or 1) + 4))
+PREVIEW_SHARE = float(os.environ.get("CIVIC_PREVIEW_SHARE", 0.5))
+MAX_QUEUED = int(os.environ.get("CIVIC_MAX_QUEUED", 100))
+REPORT_MAX_WAIT = float(os.environ.get("CIVIC_REPORT_MAX_WAIT_MS", 3000)) / 1000
+PREVIEW_MAX_WAIT = float(os.environ.get("CIVIC_PREVIEW_MAX_WAIT_MS", 250)) / 1000
+SHED_RETRY_AFTER = int(os.environ.get("CIVIC_SHED_RETRY_AFTER", 5))
+MAX_CONCURRENT_BATCHES = int(os.environ.get("CIVIC_MAX_CONCURRENT_BATCHES", max(1, MAX_CONCURRENT // 4)))
+
+# Request classes, most important first (lower rank is served first)
+REPORT = "report"
+PREVIEW = "preview"
+CLASS_RANK = {REPORT: 0, PREVIEW: 1}
+
+ROUTE_CLASSES = {
+    "/api/submit-report": REPORT,
+    "/api/batch-submit": REPORT,
+    "/api/get-complaint": REPORT,
+    "/api/quick-classify": PREVIEW,
+}
+# Requests carrying many uploads each (capped separately, charged per file)
+BATCH_ROUTES = {"/api/batch-submit"}
+
+
+class Rejected(Exception):
+    """Request turned away: HTTP status, reason label and Retry-After seconds"""
+
+    def __init__(self, status_code, reason, retry_after):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBuckets:
+    """
+    Per-client token buckets, refilled lazily on each take(). The least
+    recently seen clients are dropped beyond `max_clients`.
+    """
+
+    def __init__(self, rate=CLIENT_RATE, burst=CLIENT_BURST, max_clients=MAX_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _refilled_locked(self, client, now):
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = [self.burst, now]
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        return bucket
+
+    def take(self, client, cost=1.0, now=None):
+        """Returns 0 if admitted, else seconds until `cost` tokens are available"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._refilled_locked(client, now)
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return 0.0
+            return (cost - bucket[0]) / self.rate if self.rate > 0 else float(SHED_RETRY_AFTER)
+
+    def charge(self, client, cost, now=None):
+        """Takes `cost` tokens unconditionally; the balance may go negative"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._refilled_locked(client, now)
+            bucket[0] -= cost
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class ConcurrencyLimiter:
+    """
+    Global in-flight limit with a priority wait queue (event-loop side).
+    Previews only start while fewer than `preview_limit` requests run.
+    """
+
+    def __init__(self, limit=MAX_CONCURRENT, preview_share=PREVIEW_SHARE, max_queued=MAX_QUEUED,
+                 max_wait=None):
+        self.limit = limit
+        self.preview_limit = max(1, int(limit * preview_share))
+        self.max_queued = max_queued
+        self.max_wait = max_wait or {REPORT: REPORT_MAX_WAIT, PREVIEW: PREVIEW_MAX_WAIT}
+        self.in_flight = 0
+        self._waiters = []  # heap of (rank, enqueued_at, seq, class, future)
+        self._sequence = itertools.count()
+
+    def _capacity(self, request_class):
+        return self.limit if request_class == REPORT else self.preview_limit
+
+    def queued(self, max_rank=None):
+        if max_rank is None:
+            return len(self._waiters)
+        return sum(1 for waiter in self._waiters if waiter[0] <= max_rank)
+
+    def oldest_wait(self, now=None):
+        if not self._waiters:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        return now - min(waiter[1] for waiter in self._waiters)
+
+    async def acquire(self, request_class):
+        """Waits for a slot; returns seconds waited or raises Rejected"""
+        rank = CLASS_RANK[request_class]
+        # Free slot and nobody of equal or higher importance waiting
+        if self.in_flight < self._capacity(request_class) and not self.queued(rank):
+            self.in_flight += 1
+            return 0.0
+
+        max_wait = self.max_wait[request_class]
+        if request_class == PREVIEW and (self.queued(CLASS_RANK[REPORT]) or self.oldest_wait() > max_wait):
+            # Submissions are backed up: previews are the first to go
+            raise Rejected(503, "overloaded", SHED_RETRY_AFTER)
+        if len(self._waiters) >= self.max_queued:
+            raise Rejected(503, "queue_full", SHED_RETRY_AFTER)
+
+        start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        entry = (rank, start, next(self._sequence), request_class, future)
+        heapq.heappush(self._waiters, entry)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done():
+                # Granted a slot as the wait ended: pass it on
+                self.release()
+            else:
+                future.cancel()
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise Rejected(503, "queue_timeout", max(max_wait, SHED_RETRY_AFTER)) from None
+        return time.monotonic() - start
+
+    def release(self):
+        self.in_flight -= 1
+        # Grant free slots, most important and oldest first. The heap head is
+        # the best candidate, so once it does not fit nothing behind it does.
+        while self._waiters and self.in_flight < self._capacity(self._waiters[0][3]):
+            future = heapq.heappop(self._waiters)[4]
+            self.in_flight += 1
+            future.set_result(None)
+
+
+class AdmissionController:
+    """Token buckets, the concurrency limiter and the batch cap, with metrics"""
+
+    def __init__(self, buckets=None, limiter=None, enabled=ADMISSION_ENABLED,
+                 max_batches=MAX_CONCURRENT_BATCHES):
+        # `is None`: an empty TokenBuckets is falsy (__len__)
+        self.buckets = TokenBuckets() if buckets is None else buckets
+        self.limiter = ConcurrencyLimiter() if limiter is None else limiter
+        self.enabled = enabled
+        self.max_batches = max_batches
+        self.batches = 0
+        self.workers = 1
+        self._configured = (self.buckets.rate, self.buckets.burst, self.limiter.limit,
+                            self.limiter.max_queued, max_batches)
+        self._preview_share = self.limiter.preview_limit / max(self.limiter.limit, 1)
+
+    def share_limits(self, workers):
+        """Enforces 1/`workers` of the configured limits (multi-worker servers)"""
+        workers = max(1, workers)
+        rate, burst, limit, max_queued, max_batches = self._configured
+        self.workers = workers
+        self.buckets.rate = rate / workers
+        self.buckets.burst = max(1.0, burst / workers)
+        self.limiter.limit = max(1, math.ceil(limit / workers))
+        self.limiter.preview_limit = max(1, int(self.limiter.limit * self._preview_share))
+        self.limiter.max_queued = max(1, math.ceil(max_queued / workers))
+        self.max_batches = max(1, math.ceil(max_batches / workers))
+        self._update_gauges()
+
+    @staticmethod
+    def request_class(path):
+        return ROUTE_CLASSES.get(path)
+
+    @staticmethod
+    def is_batch(path):
+        return path in BATCH_ROUTES
+
+    @staticmethod
+    def client_id(headers, client):
+        if CLIENT_ID_HEADER:
+            forwarded = headers.get(CLIENT_ID_HEADER)
+            if forwarded:
+                return forwarded.split(",")[0].strip()
+        return client.host if client else "unknown"
+
+    async def admit(self, request_class, client, batch=False):
+        """Raises Rejected, or returns once a slot is held (call release(batch))"""
+        retry_after = self.buckets.take(client)
+        if retry_after:
+            self._shed(request_class, Rejected(429, "rate_limited", retry_after))
+        if batch:
+            if self.batches >= self.max_batches:
+                self._shed(request_class, Rejected(503, "batch_limit", SHED_RETRY_AFTER))
+            self.batches += 1
+        try:
+            waited = await self.limiter.acquire(request_class)
+        except BaseException as e:
+            if batch:
+                self.batches -= 1
+            if isinstance(e, Rejected):
+                self._shed(request_class, e)
+            raise
+        METRICS.observe("civic_admission_wait_seconds", waited, request_class=request_class)
+        self._update_gauges()
+
+    def release(self, batch=False):
+        if batch:
+            self.batches -= 1
+        self.limiter.release()
+        self._update_gauges()
+
+    def charge(self, client, cost):
+        """Charges an admitted request's extra work (batch files beyond the first)"""
+        if cost > 0:
+            self.buckets.charge(client, cost)
+            METRICS.inc("civic_admission_charged_tokens_total", cost)
+
+    def _shed(self, request_class, rejection):
+        METRICS.inc("civic_admission_shed_total", request_class=request_class, reason=rejection.reason)
+        self._update_gauges()
+        logger.debug("Request shed", extra={"request_class": request_class, "reason": rejection.reason})
+        raise rejection
+
+    def _update_gauges(self):
+        METRICS.set_gauge("civic_admission_in_flight", self.limiter.in_flight)
+        METRICS.set_gauge("civic_admission_queued", self.limiter.queued())
+        METRICS.set_gauge("civic_admission_batches_in_flight", self.batches)
+
+    def snapshot(self):
+        limiter = self.limiter
+        return {
+            "enabled": self.enabled,
+            "in_flight": limiter.in_flight,
+            "batches_in_flight": self.batches,
+            "queued": limiter.queued(),
+            "oldest_wait_s": round(limiter.oldest_wait(), 3),
+            "tracked_clients": len(self.buckets),
+            "workers": self.workers,
+            "limits": {
+                "max_concurrent": limiter.limit,
+                "preview_concurrent": limiter.preview_limit,
+                "max_concurrent_batches": self.max_batches,
+                "max_queued": limiter.max_queued,
+                "max_wait_s": limiter.max_wait,
+                "client_rate_per_s": self.buckets.rate,
+                "client_burst": self.buckets.burst,
+            },
+            "shed": {
+                f"{request_class}/{reason}": METRICS.counter_value(
+                    "civic_admission_shed_total", request_class=request_class, reason=reason
+                )
+                for request_class in CLASS_RANK
+                for reason in ("rate_limited", "overloaded", "queue_full", "queue_timeout", "batch_limit")
+            },
+        }
+
+
+ADMISSION = AdmissionController()
@@ -3,24 +3,376 @@ FastAPI Backend Integration Example
 Connect civic_issue_reporter.py with your React frontend
 """
 
-from fastapi import FastAPI, File, UploadFile, Form
+from fastapi import Depends, FastAPI, File, UploadFile, Form, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import shutil
+from fastapi import Request
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
+from sqlalchemy.orm import Session
+from typing import List
+import asyncio
+import hmac
 import os
+import re
+import time
 from pathlib import Path
 
 # Import your AI logic
 from civic_issue_reporter import (
-    get_report_json,
+    build_report,
     get_complaint_text,
     quick_classify,
-    process_civic_report
+    process_civic_report,
+    generate_report_id,
+    parse_report_fields
 )
+from uploads import (
+    CONTENT_STORE,
+    UPLOAD_DIR,
+    UploadTooLarge,
+    classify_upload,
+    classify_upload_async,
+    ingest_upload
+)
+from preprocessing import PREPROCESSOR, thumbnail_path_for
+from inference import CLASSIFIER
+from database import THREADPOOL_SIZE, Base, SessionLocal, engine, get_session
+from persistence import REPORT_WRITER, ReportConfirmation
+from dedupe import DUPLICATE_INDEX
+from observability import METRICS, configure_logging, logger
+from admission import ADMISSION, Rejected
+from responses import JSONResponse, compress_body, negotiate_encoding, should_compress
+from spatial import MAX_RESULTS, ensure_spatial_index, find_in_bbox, find_nearby
+from listing import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, list_complaints
+from search import DEFAULT_LIMIT, MAX_LIMIT, MAX_OFFSET, ensure_search_index, search_complaints
+from stats import RELOAD_INTERVAL, STATS
+from dispatch import DISPATCH_QUEUE, MAX_LISTED, REFRESH_INTERVAL
+from cluster import CLUSTER, clustered
+from wards import WARDS
+from events import (
+    EVENT_BUS,
+    MAX_TOPICS,
+    SSE_MEDIA_TYPE,
+    department_topic,
+    report_topic
+)
+from export import export_chunks, export_filename, export_media_type, parse_date
+from batch import (
+    BATCH_EXECUTOR,
+    BATCH_MAX_FILES,
+    BATCH_WORKERS,
+    NDJSON_MEDIA_TYPE,
+    parse_batch_metadata,
+    stream_results
+)
+
+configure_logging()
+
+app = FastAPI(title="AI Civic Issue Reporting API", default_response_class=JSONResponse)
+
+# Create uploads directory
+UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+
+SHA256_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+# Required in X-Admin-Token by /api/admin/*; unset, only local clients may call them
+ADMIN_TOKEN = os.environ.get("CIVIC_ADMIN_TOKEN")
+LOCAL_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+
+def upload_too_large_response(error):
+    """413 response for uploads over the configured size limit"""
+    return JSONResponse(
+        status_code=413,
+        content={"success": False, "error": str(error)}
+    )
+
+
+def duplicate_report_data(duplicate_of, image_filename, classification, location):
+    """Response payload when a submission confirms an existing open report"""
+    result = quick_classify(image_filename, classification)
+    return {
+        "report_id": duplicate_of,
+        "duplicate_of": duplicate_of,
+        "image": image_filename,
+        "issue": {
+            "type": result["issue_type"],
+            "category": classification[2],
+            "confidence": result["confidence"],
+            "severity": result["severity"],
+            "priority": result["priority"]
+        },
+        "location": location,
+        "resolution_timeline": result["timeline"],
+        "user_feedback": {
+            "message": f"👍 This {result['issue_type']} has already been reported nearby. Your confirmation was added.",
+            "action": "Confirmations help authorities prioritize the existing report.",
+            "emoji": "👍"
+        },
+        "complaint": None
+    }
+
+
+async def analyze_upload(upload):
+    """
+    Classification and image preprocessing (EXIF GPS, thumbnail).
+    Pixel backends are handed the tensor from the same decode, so the image
+    is decoded once; otherwise both run concurrently.
+    Returns (classification, PreprocessResult or None).
+    """
+    if CLASSIFIER.uses_pixels:
+        preprocessed = await PREPROCESSOR.preprocess(upload, want_tensor=True)
+        tensor = preprocessed.tensor if preprocessed is not None else None
+        return await classify_upload_async(upload, tensor), preprocessed
+    return await asyncio.gather(
+        classify_upload_async(upload),
+        PREPROCESSOR.preprocess(upload)
+    )
+
+
+def photo_coordinates(latitude, longitude, preprocessed):
+    """Form coordinates, or the photo's EXIF GPS when the form has none"""
+    if latitude and longitude:
+        return latitude, longitude
+    if preprocessed is not None and preprocessed.gps:
+        METRICS.inc("civic_exif_locations_total")
+        return preprocessed.gps
+    return latitude, longitude
+
+
+def attach_thumbnail(content, upload, preprocessed):
+    if preprocessed is not None and preprocessed.thumbnail_path:
+        content["thumbnail"] = f"/api/thumbnails/{upload.sha256}"
+    return content
+
+
+def prepare_submission(upload, latitude=None, longitude=None, address=None, fields=None,
+                       classification=None):
+    """
+    Classifies one ingested upload (unless `classification` is given),
+    attaches it to a nearby open duplicate if there is one, and otherwise
+    builds its report. Synchronous and safe to run on worker threads.
+    Returns (item for REPORT_WRITER, response content dict).
+    """
+    # Prepare location data if provided
+    location = None
+    if latitude and longitude:
+        location = {
+            "lat": latitude,
+            "lng": longitude,
+            "address": address or "Location captured",
+            "ward": WARDS.resolve(latitude, longitude),
+            "accuracy": "±10 meters"
+        }
+    
+    classification = classification or classify_upload(upload)
+    
+    # Attach near-duplicates of an open report as confirmations
+    report_id = generate_report_id()
+    if location:
+        duplicate_of = DUPLICATE_INDEX.check_or_add(
+            report_id, classification[0], latitude, longitude
+        )
+        if duplicate_of:
+            METRICS.inc("civic_duplicate_reports_total")
+            logger.info("Duplicate report recorded as confirmation", extra={"report_id": duplicate_of})
+            return ReportConfirmation(duplicate_of), {
+                "success": True,
+                "duplicate": True,
+                "data": duplicate_report_data(duplicate_of, upload.filename, classification, location)
+            }
+    
+    # Build report (complaint text is rendered lazily)
+    report = build_report(upload.filename, location, classification, report_id)
+    
+    logger.info(
+        "Report generated",
+        extra={"report_id": report.report_id, "issue_type": report.issue_type, "priority": report.priority}
+    )
+    return report, {
+        "success": True,
+        "data": report.to_dict(fields)
+    }
+
+
+@app.on_event("startup")
+def start_persistence():
+    """Create tables and start the write-behind report flusher"""
+    Base.metadata.create_all(bind=engine)
+    ensure_spatial_index(engine)
+    ensure_search_index(engine)
+    session = SessionLocal()
+    try:
+        loaded = DUPLICATE_INDEX.warm_start(session)
+        STATS.warm_start(session)
+        queued = DISPATCH_QUEUE.warm_start(session)
+    finally:
+        session.close()
+    logger.info("Duplicate index warmed", extra={"open_reports": loaded})
+    logger.info("Dispatch queues loaded", extra={"queued_tasks": queued})
+    REPORT_WRITER.start()
+    CLASSIFIER.start()
+    PREPROCESSOR.start()
+    if clustered():
+        # One of several forked workers (server.py): share metrics and events,
+        # and pick up the other workers' stats and dispatch changes
+        CLUSTER.start()
+        CLUSTER.on_control("reload", lambda _data: reload_cached_state())
+        # Mirror open reports between the workers' duplicate indexes
+        DUPLICATE_INDEX.relay = lambda action, data: CLUSTER.send_control(f"dedupe-{action}", data)
+        CLUSTER.on_control("dedupe-add", lambda entry: DUPLICATE_INDEX.add(*entry), inline=True)
+        CLUSTER.on_control("dedupe-remove", lambda report_id: DUPLICATE_INDEX.remove(report_id, relay=False),
+                           inline=True)
+        # Admission limits are per server: enforce this worker's share
+        CLUSTER.on_resize(ADMISSION.share_limits)
+        STATS.reload_interval = RELOAD_INTERVAL
+        DISPATCH_QUEUE.refresh_interval = REFRESH_INTERVAL
+
+
+def reload_cached_state():
+    """
+    Rebuilds the dispatch heaps and open-complaint counters from their
+    tables, after an offline job (rescore.py) rewrote them.
+    Returns (queued tasks, stats rows).
+    """
+    DISPATCH_QUEUE.refresh(full=True)
+    session = SessionLocal()
+    try:
+        stats_rows = STATS.load(session)
+    finally:
+        session.close()
+    queued = sum(DISPATCH_QUEUE.depth(department) for department in DISPATCH_QUEUE.departments())
+    logger.info("Cached state reloaded", extra={"queued_tasks": queued, "stats_rows": stats_rows})
+    return queued, stats_rows
+
+
+@app.on_event("startup")
+async def start_events():
+    """Publishers on worker threads hand events to this loop"""
+    EVENT_BUS.bind(asyncio.get_running_loop())
+
+
+@app.on_event("startup")
+async def size_threadpool():
+    """Sync DB endpoints run on this threadpool; the DB pool is sized to match"""
+    import anyio.to_thread
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
 
-app = FastAPI(title="AI Civic Issue Reporting API")
+@app.on_event("shutdown")
+def stop_persistence():
+    """Flush queued reports before the process exits"""
+    PREPROCESSOR.stop()
+    CLASSIFIER.stop()
+    REPORT_WRITER.stop()
+    CLUSTER.stop()
 
-# Enable CORS for React frontend
+
+@app.on_event("shutdown")
+async def close_event_streams():
+    """End open SSE streams so shutdown doesn't wait on idle clients"""
+    EVENT_BUS.close()
+
+
+@app.on_event("shutdown")
+def close_database():
+    """Release pooled database connections"""
+    engine.dispose()
+
+
+@app.middleware("http")
+async def compress_responses(request: Request, call_next):
+    """
+    gzip/brotli for complete JSON and text bodies over the size threshold,
+    negotiated from Accept-Encoding (see responses.py)
+    """
+    response = await call_next(request)
+    if request.method == "HEAD" or not should_compress(response.headers):
+        return response
+    response.headers.add_vary_header("Accept-Encoding")
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    if encoding is None:
+        return response
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    compressed = compress_body(body, encoding)
+    METRICS.inc("civic_compression_input_bytes_total", len(body), encoding=encoding)
+    METRICS.inc("civic_compression_output_bytes_total", len(compressed), encoding=encoding)
+
+    async def compressed_body():
+        yield compressed
+
+    response.body_iterator = compressed_body()
+    response.headers["content-encoding"] = encoding
+    response.headers["content-length"] = str(len(compressed))
+    etag = response.headers.get("etag")
+    if etag and not etag.startswith("W/"):
+        # Same content, different bytes: the validator is only weakly equal
+        response.headers["etag"] = "W/" + etag
+    return response
+
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """
+    Sheds upload traffic before the body is read (see admission.py):
+    429 when a client exceeds its rate, 503 when the server is saturated.
+    """
+    request_class = ADMISSION.request_class(request.url.path)
+    if request_class is None or request.method != "POST" or not ADMISSION.enabled:
+        return await call_next(request)
+    batch = ADMISSION.is_batch(request.url.path)
+    try:
+        await ADMISSION.admit(request_class, ADMISSION.client_id(request.headers, request.client), batch)
+    except Rejected as rejection:
+        error = "Too many requests, please retry later" if rejection.status_code == 429 else \
+            "Server is busy, please retry later"
+        return JSONResponse(
+            status_code=rejection.status_code,
+            content={"success": False, "error": error, "reason": rejection.reason},
+            headers={"Retry-After": str(rejection.retry_after)}
+        )
+    # The slot is held until the response body has been sent: streamed
+    # endpoints (batch-submit) do their work while the body is iterated
+    released = False
+
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            ADMISSION.release(batch)
+
+    try:
+        response = await call_next(request)
+    except BaseException:
+        release()
+        raise
+    body = response.body_iterator
+
+    async def body_then_release():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            release()
+
+    response.body_iterator = body_then_release()
+    return response
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Request latency histogram and status counters per route"""
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    METRICS.observe("civic_request_seconds", time.perf_counter() - start, path=path)
+    METRICS.inc("civic_requests_total", path=path, status=response.status_code)
+    return response
+
+
+# Enable CORS for React frontend. Added after the HTTP middlewares above so
+# it is outermost: shed (429/503) responses carry the CORS headers too, and
+# the frontend can read their Retry-After.
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -30,12 +382,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
-# Create uploads directory
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
-
 
 # ========================================
 # API ENDPOINTS
@@ -59,29 +408,24 @@ async def quick_classify_endpoint(file: UploadFile = File(...)):
     Use this for instant feedback while user is uploading.
     """
     try:
-        print(f"📸 Received file: {file.filename}")
-        
-        # Save uploaded file temporarily
-        file_path = UPLOAD_DIR / file.filename
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        print(f"✅ File saved to: {file_path}")
+        # Stream upload to disk off the event loop
+        upload = await ingest_upload(file)
         
         # Get quick classification
-        result = quick_classify(file.filename)
+        result = quick_classify(upload.filename, await classify_upload_async(upload))
         
-        print(f"✅ Classification result: {result}")
+        logger.debug("Quick classification", extra={"image": upload.filename, "sha256": upload.sha256, **result})
         
         return JSONResponse(content={
             "success": True,
             "data": result
         })
     
+    except UploadTooLarge as e:
+        return upload_too_large_response(e)
+    
     except Exception as e:
-        print(f"❌ Error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Quick classification failed")
         return JSONResponse(
             status_code=500,
             content={"success": False, "error": str(e)}
@@ -93,57 +437,118 @@ async def submit_report(
     file: UploadFile = File(...),
     latitude: float = Form(None),
     longitude: float = Form(None),
-    address: str = Form(None)
+    address: str = Form(None),
+    fields: str = Query(None)
 ):
     """
     Full report submission with location data.
-    Returns: complete report JSON
+    Returns: complete report JSON, or only the comma-separated `fields`
+    (e.g. ?fields=issue,department) - unrequested parts are never rendered.
     """
     try:
-        print(f"📸 Received file: {file.filename}")
-        print(f"📍 Location: {latitude}, {longitude}")
-        
-        # Save uploaded file
-        file_path = UPLOAD_DIR / file.filename
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        print(f"✅ File saved to: {file_path}")
-        
-        # Prepare location data if provided
-        location = None
-        if latitude and longitude:
-            location = {
-                "lat": latitude,
-                "lng": longitude,
-                "address": address or "Location captured",
-                "ward": "Auto-detected",
-                "accuracy": "±10 meters"
-            }
+        selected_fields = parse_report_fields(fields)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"success": False, "error": str(e)}
+        )
+    
+    try:
+        # Stream upload to disk off the event loop
+        upload = await ingest_upload(file)
         
-        # Generate full report
-        report = get_report_json(file.filename, location)
+        # Classify and preprocess; fall back to the photo's GPS for location
+        classification, preprocessed = await analyze_upload(upload)
+        latitude, longitude = photo_coordinates(latitude, longitude, preprocessed)
         
-        print(f"✅ Report generated: {report['report_id']}")
+        # Dedupe and build the report
+        writer_item, content = prepare_submission(
+            upload, latitude, longitude, address, selected_fields, classification
+        )
+        attach_thumbnail(content, upload, preprocessed)
         
-        # TODO: Save to database here
-        # save_to_database(report)
+        # Queue for write-behind persistence (or commit now in sync mode)
+        await REPORT_WRITER.submit_async(writer_item)
         
-        return JSONResponse(content={
-            "success": True,
-            "data": report
-        })
+        return JSONResponse(content=content)
+    
+    except UploadTooLarge as e:
+        return upload_too_large_response(e)
     
     except Exception as e:
-        print(f"❌ Error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Report submission failed")
         return JSONResponse(
             status_code=500,
             content={"success": False, "error": str(e)}
         )
 
 
+@app.post("/api/batch-submit")
+async def batch_submit(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    metadata: str = Form(None),
+    fields: str = Query(None)
+):
+    """
+    Bulk submission for partner batches (drone / CCTV frames).
+    `metadata` is a JSON array with one {"latitude", "longitude", "address"}
+    entry (or null) per file, in the same order.
+    Streams one NDJSON line per file as soon as its report is ready, then a
+    summary line. A bad file only fails its own line. Admission control
+    charges the client one token per file.
+    """
+    try:
+        selected_fields = parse_report_fields(fields)
+        if len(files) > BATCH_MAX_FILES:
+            raise ValueError(f"Too many files: {len(files)} (max {BATCH_MAX_FILES})")
+        locations = parse_batch_metadata(metadata, len(files))
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"success": False, "error": str(e)}
+        )
+    if ADMISSION.enabled:
+        # The first file was paid for on admission
+        ADMISSION.charge(ADMISSION.client_id(request.headers, request.client), len(files) - 1)
+    
+    # Uploads are only readable while the request is open, so ingest them
+    # all before streaming; reports are then built on the worker pool.
+    ingest_slots = asyncio.Semaphore(BATCH_WORKERS)
+    
+    async def ingest(file):
+        async with ingest_slots:
+            return await ingest_upload(file)
+    
+    uploads = await asyncio.gather(*(ingest(file) for file in files), return_exceptions=True)
+    loop = asyncio.get_running_loop()
+    
+    async def process(index, upload):
+        base = {"index": index, "filename": files[index].filename}
+        if isinstance(upload, BaseException):
+            return {**base, "success": False, "error": str(upload)}
+        location = locations[index]
+        try:
+            classification, preprocessed = await analyze_upload(upload)
+            latitude, longitude = photo_coordinates(
+                location["latitude"], location["longitude"], preprocessed
+            )
+            writer_item, content = await loop.run_in_executor(
+                BATCH_EXECUTOR, prepare_submission, upload,
+                latitude, longitude, location["address"],
+                selected_fields, classification
+            )
+            attach_thumbnail(content, upload, preprocessed)
+            await REPORT_WRITER.submit_async(writer_item)
+        except Exception as e:
+            logger.exception("Batch item failed", extra={"index": index})
+            return {**base, "success": False, "error": str(e)}
+        return {**base, **content}
+    
+    METRICS.inc("civic_batch_items_total", len(files))
+    return StreamingResponse(stream_results(uploads, process), media_type=NDJSON_MEDIA_TYPE)
+
+
 @app.post("/api/get-complaint")
 async def get_complaint_endpoint(
     file: UploadFile = File(...),
@@ -156,10 +561,8 @@ async def get_complaint_endpoint(
     Use this if frontend needs just the complaint for display.
     """
     try:
-        # Save uploaded file
-        file_path = UPLOAD_DIR / file.filename
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Stream upload to disk off the event loop
+        upload = await ingest_upload(file)
         
         # Prepare location
         location = None
@@ -168,30 +571,324 @@ async def get_complaint_endpoint(
                 "lat": latitude,
                 "lng": longitude,
                 "address": address or "Location captured",
-                "ward": "Auto-detected"
+                "ward": WARDS.resolve(latitude, longitude)
             }
         
         # Get complaint text
-        complaint = get_complaint_text(file.filename, location)
+        complaint = get_complaint_text(upload.filename, location, await classify_upload_async(upload))
         
         return JSONResponse(content={
             "success": True,
             "complaint": complaint
         })
     
+    except UploadTooLarge as e:
+        return upload_too_large_response(e)
+    
     except Exception as e:
+        logger.exception("Complaint generation failed")
         return JSONResponse(
             status_code=500,
             content={"success": False, "error": str(e)}
         )
 
 
+@app.get("/api/complaints")
+def complaints_list(
+    department: str = Query(None),
+    priority: str = Query(None),
+    severity: str = Query(None),
+    issue_type: str = Query(None),
+    cursor: str = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE),
+    session: Session = Depends(get_session)
+):
+    """
+    Dashboard listing, newest first. Pass the returned `next_cursor` as
+    `cursor` to get the next page; it is null on the last page.
+    """
+    try:
+        results, next_cursor = list_complaints(
+            session, cursor, limit,
+            department=department, priority=priority, severity=severity, issue_type=issue_type
+        )
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"success": False, "error": str(e)}
+        )
+    return JSONResponse(content={
+        "success": True,
+        "count": len(results),
+        "data": results,
+        "next_cursor": next_cursor
+    })
+
+
+@app.get("/api/complaints/search")
+def complaints_search(
+    q: str = Query(..., min_length=1, max_length=200),
+    department: str = Query(None),
+    priority: str = Query(None),
+    severity: str = Query(None),
+    issue_type: str = Query(None),
+    status: str = Query(None),
+    ward: str = Query(None),
+    since: str = Query(None),
+    until: str = Query(None),
+    limit: int = Query(DEFAULT_LIMIT, gt=0, le=MAX_LIMIT),
+    offset: int = Query(0, ge=0, le=MAX_OFFSET),
+    session: Session = Depends(get_session)
+):
+    """
+    Free-text search over complaint text, address and issue type, best
+    match first, combined with the listing filters and a created date
+    range [since, until). Backed by the FTS5 index.
+    """
+    try:
+        results = search_complaints(
+            session, q, limit, offset, parse_date(since), parse_date(until),
+            department=department, priority=priority, severity=severity,
+            issue_type=issue_type, status=status, ward=ward
+        )
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"success": False, "error": str(e)}
+        )
+    return JSONResponse(content={
+        "success": True,
+        "count": len(results),
+        "data": results
+    })
+
+
+@app.get("/api/complaints/nearby")
+def nearby_complaints(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_m: float = Query(500, gt=0, le=50000),
+    issue_type: str = Query(None),
+    priority: str = Query(None),
+    limit: int = Query(100, gt=0, le=MAX_RESULTS),
+    session: Session = Depends(get_session)
+):
+    """
+    Complaints within radius_m meters of a point, nearest first.
+    Used by the map view; backed by the R*Tree spatial index.
+    """
+    results = find_nearby(session, lat, lng, radius_m, issue_type, priority, limit)
+    return JSONResponse(content={
+        "success": True,
+        "count": len(results),
+        "data": results
+    })
+
+
+@app.get("/api/complaints/bbox")
+def complaints_in_bbox(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lng: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lng: float = Query(..., ge=-180, le=180),
+    issue_type: str = Query(None),
+    priority: str = Query(None),
+    limit: int = Query(MAX_RESULTS, gt=0, le=MAX_RESULTS),
+    session: Session = Depends(get_session)
+):
+    """Complaints inside the visible map rectangle"""
+    results = find_in_bbox(session, min_lat, min_lng, max_lat, max_lng,
+                           issue_type, priority, limit)
+    return JSONResponse(content={
+        "success": True,
+        "count": len(results),
+        "data": results
+    })
+
+
+@app.get("/api/thumbnails/{sha256}")
+def get_thumbnail(sha256: str):
+    """Dashboard thumbnail for an uploaded photo (by content hash)"""
+    if not SHA256_PATTERN.fullmatch(sha256):
+        return JSONResponse(status_code=400, content={"success": False, "error": "Invalid image hash"})
+    path = thumbnail_path_for(CONTENT_STORE.path_for(sha256))
+    if not os.path.exists(path):
+        return JSONResponse(status_code=404, content={"success": False, "error": "Thumbnail not found"})
+    return FileResponse(path, media_type="image/jpeg", headers={"Cache-Control": "public, max-age=86400, immutable"})
+
+
+@app.get("/api/dispatch/next")
+def dispatch_next(
+    department: str = Query(...),
+    limit: int = Query(10, gt=0, le=MAX_LISTED)
+):
+    """Queued tasks for a department, earliest SLA deadline first"""
+    results = DISPATCH_QUEUE.next_due(department, limit)
+    return JSONResponse(content={"success": True, "count": len(results), "data": results})
+
+
+@app.get("/api/dispatch/overdue")
+def dispatch_overdue(
+    department: str = Query(...),
+    limit: int = Query(MAX_LISTED, gt=0, le=MAX_LISTED)
+):
+    """Queued tasks already past their SLA deadline, most overdue first"""
+    results = DISPATCH_QUEUE.overdue(department, limit=limit)
+    return JSONResponse(content={"success": True, "count": len(results), "data": results})
+
+
+@app.post("/api/dispatch/claim")
+def dispatch_claim(
+    department: str = Form(...),
+    worker: str = Form(...),
+    lease_seconds: int = Form(None)
+):
+    """
+    Claims the most urgent queued task for a crew. The claim expires after
+    the lease unless completed or released; returns 404 when the queue is empty.
+    """
+    task = DISPATCH_QUEUE.claim(department, worker, lease_seconds)
+    if task is None:
+        return JSONResponse(status_code=404, content={"success": False, "error": "No queued tasks"})
+    return JSONResponse(content={"success": True, "data": task})
+
+
+@app.post("/api/dispatch/complete")
+def dispatch_complete(report_id: str = Form(...), worker: str = Form(...)):
+    """Marks a claimed task done and resolves its complaint"""
+    task = DISPATCH_QUEUE.complete(report_id, worker)
+    if task is None:
+        return JSONResponse(status_code=409, content={"success": False, "error": "Task is not claimed by this worker"})
+    return JSONResponse(content={"success": True, "data": task})
+
+
+@app.post("/api/dispatch/release")
+def dispatch_release(report_id: str = Form(...), worker: str = Form(...)):
+    """Returns a claimed task to its department queue"""
+    if not DISPATCH_QUEUE.release(report_id, worker):
+        return JSONResponse(status_code=409, content={"success": False, "error": "Task is not claimed by this worker"})
+    return JSONResponse(content={"success": True})
+
+
+@app.get("/api/events")
+async def event_stream(
+    report_id: str = Query(None),
+    department: str = Query(None)
+):
+    """
+    Server-Sent Events stream of status changes (dispatched, claimed,
+    released, requeued, resolved) for comma-separated `report_id`s and/or
+    a `department`. Replaces polling: use with EventSource, which
+    reconnects on its own; refetch state after an `overflow` event.
+    """
+    topics = [report_topic(value.strip()) for value in (report_id or "").split(",") if value.strip()]
+    if department:
+        topics.append(department_topic(department))
+    if not topics or len(topics) > MAX_TOPICS:
+        return JSONResponse(
+            status_code=400,
+            content={"success": False, "error": f"Give 1-{MAX_TOPICS} report_id values and/or a department"}
+        )
+    if not EVENT_BUS.has_capacity():
+        return JSONResponse(
+            status_code=503,
+            content={"success": False, "error": "Too many open event streams"},
+            headers={"Retry-After": "30"}
+        )
+    return StreamingResponse(
+        EVENT_BUS.stream(topics),
+        media_type=SSE_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/export")
+def export_complaints(
+    fmt: str = Query("ndjson", alias="format"),
+    compression: str = Query("none"),
+    since: str = Query(None),
+    until: str = Query(None),
+    department: str = Query(None)
+):
+    """
+    Streams stored complaints as NDJSON, CSV or Parquet (optionally gzip or
+    zstd), filtered by created date range [since, until) and department.
+    Rows are encoded as they are read, in fixed memory.
+    """
+    try:
+        chunks = export_chunks(fmt, compression, parse_date(since), parse_date(until), department)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"success": False, "error": str(e)}
+        )
+    filename = export_filename(fmt, compression)
+    return StreamingResponse(
+        chunks,
+        media_type=export_media_type(fmt, compression),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@app.get("/api/stats")
+def complaint_stats(request: Request):
+    """
+    Open complaints by department, priority, ward and issue type.
+    Served from incrementally maintained counters; send If-None-Match with
+    the last ETag to get a 304 while nothing has changed.
+    """
+    STATS.maybe_reload()
+    etag, body = STATS.snapshot()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match", "").removeprefix("W/") == etag.removeprefix("W/"):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/api/admission")
+def admission_status():
+    """Admission-control limits, current load and shed counts"""
+    return JSONResponse(content={"success": True, "data": ADMISSION.snapshot()})
+
+
+@app.post("/api/admin/reload")
+def admin_reload(request: Request):
+    """
+    Reloads dispatch queues and statistics from the database in every
+    worker. rescore.py calls this after re-scoring (--notify).
+    """
+    if ADMIN_TOKEN is not None:
+        allowed = hmac.compare_digest(request.headers.get("x-admin-token", ""), ADMIN_TOKEN)
+    else:
+        allowed = request.client is not None and request.client.host in LOCAL_HOSTS
+    if not allowed:
+        return JSONResponse(status_code=403, content={"success": False, "error": "Not allowed"})
+    queued, stats_rows = reload_cached_state()
+    CLUSTER.send_control("reload")
+    return JSONResponse(content={"success": True, "data": {"queued_tasks": queued, "stats_rows": stats_rows}})
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus-format counters and per-stage latency histograms (all workers)"""
+    return PlainTextResponse(
+        CLUSTER.collect_metrics().render_prometheus(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
 # ========================================
 # RUN SERVER
 # ========================================
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    if int(os.environ.get("CIVIC_WORKERS", 1)) > 1:
+        # Preloaded, forked workers (server.py). Run it fresh: this process
+        # has already imported the app without the cluster settings.
+        import sys
+        os.execv(sys.executable, [sys.executable, str(Path(__file__).with_name("server.py"))])
+    else:
+        import uvicorn
+        uvicorn.run(app, host="0.0.0.0", port=8000)
     # Access at: http://localhost:8000
     # API docs at: http://localhost:8000/docs
\ No newline at end of file
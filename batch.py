@@ -0,0 +1,94 @@
+"""
+Bulk submission support for /api/batch-submit.
+Items are fanned out over a bounded worker pool and each result is
+streamed back as one NDJSON line as soon as it is ready. A bounded result
+buffer provides backpressure: if the client stops reading, workers stop
+picking up new items. Every item succeeds or fails on its own.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import os
+
+from responses import dumps
+
+
+BATCH_MAX_FILES = int(os.environ.get("CIVIC_BATCH_MAX_FILES", 500))
+BATCH_WORKERS = int(os.environ.get("CIVIC_BATCH_WORKERS", 4))
+BATCH_BUFFER = int(os.environ.get("CIVIC_BATCH_BUFFER", 16))
+
+BATCH_EXECUTOR = ThreadPoolExecutor(BATCH_WORKERS, thread_name_prefix="batch-submit")
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def parse_batch_metadata(raw, count):
+    """
+    Parses the `metadata` form field: a JSON array with one entry per file
+    (same order), each null or {"latitude", "longitude", "address"}.
+    Returns a list of `count` dicts. Raises ValueError if malformed.
+    """
+    if not raw:
+        return [{} for _ in range(count)]
+    try:
+        entries = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"metadata is not valid JSON: {e}") from e
+    if not isinstance(entries, list) or len(entries) != count:
+        raise ValueError(f"metadata must be a JSON array with one entry per file ({count})")
+
+    parsed = []
+    for index, entry in enumerate(entries):
+        entry = entry or {}
+        if not isinstance(entry, dict):
+            raise ValueError(f"metadata[{index}] must be an object or null")
+        try:
+            latitude = float(entry["latitude"]) if entry.get("latitude") is not None else None
+            longitude = float(entry["longitude"]) if entry.get("longitude") is not None else None
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"metadata[{index}] has an invalid coordinate") from e
+        parsed.append({
+            "latitude": latitude,
+            "longitude": longitude,
+            "address": entry.get("address"),
+        })
+    return parsed
+
+
+def _line(payload):
+    return dumps(payload) + b"\n"
+
+
+async def stream_results(items, process, concurrency=BATCH_WORKERS, buffer=BATCH_BUFFER):
+    """
+    Runs `await process(index, item)` for every item with at most
+    `concurrency` in flight and yields NDJSON lines in completion order,
+    followed by a summary line. Exceptions become per-item error lines.
+    """
+    results = asyncio.Queue(maxsize=buffer)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(index, item):
+        async with semaphore:
+            try:
+                payload = await process(index, item)
+            except Exception as e:
+                payload = {"index": index, "success": False, "error": str(e)}
+            await results.put(payload)
+
+    tasks = [asyncio.create_task(run_one(index, item)) for index, item in enumerate(items)]
+    succeeded = failed = 0
+    try:
+        for _ in range(len(tasks)):
+            payload = await results.get()
+            if payload.get("success"):
+                succeeded += 1
+            else:
+                failed += 1
+            yield _line(payload)
+        yield _line({"done": True, "total": len(tasks), "succeeded": succeeded, "failed": failed})
+    finally:
+        # Client went away: stop work that has not started yet
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,115 @@
+"""
+Database load test: read and write throughput through the sync engine
+and pool that serve requests, for different pool settings.
+
+Seeds a scratch database (SQLite in a temp dir unless --url is given), then
+for each (pool_size, max_overflow) runs point reads by report_id and
+single-row inserts from `concurrency` threads, each in its own session,
+like the sync endpoints do on the server threadpool (get_session).
+Pools smaller than the thread count show up as checkout waits in p95/p99.
+
+Usage: python -m benchmarks.bench_database [--pool-sizes 1 5 10 20] [--concurrency 40]
+       python -m benchmarks.bench_database --url postgresql://user:pw@host/civic
+"""
+
+import argparse
+import itertools
+import os
+import tempfile
+
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from database import THREADPOOL_SIZE, Base, create_db_engine
+from models import Complaint
+from report_ids import new_report_id
+
+from benchmarks.harness import print_table, run_sync
+
+
+def _row(report_id):
+    return Complaint(
+        report_id=report_id,
+        issue_type="Pothole",
+        category="road_infrastructure",
+        confidence=0.78,
+        severity="Medium",
+        priority="Medium",
+        latitude=17.385,
+        longitude=78.4867,
+        address="Benchmark Road",
+        resolution_timeline="7 days",
+        department="Roads & Highways Department",
+        complaint_text="benchmark",
+    )
+
+
+def seed(url, rows):
+    """Creates the schema and `rows` complaints; returns their report ids"""
+    engine = create_db_engine(url)
+    Base.metadata.create_all(bind=engine)
+    report_ids = [new_report_id() for _ in range(rows)]
+    with engine.begin() as connection:
+        connection.execute(
+            Complaint.__table__.insert(),
+            [{"report_id": report_id, "issue_type": "Pothole", "priority": "Medium"} for report_id in report_ids]
+        )
+    engine.dispose()
+    return report_ids
+
+
+def _bench_pool(url, report_ids, pool_size, max_overflow, concurrency, iterations):
+    engine = create_db_engine(url, pool_size=pool_size, max_overflow=max_overflow)
+    sessions = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    names = itertools.count()
+    extra = {"pool_size": pool_size, "max_overflow": max_overflow}
+
+    def read(i):
+        with sessions() as session:
+            report_id = report_ids[i % len(report_ids)]
+            session.execute(select(Complaint.id).where(Complaint.report_id == report_id)).scalar_one()
+
+    def write(i):
+        with sessions() as session:
+            session.add(_row(f"BENCH-{pool_size}-{max_overflow}-{next(names)}"))
+            session.commit()
+
+    try:
+        label = f"pool={pool_size}+{max_overflow}"
+        return [
+            run_sync(f"db read [{label}]", read, iterations, concurrency, **extra),
+            run_sync(f"db write [{label}]", write, iterations, concurrency, **extra),
+        ]
+    finally:
+        engine.dispose()
+
+
+def run(pool_sizes=(1, 5, 10, 20), max_overflow=0, concurrency=THREADPOOL_SIZE, iterations=2000,
+        rows=10000, url=None):
+    if url is None:
+        directory = tempfile.mkdtemp(prefix="civic-db-bench-")
+        url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    report_ids = seed(url, rows)
+
+    results = []
+    for pool_size in pool_sizes:
+        results += _bench_pool(url, report_ids, pool_size, max_overflow, concurrency, iterations)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DB read/write throughput vs pool settings")
+    parser.add_argument("--url", default=None, help="database URL (default: temp SQLite file)")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--max-overflow", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=THREADPOOL_SIZE,
+                        help="request threads (default: the server threadpool size)")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=10000)
+    args = parser.parse_args()
+    print_table(run(args.pool_sizes, args.max_overflow, args.concurrency, args.iterations,
+                    args.rows, args.url))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+End-to-end benchmarks for the upload endpoints through an in-process ASGI
+client (httpx.AsyncClient + ASGITransport), with multipart payloads of
+several image sizes. Runs against a throwaway working directory so the
+database and uploads never touch the real ones.
+"""
+
+import os
+import random
+import tempfile
+
+from benchmarks.harness import run_async
+
+
+IMAGE_SIZES = {
+    "200KB": 200 * 1024,
+    "2MB": 2 * 1024 * 1024,
+    "8MB": 8 * 1024 * 1024,
+}
+
+DISTINCT_IMAGES = 8
+
+_JPEG_HEADER = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+
+NAMES = [
+    "pothole_main_road.jpg", "garbage_dump_market.jpg", "broken_streetlight.jpg",
+    "drain_overflow.jpg", "graffiti_wall.jpg", "fallen_tree.jpg", "IMG_0001.jpg",
+]
+
+
+def _payloads(size, rng):
+    """A few distinct JPEG-looking payloads of `size` bytes"""
+    return [_JPEG_HEADER + rng.randbytes(size - len(_JPEG_HEADER) - 2) + b"\xff\xd9"
+            for _ in range(DISTINCT_IMAGES)]
+
+
+def _form(i, rng):
+    """Location form fields spread over a city-sized box (avoids dedupe hits)"""
+    return {
+        "latitude": f"{17.30 + rng.random() * 0.2:.6f}",
+        "longitude": f"{78.40 + rng.random() * 0.2:.6f}",
+        "address": f"Test Street {i}, Hyderabad",
+    }
+
+
+async def _run_async(iterations, concurrency, sizes):
+    try:
+        import httpx
+    except ImportError as e:
+        raise SystemExit("HTTP benchmarks need httpx: pip install httpx") from e
+
+    workdir = tempfile.mkdtemp(prefix="civic-bench-")
+    os.chdir(workdir)
+    os.environ.setdefault("CIVIC_UPLOAD_DIR", os.path.join(workdir, "uploads"))
+
+    import backend_api
+
+    backend_api.start_persistence()
+    rng = random.Random(42)
+    results = []
+    transport = httpx.ASGITransport(app=backend_api.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for label in sizes:
+                payloads = _payloads(IMAGE_SIZES[label], rng)
+
+                def files(i):
+                    return {"file": (NAMES[i % len(NAMES)], payloads[i % len(payloads)], "image/jpeg")}
+
+                async def quick(i):
+                    response = await client.post("/api/quick-classify", files=files(i))
+                    response.raise_for_status()
+
+                async def submit(i):
+                    response = await client.post("/api/submit-report", files=files(i), data=_form(i, rng))
+                    response.raise_for_status()
+
+                async def complaint(i):
+                    response = await client.post("/api/get-complaint", files=files(i), data=_form(i, rng))
+                    response.raise_for_status()
+
+                for name, func in (
+                    ("POST /api/quick-classify", quick),
+                    ("POST /api/submit-report", submit),
+                    ("POST /api/get-complaint", complaint),
+                ):
+                    results.append(await run_async(
+                        f"{name} [{label}]", func, iterations, concurrency, image_size=label
+                    ))
+    finally:
+        backend_api.stop_persistence()
+    return results
+
+
+def run(iterations=200, concurrency=8, sizes=tuple(IMAGE_SIZES)):
+    import asyncio
+
+    return asyncio.run(_run_async(iterations, concurrency, sizes))
@@ -0,0 +1,77 @@
+"""
+Throughput of the NumPy inference backend against micro-batch size.
+Generates a tiny model and synthetic image files locally (no network),
+then pushes concurrent classify requests through the micro-batcher.
+
+Usage: python -m benchmarks.bench_inference [--batch-sizes 1 4 16 32] [--images 512]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from inference import NumpyModelBackend, generate_tiny_model
+
+from benchmarks.harness import print_table, summarize
+
+
+def _make_images(directory, count, size):
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"frame_{i:05d}.jpg")
+        with open(path, "wb") as f:
+            f.write(b"\xff\xd8\xff\xe0" + os.urandom(size - 6) + b"\xff\xd9")
+        paths.append(path)
+    return paths
+
+
+async def _measure(backend, paths, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(path):
+        async with semaphore:
+            start = time.perf_counter()
+            await backend.classify_async(os.path.basename(path), path)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(path) for path in paths))
+    return latencies, time.perf_counter() - start
+
+
+def run(batch_sizes=(1, 2, 4, 8, 16, 32), images=512, image_kb=200, workers=2, max_wait_ms=5.0):
+    directory = tempfile.mkdtemp(prefix="civic-inference-")
+    model_path = generate_tiny_model(os.path.join(directory, "tiny.npz"))
+    paths = _make_images(directory, images, image_kb * 1024)
+
+    results = []
+    for batch_size in batch_sizes:
+        backend = NumpyModelBackend(model_path, workers=workers, max_batch=batch_size,
+                                    max_wait_ms=max_wait_ms, min_confidence=0.0)
+        backend.start()
+        try:
+            asyncio.run(_measure(backend, paths[:workers * batch_size], workers * batch_size))  # warm up
+            latencies, elapsed = asyncio.run(_measure(backend, paths, workers * batch_size * 2))
+        finally:
+            backend.stop()
+        results.append(summarize(f"numpy backend [batch<={batch_size}]", latencies, elapsed,
+                                 workers * batch_size * 2, batch_size=batch_size, image_kb=image_kb))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NumPy backend throughput vs batch size")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--images", type=int, default=512)
+    parser.add_argument("--image-kb", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    print_table(run(args.batch_sizes, args.images, args.image_kb, args.workers, args.max_wait_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Micro-benchmarks for the classification and report pipeline.
+"""
+
+import itertools
+
+from civic_issue_reporter import (
+    classify_issue,
+    classify_many,
+    generate_complaint,
+    process_civic_report,
+    quick_classify,
+)
+
+from benchmarks.harness import run_sync
+
+
+SAMPLE_NAMES = [
+    "pothole_main_road.jpg", "IMG_20260114_093012.jpg", "garbage_dump_market.png",
+    "broken_streetlight_night.jpeg", "drain_overflow_after_rain.jpg", "graffiti_wall.jpg",
+    "fallen_tree_branch.jpg", "PXL_20260201_181455123.jpg", "trash_near_school.jpg",
+    "water_logging_junction.heic",
+]
+
+SAMPLE_LOCATION = {
+    "lat": 17.3850,
+    "lng": 78.4867,
+    "address": "Road No. 12, Banjara Hills, Hyderabad",
+    "ward": "Ward 8",
+    "accuracy": "±10 meters",
+}
+
+
+# Salts "unique" names per run so repeated runs never hit the memo cache
+_RUNS = itertools.count()
+
+
+def _unique_name(salt, i):
+    return f"IMG_{salt}_{i:09d}_{SAMPLE_NAMES[i % len(SAMPLE_NAMES)]}"
+
+
+def run(iterations=20000, concurrency=1):
+    salt = next(_RUNS)
+    names = SAMPLE_NAMES
+    n = len(names)
+    results = [
+        run_sync("classify_issue (cached names)",
+                 lambda i: classify_issue(names[i % n]), iterations, concurrency),
+        run_sync("classify_issue (unique names)",
+                 lambda i: classify_issue(_unique_name(salt, i)), iterations, concurrency),
+        run_sync("quick_classify",
+                 lambda i: quick_classify(names[i % n]), iterations, concurrency),
+        run_sync("generate_complaint",
+                 lambda i: generate_complaint("Pothole", SAMPLE_LOCATION, "High", "Critical",
+                                              "24 hours", 0.92, "17 October 2026, 10:15 AM",
+                                              "CIV06GMFBN3SNMXQX6VHR0149TTMR"),
+                 iterations, concurrency),
+        run_sync("process_civic_report",
+                 lambda i: process_civic_report(names[i % n], SAMPLE_LOCATION),
+                 max(1, iterations // 4), concurrency),
+    ]
+
+    batch_iterations = max(1, iterations // 1000)
+    batches = [[f"{k}_{_unique_name(salt, i)}" for i in range(1000)] for k in range(batch_iterations)]
+    results.append(run_sync("classify_many (1000 unique names)",
+                            lambda i: classify_many(batches[i]),
+                            batch_iterations, concurrency, warmup=0, batch_size=1000))
+    return results
@@ -0,0 +1,123 @@
+"""
+Response-layer cost on realistic /api/submit-report payloads, before and
+after: complaint rendering (format() vs pre-split template), JSON
+serialization (stdlib json as Starlette renders it vs responses.dumps),
+and gzip/brotli compression (CPU per response and bytes on the wire).
+
+Usage: python -m benchmarks.bench_responses [--iterations 20000]
+"""
+
+import argparse
+import json
+import random
+
+from civic_issue_reporter import ISSUE_DESCRIPTIONS, _complaint_template, build_report, generate_complaint
+from responses import BROTLI_QUALITY, GZIP_LEVEL, compress_body, dumps, orjson, supported_encodings
+
+from benchmarks.harness import print_table, run_sync
+
+
+PAYLOADS = 64
+
+ADDRESSES = [
+    "Road No. 12, Banjara Hills, Hyderabad",
+    "Near Charminar Bus Stop, Old City, Hyderabad",
+    "Plot 45, HITEC City Main Road, Madhapur",
+    "Opp. Government School, Kukatpally Housing Board Colony",
+]
+
+
+def report_payloads(count=PAYLOADS, seed=3):
+    """submit-report response bodies: every issue type, varied locations"""
+    rng = random.Random(seed)
+    issue_types = list(ISSUE_DESCRIPTIONS)
+    payloads = []
+    for i in range(count):
+        location = {
+            "lat": round(17.30 + rng.random() * 0.2, 6),
+            "lng": round(78.40 + rng.random() * 0.2, 6),
+            "address": rng.choice(ADDRESSES),
+            "ward": f"Ward {rng.randint(1, 150)}",
+            "accuracy": "±10 meters",
+        }
+        classification = (issue_types[i % len(issue_types)], rng.uniform(0.6, 0.98), "infrastructure")
+        report = build_report(f"IMG_{i:04d}.jpg", location, classification)
+        payloads.append({
+            "success": True,
+            "data": report.to_dict(),
+            "thumbnail": f"/api/thumbnails/{rng.randbytes(32).hex()}",
+        })
+    return payloads
+
+
+def _starlette_render(content):
+    # What fastapi.responses.JSONResponse.render does
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def _format_complaint(report):
+    # generate_complaint before the template was pre-split
+    location = report["location"]
+    issue = report["issue"]
+    return _complaint_template(issue["type"]).format(
+        priority_upper=issue["priority"].upper(), address=location["address"], lat=location["lat"],
+        lng=location["lng"], ward=location["ward"], severity=issue["severity"], priority=issue["priority"],
+        confidence_pct=int(issue["confidence"]), timestamp=report["timestamp"],
+        timeline=report["resolution_timeline"], report_id=report["report_id"],
+    )
+
+
+def _split_complaint(report):
+    location = report["location"]
+    issue = report["issue"]
+    return generate_complaint(
+        issue["type"], location, issue["severity"], issue["priority"], report["resolution_timeline"],
+        issue["confidence"] / 100, report["timestamp"], report["report_id"],
+    )
+
+
+def run(iterations=20000):
+    payloads = report_payloads()
+    reports = [payload["data"] for payload in payloads]
+    bodies = [dumps(payload) for payload in payloads]
+    serializer = "orjson" if orjson is not None else "stdlib json"
+
+    def pick(items):
+        return lambda i: items[i % len(items)]
+
+    results = [
+        run_sync("complaint render [format, before]", lambda i: _format_complaint(reports[i % PAYLOADS]),
+                 iterations),
+        run_sync("complaint render [pre-split, after]", lambda i: _split_complaint(reports[i % PAYLOADS]),
+                 iterations),
+        run_sync("serialize report [stdlib json, before]", lambda i: _starlette_render(pick(payloads)(i)),
+                 iterations),
+        run_sync(f"serialize report [{serializer}, after]", lambda i: dumps(pick(payloads)(i)), iterations),
+    ]
+    identity = sum(map(len, bodies)) / len(bodies)
+    sizes = {"identity": identity}
+    for encoding in supported_encodings():
+        setting = f"q{BROTLI_QUALITY}" if encoding == "br" else f"level {GZIP_LEVEL}"
+        results.append(run_sync(
+            f"compress report [{encoding} {setting}]",
+            lambda i, encoding=encoding: compress_body(bodies[i % PAYLOADS], encoding),
+            max(1, iterations // 4),
+        ))
+        sizes[encoding] = sum(len(compress_body(body, encoding)) for body in bodies) / len(bodies)
+    return results, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report response rendering, serialization and compression")
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    results, sizes = run(args.iterations)
+    print_table(results)
+    print()
+    for encoding, size in sizes.items():
+        print(f"{encoding:<9} {size:>8,.0f} bytes per report response ({size / sizes['identity']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Ward lookup latency: grid + banded point-in-polygon vs. testing every
+polygon, with and without the rounded-coordinate cache.
+
+Builds a synthetic city of wards (a grid of squares with wavy, densely
+sampled edges, like digitized boundaries) over the Hyderabad area unless
+--geojson points at a real boundary file.
+
+Usage: python -m benchmarks.bench_wards [--wards 150] [--vertices 400] [--iterations 200000]
+"""
+
+import argparse
+import json
+import math
+import random
+
+from wards import WardIndex
+
+from benchmarks.harness import print_table, run_sync
+
+
+MIN_LAT, MIN_LNG, MAX_LAT, MAX_LNG = 17.20, 78.30, 17.60, 78.70
+
+
+def synthetic_wards(wards=150, vertices=400):
+    """GeoJSON FeatureCollection of roughly `wards` squares with wavy edges"""
+    side = max(1, round(math.sqrt(wards)))
+    cell_lat = (MAX_LAT - MIN_LAT) / side
+    cell_lng = (MAX_LNG - MIN_LNG) / side
+    per_edge = max(1, vertices // 4)
+    features = []
+    for row in range(side):
+        for col in range(side):
+            lat0, lng0 = MIN_LAT + row * cell_lat, MIN_LNG + col * cell_lng
+            corners = [(0, 0), (1, 0), (1, 1), (0, 1)]
+            ring = []
+            for (u0, v0), (u1, v1) in zip(corners, corners[1:] + corners[:1]):
+                for k in range(per_edge):
+                    t = k / per_edge
+                    wobble = 0.02 * math.sin(t * math.pi * 6)
+                    u, v = u0 + (u1 - u0) * t, v0 + (v1 - v0) * t
+                    ring.append([lng0 + (v + wobble) * cell_lng, lat0 + (u + wobble) * cell_lat])
+            ring.append(ring[0])
+            features.append({
+                "type": "Feature",
+                "properties": {"ward": f"Ward {row * side + col + 1}", "zone": f"Zone {row // 3 + 1}"},
+                "geometry": {"type": "Polygon", "coordinates": [ring]},
+            })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def run(wards=150, vertices=400, iterations=200000, geojson=None):
+    if geojson:
+        with open(geojson, encoding="utf-8") as f:
+            data = json.load(f)
+    else:
+        data = synthetic_wards(wards, vertices)
+    rng = random.Random(7)
+    points = [(rng.uniform(MIN_LAT, MAX_LAT), rng.uniform(MIN_LNG, MAX_LNG)) for _ in range(10000)]
+    uncached = WardIndex.from_geojson(data, cache_size=0)
+    cached = WardIndex.from_geojson(data)
+    extra = {"wards": len(uncached.labels), "polygons": len(uncached.polygons)}
+
+    def brute_force(i):
+        lat, lng = points[i % len(points)]
+        for polygon in uncached.polygons:
+            if polygon.contains(lat, lng):
+                return polygon.label
+
+    results = [
+        run_sync("ward resolve [every polygon]", brute_force, max(1, iterations // 20), **extra),
+        run_sync("ward resolve [grid]", lambda i: uncached.resolve(*points[i % len(points)]), iterations, **extra),
+        run_sync("ward resolve [grid + cache]", lambda i: cached.resolve(*points[i % len(points)]), iterations, **extra),
+    ]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ward point-in-polygon lookup latency")
+    parser.add_argument("--wards", type=int, default=150)
+    parser.add_argument("--vertices", type=int, default=400, help="vertices per synthetic ward")
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--geojson", default=None, help="benchmark a real boundary file instead")
+    args = parser.parse_args()
+    print_table(run(args.wards, args.vertices, args.iterations, args.geojson))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Worker scaling: throughput of the multi-worker server (server.py) at
+several worker counts, over real HTTP.
+
+For each worker count the server is started as a subprocess on a free
+port, against a throwaway database and upload directory and with
+admission control off (it would otherwise shed the benchmark's own load).
+Several client processes then post small JPEG payloads to
+/api/quick-classify, so the clients are not the bottleneck.
+
+Usage: python -m benchmarks.bench_workers [--workers 1 2 4] [--iterations 2000] [--clients 4]
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_endpoints import NAMES, _payloads
+from benchmarks.harness import print_table, summarize
+
+
+REPO = Path(__file__).resolve().parent.parent
+PAYLOAD_SIZE = 64 * 1024
+STARTUP_TIMEOUT = 120
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_serving(httpx, base_url, process):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Server exited during startup (status {process.returncode})")
+        try:
+            httpx.get(base_url + "/", timeout=1).raise_for_status()
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise SystemExit("Server did not start in time")
+
+
+def _client(base_url, iterations, concurrency, seed):
+    """One client process: returns per-request latencies and elapsed time"""
+    import httpx
+
+    payloads = _payloads(PAYLOAD_SIZE, random.Random(seed))
+
+    async def drive():
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            async def one(i):
+                async with semaphore:
+                    files = {"file": (NAMES[i % len(NAMES)], payloads[i % len(payloads)], "image/jpeg")}
+                    start = time.perf_counter()
+                    response = await client.post("/api/quick-classify", files=files)
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(iterations)))
+            return latencies, time.perf_counter() - start
+
+    return asyncio.run(drive())
+
+
+def run_workers(workers, iterations, clients, concurrency):
+    try:
+        import httpx
+    except ImportError as e:
+        raise SystemExit("HTTP benchmarks need httpx: pip install httpx") from e
+
+    workdir = tempfile.mkdtemp(prefix="civic-bench-")
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, [str(REPO), os.environ.get("PYTHONPATH")])),
+        CIVIC_ADMISSION="off",
+        CIVIC_LOG_LEVEL="WARNING",
+        CIVIC_UPLOAD_DIR=os.path.join(workdir, "uploads"),
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "server", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port)],
+        cwd=workdir, env=env,
+    )
+    try:
+        _wait_until_serving(httpx, base_url, process)
+        per_client = max(1, iterations // clients)
+        with ProcessPoolExecutor(clients) as pool:
+            futures = [pool.submit(_client, base_url, per_client, concurrency, seed) for seed in range(clients)]
+            outcomes = [future.result() for future in futures]
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+
+    latencies = [latency for client_latencies, _ in outcomes for latency in client_latencies]
+    elapsed = max(client_elapsed for _, client_elapsed in outcomes)
+    return summarize(f"POST /api/quick-classify [{workers} worker(s)]", latencies, elapsed,
+                     clients * concurrency, workers=workers)
+
+
+def run(worker_counts=(1, 2, 4), iterations=2000, clients=4, concurrency=16):
+    return [run_workers(workers, iterations, clients, concurrency) for workers in worker_counts]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-worker server throughput by worker count")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=4, help="client processes")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight per client")
+    args = parser.parse_args()
+    results = run(args.workers, args.iterations, args.clients, args.concurrency)
+    print_table(results)
+    base = results[0]["throughput_per_s"]
+    if base:
+        for result in results[1:]:
+            print(f"{result['workers']} workers: {result['throughput_per_s'] / base:.2f}x "
+                  f"the throughput of {results[0]['workers']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Shared benchmark plumbing: timing loops, percentiles, result records and
+baseline comparison.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import os
+import platform
+import time
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(name, latencies, elapsed, concurrency, **extra):
+    """Result record: throughput and latency percentiles in milliseconds"""
+    latencies = sorted(latencies)
+    result = {
+        "name": name,
+        "iterations": len(latencies),
+        "concurrency": concurrency,
+        "throughput_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 4),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 4) if latencies else 0.0,
+    }
+    result.update(extra)
+    return result
+
+
+def run_sync(name, func, iterations, concurrency=1, warmup=100, **extra):
+    """
+    Calls `func(i)` `iterations` times across `concurrency` threads and
+    records per-call latency.
+    """
+    for i in range(min(warmup, iterations)):
+        func(i)
+
+    def timed(i):
+        start = time.perf_counter()
+        func(i)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        latencies = [timed(i) for i in range(iterations)]
+    else:
+        with ThreadPoolExecutor(concurrency) as pool:
+            latencies = list(pool.map(timed, range(iterations), chunksize=64))
+    elapsed = time.perf_counter() - start
+    return summarize(name, latencies, elapsed, concurrency, **extra)
+
+
+async def run_async(name, func, iterations, concurrency=1, warmup=5, **extra):
+    """
+    Awaits `func(i)` `iterations` times with at most `concurrency` in flight
+    and records per-call latency.
+    """
+    for i in range(min(warmup, iterations)):
+        await func(i)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def timed(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await func(i)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(i) for i in range(iterations)))
+    elapsed = time.perf_counter() - start
+    return summarize(name, latencies, elapsed, concurrency, **extra)
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def result_key(result):
+    return f"{result['name']}@c{result['concurrency']}"
+
+
+def save_results(path, results):
+    with open(path, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+
+def load_results(path):
+    with open(path) as f:
+        return {result_key(r): r for r in json.load(f)["results"]}
+
+
+def compare(results, baseline, threshold):
+    """
+    Flags results that regressed beyond `threshold` (e.g. 0.2 = 20%) against
+    the baseline: lower throughput or higher p99 latency.
+    Returns a list of human-readable regression messages.
+    """
+    regressions = []
+    for result in results:
+        base = baseline.get(result_key(result))
+        if base is None:
+            continue
+        if base["throughput_per_s"] and result["throughput_per_s"] < base["throughput_per_s"] * (1 - threshold):
+            regressions.append(
+                f"{result_key(result)}: throughput {result['throughput_per_s']}/s "
+                f"vs baseline {base['throughput_per_s']}/s"
+            )
+        if base["p99_ms"] and result["p99_ms"] > base["p99_ms"] * (1 + threshold):
+            regressions.append(
+                f"{result_key(result)}: p99 {result['p99_ms']}ms vs baseline {base['p99_ms']}ms"
+            )
+    return regressions
+
+
+def print_table(results):
+    header = f"{'benchmark':<44} {'conc':>4} {'ops/s':>11} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['name']:<44} {r['concurrency']:>4} {r['throughput_per_s']:>11,.1f} "
+              f"{r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} {r['p99_ms']:>9.3f}")
@@ -0,0 +1,78 @@
+"""
+Benchmark runner.
+
+    python -m benchmarks.run                       # micro + HTTP suites
+    python -m benchmarks.run --suite micro --concurrency 1 4
+    python -m benchmarks.run --save-baseline       # record benchmarks/baseline.json
+    python -m benchmarks.run --threshold 0.15      # fail on >15% regressions
+
+Results are written to benchmarks/results.json; when a baseline exists,
+regressions beyond --threshold (lower throughput or higher p99) are listed
+and the process exits with status 1.
+"""
+
+from pathlib import Path
+import argparse
+import os
+import shutil
+import sys
+
+from benchmarks import bench_endpoints, bench_pipeline
+from benchmarks.harness import compare, load_results, print_table, save_results
+
+
+HERE = Path(__file__).resolve().parent
+DEFAULT_BASELINE = HERE / "baseline.json"
+DEFAULT_RESULTS = HERE / "results.json"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Civic issue reporter benchmarks")
+    parser.add_argument("--suite", choices=["micro", "http", "all"], default="all")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--iterations", type=int, default=None,
+                        help="iterations per benchmark (default: 20000 micro, 200 http)")
+    parser.add_argument("--sizes", nargs="+", choices=list(bench_endpoints.IMAGE_SIZES),
+                        default=list(bench_endpoints.IMAGE_SIZES))
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--results", type=Path, default=DEFAULT_RESULTS)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.20)
+    args = parser.parse_args(argv)
+
+    results_path = args.results.resolve()
+    baseline_path = args.baseline.resolve()
+
+    # The HTTP suite changes into a temp dir; keep the repo importable
+    sys.path.insert(0, str(HERE.parent))
+    os.environ.setdefault("CIVIC_LOG_LEVEL", "WARNING")
+
+    results = []
+    for concurrency in args.concurrency:
+        if args.suite in ("micro", "all"):
+            results += bench_pipeline.run(args.iterations or 20000, concurrency)
+        if args.suite in ("http", "all"):
+            results += bench_endpoints.run(args.iterations or 200, concurrency, args.sizes)
+
+    print_table(results)
+    save_results(results_path, results)
+    print(f"\nResults written to {results_path}")
+
+    if args.save_baseline:
+        shutil.copyfile(results_path, baseline_path)
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+
+    if baseline_path.exists():
+        regressions = compare(results, load_results(baseline_path), args.threshold)
+        if regressions:
+            print(f"\n⚠️  {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for message in regressions:
+                print(f"   {message}")
+            return 1
+        print(f"\n✅ No regressions beyond {args.threshold:.0%} against {baseline_path.name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
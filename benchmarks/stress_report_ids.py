@@ -0,0 +1,64 @@
+"""
+Stress test for report_ids: generates millions of IDs across processes
+(and threads within each process) and checks there are zero duplicates
+and that every thread saw strictly increasing IDs.
+
+Usage: python benchmarks/stress_report_ids.py [--processes 4] [--threads 4] [--per-thread 125000]
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import argparse
+import sys
+import threading
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from report_ids import new_report_id  # noqa: E402
+
+
+def _generate(threads, per_thread):
+    results = [None] * threads
+
+    def work(slot):
+        results[slot] = [new_report_id() for _ in range(per_thread)]
+
+    workers = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    for ids in results:
+        if any(a >= b for a, b in zip(ids, ids[1:])):
+            raise AssertionError("IDs are not strictly increasing within a thread")
+    return [report_id for ids in results for report_id in ids]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--per-thread", type=int, default=125_000)
+    args = parser.parse_args()
+
+    total = args.processes * args.threads * args.per_thread
+    print(f"Generating {total:,} IDs in {args.processes} processes x {args.threads} threads...")
+
+    start = time.perf_counter()
+    seen = set()
+    with ProcessPoolExecutor(args.processes) as pool:
+        futures = [pool.submit(_generate, args.threads, args.per_thread) for _ in range(args.processes)]
+        for future in futures:
+            seen.update(future.result())
+    elapsed = time.perf_counter() - start
+
+    duplicates = total - len(seen)
+    print(f"Generated {total:,} IDs in {elapsed:.2f}s ({total / elapsed:,.0f} IDs/s)")
+    print(f"Duplicates: {duplicates}")
+    return 1 if duplicates else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
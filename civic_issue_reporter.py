@@ -1,458 +1,635 @@
-"""
-AI CIVIC ISSUE REPORTING SYSTEM
-Complete implementation with simulated AI logic
-For SUDHEE 2026 CBIT Hackathon - Blushy Tech Team
-"""
-
-from datetime import datetime
-import json
-import os
-
-
-# ========================================
-# 1. SIMULATED AI CLASSIFICATION
-# ========================================
-
-def classify_issue(image_name, image_path=None):
-    """
-    Simulates AI-based image classification using filename patterns.
-    In production, this would use a trained MobileNet/ResNet model.
-    
-    Returns: (issue_type, confidence, category)
-    """
-    name = image_name.lower()
-    
-    # Rule-based detection (simulates AI behavior)
-    if "pothole" in name or "road" in name or "crack" in name or "damage" in name:
-        return "Pothole", 0.92, "road_infrastructure"
-    
-    elif "garbage" in name or "trash" in name or "waste" in name or "dump" in name:
-        return "Garbage Accumulation", 0.88, "sanitation"
-    
-    elif "streetlight" in name or "light" in name or "lamp" in name or "bulb" in name:
-        return "Broken Streetlight", 0.85, "lighting"
-    
-    elif "drain" in name or "water" in name or "overflow" in name or "flood" in name:
-        return "Drainage Issue", 0.79, "drainage"
-    
-    elif "wall" in name or "paint" in name or "graffiti" in name:
-        return "Damaged Property", 0.76, "property"
-    
-    elif "tree" in name or "branch" in name or "fallen" in name:
-        return "Fallen Tree/Branch", 0.82, "vegetation"
-    
-    else:
-        return "General Civic Issue", 0.65, "general"
-
-
-# ========================================
-# 2. SEVERITY & PRIORITY ENGINE
-# ========================================
-
-def detect_severity(confidence):
-    """Determines severity based on AI confidence score"""
-    if confidence >= 0.85:
-        return "High"
-    elif confidence >= 0.70:
-        return "Medium"
-    else:
-        return "Low"
-
-
-def assign_priority(issue_type, severity, category):
-    """
-    Assigns priority based on issue type, severity, and category.
-    This is the explainable AI component judges will appreciate.
-    """
-    
-    # Critical issues (immediate danger)
-    if issue_type == "Pothole" and severity == "High":
-        return "Critical", "24 hours"
-    
-    if issue_type == "Fallen Tree/Branch" and severity == "High":
-        return "Critical", "12 hours"
-    
-    # High priority (public health/safety)
-    if issue_type in ["Garbage Accumulation", "Drainage Issue"] and severity in ["High", "Medium"]:
-        return "High", "48 hours"
-    
-    if issue_type == "Broken Streetlight" and severity == "High":
-        return "High", "72 hours"
-    
-    # Medium priority
-    if severity == "Medium":
-        return "Medium", "7 days"
-    
-    # Low priority
-    return "Low", "14 days"
-
-
-def calculate_metrics(issue_type, confidence, location_data=None):
-    """Complete analysis of the reported issue"""
-    severity = detect_severity(confidence)
-    priority, timeline = assign_priority(issue_type, severity, issue_type)
-    
-    return {
-        "issue_type": issue_type,
-        "confidence": round(confidence * 100, 1),
-        "severity": severity,
-        "priority": priority,
-        "expected_resolution": timeline,
-        "category": classify_issue(issue_type)[2],
-        "timestamp": datetime.now().strftime("%d %B %Y, %I:%M %p")
-    }
-
-
-# ========================================
-# 3. USER FEEDBACK GENERATION
-# ========================================
-
-def generate_user_feedback(issue_type, priority, confidence):
-    """Generates instant user-friendly feedback"""
-    
-    confidence_pct = int(confidence * 100)
-    
-    if priority == "Critical":
-        emoji = "🚨"
-        message = f"{emoji} {issue_type} detected ({confidence_pct}% confidence). CRITICAL PRIORITY - Immediate attention required!"
-        action = "Your report has been flagged for emergency response."
-    
-    elif priority == "High":
-        emoji = "⚠️"
-        message = f"{emoji} {issue_type} detected ({confidence_pct}% confidence). High priority issue logged."
-        action = "Authorities will be notified within 24 hours."
-    
-    elif priority == "Medium":
-        emoji = "ℹ️"
-        message = f"{emoji} {issue_type} detected ({confidence_pct}% confidence). Your report is being reviewed."
-        action = "Expected resolution within 7 days."
-    
-    else:
-        emoji = "✅"
-        message = f"{emoji} {issue_type} detected ({confidence_pct}% confidence). Thank you for reporting."
-        action = "This will be addressed in the next maintenance cycle."
-    
-    return {
-        "message": message,
-        "action": action,
-        "emoji": emoji
-    }
-
-
-# ========================================
-# 4. COMPLAINT GENERATION (NLP-LIKE)
-# ========================================
-
-def generate_complaint(issue_type, location, severity, priority, timeline, confidence, timestamp):
-    """
-    Auto-generates formal complaint using template-based NLP.
-    No manual typing needed - fully automated.
-    """
-    
-    # Issue-specific descriptions
-    descriptions = {
-        "Pothole": "A significant road surface damage (pothole) has been detected, posing a risk to vehicular safety and pedestrian movement",
-        "Garbage Accumulation": "Unsanitary waste accumulation has been identified, creating potential health hazards and environmental concerns",
-        "Broken Streetlight": "Non-functional street lighting infrastructure has been observed, compromising public safety during nighttime",
-        "Drainage Issue": "A drainage system malfunction has been reported, with potential for waterlogging and sanitation issues",
-        "Damaged Property": "Public property damage has been identified, requiring maintenance intervention",
-        "Fallen Tree/Branch": "A fallen tree or large branch has been detected, creating an obstruction and potential safety hazard"
-    }
-    
-    description = descriptions.get(issue_type, f"A civic infrastructure issue ({issue_type}) has been identified requiring administrative attention")
-    
-    # Generate formal complaint
-    complaint = f"""
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-                    AUTOMATED CIVIC ISSUE REPORT
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-
-To: Municipal Corporation / Public Works Department
-Subject: [{priority.upper()} PRIORITY] Civic Infrastructure Issue Report
-
-Dear Sir/Madam,
-
-{description}.
-
-📍 LOCATION DETAILS:
-   Address: {location.get('address', 'Location captured via GPS')}
-   Coordinates: {location.get('lat', '17.3850')}°N, {location.get('lng', '78.4867')}°E
-   Ward/Zone: {location.get('ward', 'Auto-detected')}
-
-🔍 ISSUE ANALYSIS:
-   • Issue Type: {issue_type}
-   • Severity Level: {severity}
-   • Priority Classification: {priority}
-   • AI Confidence Score: {int(confidence * 100)}%
-   • Detection Timestamp: {timestamp}
-
-⚠️ RECOMMENDED ACTION:
-   Suggested Resolution Timeline: {timeline}
-   Department: {get_responsible_department(issue_type)}
-
-📊 REPORT METADATA:
-   Report ID: #{generate_report_id()}
-   Reporting Method: AI-Powered Mobile Application
-   Status: PENDING REVIEW
-
-This report has been automatically generated and submitted through the 
-AI Civic Issue Reporting System. The issue has been verified using 
-computer vision and prioritized based on severity assessment algorithms.
-
-For verification or additional information, please refer to the attached 
-image evidence and geolocation data.
-
-Respectfully submitted,
-A Concerned Citizen (via AI Civic Reporting System)
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-                Generated on: {timestamp}
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-"""
-    
-    return complaint.strip()
-
-
-def get_responsible_department(issue_type):
-    """Maps issue types to responsible departments"""
-    dept_mapping = {
-        "Pothole": "Roads & Highways Department",
-        "Garbage Accumulation": "Sanitation & Waste Management",
-        "Broken Streetlight": "Electrical & Lighting Department",
-        "Drainage Issue": "Water Works & Drainage",
-        "Damaged Property": "Public Works Department",
-        "Fallen Tree/Branch": "Horticulture Department"
-    }
-    return dept_mapping.get(issue_type, "General Administration")
-
-
-def generate_report_id():
-    """Generates unique report ID"""
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    return f"CIV{timestamp}"
-
-
-# ========================================
-# 5. LOCATION SERVICES (SIMULATED)
-# ========================================
-
-def get_location_data(simulate=True):
-    """
-    Simulates GPS location capture.
-    In production, this uses Browser Geolocation API.
-    """
-    if simulate:
-        # Simulated location (Hyderabad area)
-        return {
-            "lat": 17.3850,
-            "lng": 78.4867,
-            "address": "Rajiv Gandhi International Airport Road, Shamshabad, Hyderabad",
-            "ward": "Ward 12, Zone 3",
-            "accuracy": "±10 meters"
-        }
-    else:
-        # In real implementation, this would call browser API
-        return {"lat": None, "lng": None, "address": "Location access required"}
-
-
-# ========================================
-# 6. MAIN REPORTING WORKFLOW
-# ========================================
-
-def process_civic_report(image_filename, custom_location=None):
-    """
-    Complete end-to-end workflow for processing a civic issue report.
-    This is what gets called when a user uploads an image.
-    """
-    
-    print("=" * 70)
-    print("🚀 AI CIVIC ISSUE REPORTING SYSTEM - PROCESSING REPORT")
-    print("=" * 70)
-    
-    # Step 1: Image Classification (Simulated AI)
-    print(f"\n📸 Analyzing image: {image_filename}")
-    issue_type, confidence, category = classify_issue(image_filename)
-    print(f"✅ Detected: {issue_type} (Confidence: {confidence*100:.1f}%)")
-    
-    # Step 2: Location Capture
-    print("\n📍 Capturing location data...")
-    location = custom_location or get_location_data(simulate=True)
-    print(f"✅ Location: {location['address']}")
-    
-    # Step 3: Severity & Priority Analysis
-    print("\n🔍 Analyzing severity and priority...")
-    metrics = calculate_metrics(issue_type, confidence, location)
-    print(f"✅ Severity: {metrics['severity']} | Priority: {metrics['priority']}")
-    
-    # Step 4: Generate User Feedback
-    feedback = generate_user_feedback(issue_type, metrics['priority'], confidence)
-    print(f"\n{feedback['message']}")
-    print(f"   {feedback['action']}")
-    
-    # Step 5: Generate Formal Complaint
-    print("\n📝 Generating formal complaint...")
-    complaint = generate_complaint(
-        issue_type=issue_type,
-        location=location,
-        severity=metrics['severity'],
-        priority=metrics['priority'],
-        timeline=metrics['expected_resolution'],
-        confidence=confidence,
-        timestamp=metrics['timestamp']
-    )
-    
-    # Step 6: Create Report Summary
-    report = {
-        "report_id": generate_report_id(),
-        "timestamp": metrics['timestamp'],
-        "image": image_filename,
-        "issue": {
-            "type": issue_type,
-            "category": category,
-            "confidence": metrics['confidence'],
-            "severity": metrics['severity'],
-            "priority": metrics['priority']
-        },
-        "location": location,
-        "resolution_timeline": metrics['expected_resolution'],
-        "department": get_responsible_department(issue_type),
-        "user_feedback": feedback,
-        "complaint": complaint
-    }
-    
-    return report
-
-
-def display_report(report):
-    """Pretty print the complete report"""
-    print("\n" + "=" * 70)
-    print("📊 COMPLETE REPORT SUMMARY")
-    print("=" * 70)
-    
-    print(f"\n🆔 Report ID: {report['report_id']}")
-    print(f"⏰ Timestamp: {report['timestamp']}")
-    print(f"📸 Image: {report['image']}")
-    
-    print(f"\n🔍 ISSUE DETAILS:")
-    print(f"   Type: {report['issue']['type']}")
-    print(f"   Category: {report['issue']['category']}")
-    print(f"   Confidence: {report['issue']['confidence']}%")
-    print(f"   Severity: {report['issue']['severity']}")
-    print(f"   Priority: {report['issue']['priority']}")
-    
-    print(f"\n📍 LOCATION:")
-    print(f"   {report['location']['address']}")
-    print(f"   Coordinates: {report['location']['lat']}, {report['location']['lng']}")
-    
-    print(f"\n⏱️  Expected Resolution: {report['resolution_timeline']}")
-    print(f"🏢 Responsible Department: {report['department']}")
-    
-    print(f"\n💬 USER FEEDBACK:")
-    print(f"   {report['user_feedback']['message']}")
-    print(f"   {report['user_feedback']['action']}")
-    
-    print("\n" + "=" * 70)
-    print("📄 FORMAL COMPLAINT (AUTO-GENERATED)")
-    print("=" * 70)
-    print(report['complaint'])
-    
-    print("\n" + "=" * 70)
-    print("✅ Report processing complete!")
-    print("=" * 70)
-
-
-# ========================================
-# 7. API-READY FUNCTIONS FOR BACKEND
-# ========================================
-
-def get_report_json(image_filename, custom_location=None):
-    """
-    Returns report as JSON-serializable dictionary.
-    Perfect for FastAPI backend integration.
-    """
-    report = process_civic_report(image_filename, custom_location)
-    return report
-
-
-def get_complaint_text(image_filename, custom_location=None):
-    """
-    Returns only the complaint text.
-    Use this if backend only needs the complaint.
-    """
-    report = process_civic_report(image_filename, custom_location)
-    return report['complaint']
-
-
-def quick_classify(image_filename):
-    """
-    Quick classification without full report generation.
-    Use for real-time preview/feedback.
-    """
-    issue_type, confidence, category = classify_issue(image_filename)
-    severity = detect_severity(confidence)
-    priority, timeline = assign_priority(issue_type, severity, category)
-    
-    return {
-        "issue_type": issue_type,
-        "confidence": round(confidence * 100, 1),
-        "severity": severity,
-        "priority": priority,
-        "timeline": timeline
-    }
-
-
-# ========================================
-# 8. EXPORT FUNCTIONS
-# ========================================
-
-def save_report_json(report, filename="report.json"):
-    """Save report as JSON file"""
-    with open(filename, 'w') as f:
-        json.dump(report, f, indent=2)
-    print(f"✅ Report saved to {filename}")
-
-
-def save_complaint_text(report, filename="complaint.txt"):
-    """Save complaint as text file"""
-    with open(filename, 'w') as f:
-        f.write(report['complaint'])
-    print(f"✅ Complaint saved to {filename}")
-
-
-# ========================================
-# MAIN EXECUTION
-# ========================================
-
-if __name__ == "__main__":
-    """
-    Usage Examples:
-    
-    # Example 1: Get full report as JSON
-    report = get_report_json("pothole_road.jpg")
-    print(json.dumps(report, indent=2))
-    
-    # Example 2: Get only complaint text
-    complaint = get_complaint_text("garbage_dump.jpg")
-    print(complaint)
-    
-    # Example 3: Quick classification
-    result = quick_classify("streetlight_broken.jpg")
-    print(result)
-    
-    # Example 4: Process and display
-    report = process_civic_report("pothole_road.jpg")
-    display_report(report)
-    save_report_json(report)
-    save_complaint_text(report)
-    """
-    
-    # Test with a sample image
-    print("🚀 AI Civic Issue Reporter - Ready for Backend Integration\n")
-    print("Testing with sample image...\n")
-    
-    # Quick test
-    result = quick_classify("pothole_main_road.jpg")
-    print("Quick Classification Result:")
-    print(json.dumps(result, indent=2))
-    print("\n✅ System is ready to connect with FastAPI backend!")
+"""
+AI CIVIC ISSUE REPORTING SYSTEM
+Complete implementation with simulated AI logic
+For SUDHEE 2026 CBIT Hackathon - Blushy Tech Team
+"""
+
+from datetime import datetime
+from functools import lru_cache
+from string import Formatter
+import json
+import os
+
+from observability import METRICS, logger
+from report_ids import new_report_id
+from rules import RULES
+from wards import WARDS
+
+
+# ========================================
+# 1. SIMULATED AI CLASSIFICATION
+# ========================================
+
+# Keyword table, in precedence order: the first keyword (row by row) that
+# appears anywhere in the filename wins, exactly like an if/elif chain.
+CLASSIFICATION_RULES = [
+    (("pothole", "road", "crack", "damage"), "Pothole", 0.92, "road_infrastructure"),
+    (("garbage", "trash", "waste", "dump"), "Garbage Accumulation", 0.88, "sanitation"),
+    (("streetlight", "light", "lamp", "bulb"), "Broken Streetlight", 0.85, "lighting"),
+    (("drain", "water", "overflow", "flood"), "Drainage Issue", 0.79, "drainage"),
+    (("wall", "paint", "graffiti"), "Damaged Property", 0.76, "property"),
+    (("tree", "branch", "fallen"), "Fallen Tree/Branch", 0.82, "vegetation"),
+]
+
+DEFAULT_CLASSIFICATION = ("General Civic Issue", 0.65, "general")
+
+CLASSIFY_CACHE_SIZE = 65536
+
+
+def _build_classifier(rules):
+    """
+    Flattens the keyword table into (keyword, result) pairs in precedence
+    order. Matching is a C-level substring search per keyword, which beats a
+    combined regex here: CPython's re engine retries every alternative at
+    every position, while `in` skips ahead with a fast search.
+    """
+    keywords = []
+    for keyword_group, issue_type, confidence, category in rules:
+        result = (issue_type, confidence, category)
+        keywords.extend((keyword, result) for keyword in keyword_group)
+    return tuple(keywords)
+
+
+_KEYWORDS = _build_classifier(CLASSIFICATION_RULES)
+
+
+def _match_keywords(image_name):
+    """First-match keyword lookup on one filename"""
+    name = image_name.lower()
+    for keyword, result in _KEYWORDS:
+        if keyword in name:
+            return result
+    return DEFAULT_CLASSIFICATION
+
+
+@lru_cache(maxsize=CLASSIFY_CACHE_SIZE)
+def _classify_name(image_name):
+    """Memoized (bounded) keyword match for the request path"""
+    return _match_keywords(image_name)
+
+
+def classify_issue(image_name, image_path=None):
+    """
+    Simulates AI-based image classification using filename patterns.
+    In production, this would use a trained MobileNet/ResNet model.
+    
+    Returns: (issue_type, confidence, category)
+    """
+    return _classify_name(image_name)
+
+
+def classify_many(image_names):
+    """
+    Batch classification for backlog re-imports.
+    Repeated names are classified once; the shared request-path cache is
+    bypassed so a large backlog does not evict it.
+    Returns a list of (issue_type, confidence, category) in input order.
+    """
+    results = {}
+    for name in image_names:
+        if name not in results:
+            results[name] = _match_keywords(name)
+    return [results[name] for name in image_names]
+
+
+# Category per issue type, resolved once instead of re-classifying the
+# issue type name on every calculate_metrics() call.
+_ISSUE_CATEGORIES = {
+    issue_type: _match_keywords(issue_type)[2]
+    for issue_type in [rule[1] for rule in CLASSIFICATION_RULES] + [DEFAULT_CLASSIFICATION[0]]
+}
+
+
+# ========================================
+# 2. SEVERITY & PRIORITY ENGINE
+# ========================================
+# Thresholds and rules come from the versioned decision table
+# (config/decision_table.json, see rules.py).
+
+def detect_severity(confidence):
+    """Determines severity based on AI confidence score"""
+    return RULES.severity(confidence)
+
+
+def assign_priority(issue_type, severity, category):
+    """
+    Assigns priority based on issue type, severity, and category.
+    This is the explainable AI component judges will appreciate.
+    """
+    return RULES.priority(issue_type, severity)
+
+
+def calculate_metrics(issue_type, confidence, location_data=None):
+    """Complete analysis of the reported issue"""
+    severity = detect_severity(confidence)
+    priority, timeline = assign_priority(issue_type, severity, issue_type)
+    
+    return {
+        "issue_type": issue_type,
+        "confidence": round(confidence * 100, 1),
+        "severity": severity,
+        "priority": priority,
+        "expected_resolution": timeline,
+        "category": _ISSUE_CATEGORIES.get(issue_type) or classify_issue(issue_type)[2],
+        "timestamp": datetime.now().strftime("%d %B %Y, %I:%M %p")
+    }
+
+
+# ========================================
+# 3. USER FEEDBACK GENERATION
+# ========================================
+
+def generate_user_feedback(issue_type, priority, confidence):
+    """Generates instant user-friendly feedback"""
+    
+    confidence_pct = int(confidence * 100)
+    
+    if priority == "Critical":
+        emoji = "🚨"
+        message = f"{emoji} {issue_type} detected ({confidence_pct}% confidence). CRITICAL PRIORITY - Immediate attention required!"
+        action = "Your report has been flagged for emergency response."
+    
+    elif priority == "High":
+        emoji = "⚠️"
+        message = f"{emoji} {issue_type} detected ({confidence_pct}% confidence). High priority issue logged."
+        action = "Authorities will be notified within 24 hours."
+    
+    elif priority == "Medium":
+        emoji = "ℹ️"
+        message = f"{emoji} {issue_type} detected ({confidence_pct}% confidence). Your report is being reviewed."
+        action = "Expected resolution within 7 days."
+    
+    else:
+        emoji = "✅"
+        message = f"{emoji} {issue_type} detected ({confidence_pct}% confidence). Thank you for reporting."
+        action = "This will be addressed in the next maintenance cycle."
+    
+    return {
+        "message": message,
+        "action": action,
+        "emoji": emoji
+    }
+
+
+# ========================================
+# 4. COMPLAINT GENERATION (NLP-LIKE)
+# ========================================
+
+# Issue-specific descriptions
+ISSUE_DESCRIPTIONS = {
+    "Pothole": "A significant road surface damage (pothole) has been detected, posing a risk to vehicular safety and pedestrian movement",
+    "Garbage Accumulation": "Unsanitary waste accumulation has been identified, creating potential health hazards and environmental concerns",
+    "Broken Streetlight": "Non-functional street lighting infrastructure has been observed, compromising public safety during nighttime",
+    "Drainage Issue": "A drainage system malfunction has been reported, with potential for waterlogging and sanitation issues",
+    "Damaged Property": "Public property damage has been identified, requiring maintenance intervention",
+    "Fallen Tree/Branch": "A fallen tree or large branch has been detected, creating an obstruction and potential safety hazard"
+}
+
+DEPARTMENTS = RULES.departments
+
+COMPLAINT_TEMPLATE = """
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+                    AUTOMATED CIVIC ISSUE REPORT
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+To: Municipal Corporation / Public Works Department
+Subject: [{priority_upper} PRIORITY] Civic Infrastructure Issue Report
+
+Dear Sir/Madam,
+
+{description}.
+
+📍 LOCATION DETAILS:
+   Address: {address}
+   Coordinates: {lat}°N, {lng}°E
+   Ward/Zone: {ward}
+
+🔍 ISSUE ANALYSIS:
+   • Issue Type: {issue_type}
+   • Severity Level: {severity}
+   • Priority Classification: {priority}
+   • AI Confidence Score: {confidence_pct}%
+   • Detection Timestamp: {timestamp}
+
+⚠️ RECOMMENDED ACTION:
+   Suggested Resolution Timeline: {timeline}
+   Department: {department}
+
+📊 REPORT METADATA:
+   Report ID: #{report_id}
+   Reporting Method: AI-Powered Mobile Application
+   Status: PENDING REVIEW
+
+This report has been automatically generated and submitted through the 
+AI Civic Issue Reporting System. The issue has been verified using 
+computer vision and prioritized based on severity assessment algorithms.
+
+For verification or additional information, please refer to the attached 
+image evidence and geolocation data.
+
+Respectfully submitted,
+A Concerned Citizen (via AI Civic Reporting System)
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+                Generated on: {timestamp}
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+""".strip()
+
+
+class _KeepMissing(dict):
+    """format_map() helper that leaves unknown placeholders in place"""
+
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+
+def _escape_braces(value):
+    return value.replace("{", "{{").replace("}", "}}")
+
+
+@lru_cache(maxsize=256)
+def _complaint_template(issue_type):
+    """
+    Complaint template with the per-issue-type constants (description,
+    department, issue type) already filled in; compiled once per type.
+    """
+    description = ISSUE_DESCRIPTIONS.get(
+        issue_type,
+        f"A civic infrastructure issue ({issue_type}) has been identified requiring administrative attention"
+    )
+    return COMPLAINT_TEMPLATE.format_map(_KeepMissing(
+        description=_escape_braces(description),
+        department=_escape_braces(get_responsible_department(issue_type)),
+        issue_type=_escape_braces(issue_type),
+    ))
+
+
+@lru_cache(maxsize=256)
+def _complaint_parts(issue_type):
+    """
+    The issue type's template split once into (constant text, placeholder)
+    pairs, so rendering joins the boilerplate instead of re-parsing it
+    with format() for every complaint.
+    """
+    return tuple(
+        (literal, field) for literal, field, _spec, _conversion in Formatter().parse(_complaint_template(issue_type))
+    )
+
+
+def generate_complaint(issue_type, location, severity, priority, timeline, confidence, timestamp,
+                       report_id=None):
+    """
+    Auto-generates formal complaint using template-based NLP.
+    No manual typing needed - fully automated.
+    Pass the report's `report_id` so the complaint quotes the same ID.
+    """
+    values = {
+        "priority_upper": priority.upper(),
+        "address": location.get('address', 'Location captured via GPS'),
+        "lat": location.get('lat', '17.3850'),
+        "lng": location.get('lng', '78.4867'),
+        "ward": location.get('ward') or 'Not determined',
+        "severity": severity,
+        "priority": priority,
+        "confidence_pct": int(confidence * 100),
+        "timestamp": timestamp,
+        "timeline": timeline,
+        "report_id": report_id or generate_report_id(),
+    }
+    parts = []
+    for literal, field in _complaint_parts(issue_type):
+        parts.append(literal)
+        if field is not None:
+            parts.append(str(values[field]))
+    return "".join(parts)
+
+
+def get_responsible_department(issue_type):
+    """Maps issue types to responsible departments"""
+    return RULES.department(issue_type)
+
+
+def generate_report_id():
+    """Generates unique, time-sortable report ID (see report_ids.py)"""
+    return new_report_id()
+
+
+# ========================================
+# 5. LOCATION SERVICES (SIMULATED)
+# ========================================
+
+def get_location_data(simulate=True):
+    """
+    Simulates GPS location capture.
+    In production, this uses Browser Geolocation API.
+    """
+    if simulate:
+        # Simulated location (Hyderabad area)
+        return {
+            "lat": 17.3850,
+            "lng": 78.4867,
+            "address": "Rajiv Gandhi International Airport Road, Shamshabad, Hyderabad",
+            "ward": WARDS.resolve(17.3850, 78.4867),
+            "accuracy": "±10 meters"
+        }
+    else:
+        # In real implementation, this would call browser API
+        return {"lat": None, "lng": None, "address": "Location access required"}
+
+
+# ========================================
+# 6. MAIN REPORTING WORKFLOW
+# ========================================
+
+REPORT_FIELDS = (
+    "report_id", "timestamp", "image", "issue", "location",
+    "resolution_timeline", "department", "user_feedback", "complaint"
+)
+
+
+class CivicReport:
+    """
+    A processed report. Classification, severity and priority are computed
+    up front; the department, user feedback and formal complaint are only
+    rendered when first accessed, so callers that need a few fields never
+    pay for the full complaint text.
+    """
+
+    __slots__ = (
+        "report_id", "timestamp", "image", "issue_type", "confidence", "category",
+        "location", "location_simulated", "severity", "priority", "timeline",
+        "_department", "_feedback", "_complaint"
+    )
+
+    def __init__(self, image_filename, location, classification, report_id=None, timestamp=None):
+        self.issue_type, self.confidence, self.category = classification
+        self.image = image_filename
+        self.location = location
+        # True when `location` is the simulated fallback, not the reporter's
+        self.location_simulated = False
+        self.report_id = report_id or generate_report_id()
+        self.timestamp = timestamp or datetime.now().strftime("%d %B %Y, %I:%M %p")
+        with METRICS.stage("metrics"):
+            self.severity = detect_severity(self.confidence)
+            self.priority, self.timeline = assign_priority(self.issue_type, self.severity, self.category)
+        self._department = None
+        self._feedback = None
+        self._complaint = None
+
+    @property
+    def department(self):
+        if self._department is None:
+            self._department = get_responsible_department(self.issue_type)
+        return self._department
+
+    @property
+    def user_feedback(self):
+        if self._feedback is None:
+            with METRICS.stage("feedback"):
+                self._feedback = generate_user_feedback(self.issue_type, self.priority, self.confidence)
+        return self._feedback
+
+    @property
+    def complaint(self):
+        if self._complaint is None:
+            with METRICS.stage("complaint"):
+                self._complaint = generate_complaint(
+                    issue_type=self.issue_type,
+                    location=self.location,
+                    severity=self.severity,
+                    priority=self.priority,
+                    timeline=self.timeline,
+                    confidence=self.confidence,
+                    timestamp=self.timestamp,
+                    report_id=self.report_id
+                )
+        return self._complaint
+
+    @property
+    def issue(self):
+        return {
+            "type": self.issue_type,
+            "category": self.category,
+            "confidence": round(self.confidence * 100, 1),
+            "severity": self.severity,
+            "priority": self.priority
+        }
+
+    def get(self, field):
+        """Value of one top-level report field"""
+        if field == "resolution_timeline":
+            return self.timeline
+        return getattr(self, field)
+
+    def to_dict(self, fields=None):
+        """
+        JSON-serializable report. `fields` limits the output (and the work
+        done) to the named top-level fields; report_id is always included.
+        """
+        if fields is None:
+            fields = REPORT_FIELDS
+        report = {"report_id": self.report_id}
+        for field in fields:
+            if field != "report_id":
+                report[field] = self.get(field)
+        return report
+
+
+def parse_report_fields(value):
+    """
+    Parses a comma-separated `fields=` selection.
+    Returns a tuple of field names, or None for "all fields".
+    Raises ValueError on unknown names.
+    """
+    if not value:
+        return None
+    fields = tuple(dict.fromkeys(f.strip() for f in value.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in REPORT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown report fields: {', '.join(unknown)}. Valid fields: {', '.join(REPORT_FIELDS)}")
+    return fields or None
+
+
+def build_report(image_filename, custom_location=None, classification=None, report_id=None):
+    """
+    Builds a CivicReport without rendering the complaint or feedback.
+    Without `custom_location` the report gets the simulated location and
+    is marked `location_simulated`, so it is never stored as real.
+    """
+    if classification is None:
+        with METRICS.stage("classification"):
+            classification = classify_issue(image_filename)
+    report = CivicReport(
+        image_filename,
+        custom_location or get_location_data(simulate=True),
+        classification,
+        report_id
+    )
+    report.location_simulated = not custom_location
+    return report
+
+
+def process_civic_report(image_filename, custom_location=None, classification=None, report_id=None):
+    """
+    Complete end-to-end workflow for processing a civic issue report.
+    This is what gets called when a user uploads an image.
+    Pass `classification` (issue_type, confidence, category) to reuse a
+    cached result instead of classifying again, and `report_id` when the
+    caller has already reserved an ID.
+    """
+    
+    # Steps 1-3: Classification, location, severity & priority
+    report = build_report(image_filename, custom_location, classification, report_id)
+    
+    # Steps 4-6: User feedback, formal complaint and report summary
+    data = report.to_dict()
+    
+    logger.debug(
+        "Processed report",
+        extra={
+            "report_id": report.report_id,
+            "image": image_filename,
+            "issue_type": report.issue_type,
+            "confidence": report.confidence,
+            "severity": report.severity,
+            "priority": report.priority,
+        }
+    )
+    return data
+
+
+def display_report(report):
+    """Pretty print the complete report"""
+    print("\n" + "=" * 70)
+    print("📊 COMPLETE REPORT SUMMARY")
+    print("=" * 70)
+    
+    print(f"\n🆔 Report ID: {report['report_id']}")
+    print(f"⏰ Timestamp: {report['timestamp']}")
+    print(f"📸 Image: {report['image']}")
+    
+    print(f"\n🔍 ISSUE DETAILS:")
+    print(f"   Type: {report['issue']['type']}")
+    print(f"   Category: {report['issue']['category']}")
+    print(f"   Confidence: {report['issue']['confidence']}%")
+    print(f"   Severity: {report['issue']['severity']}")
+    print(f"   Priority: {report['issue']['priority']}")
+    
+    print(f"\n📍 LOCATION:")
+    print(f"   {report['location']['address']}")
+    print(f"   Coordinates: {report['location']['lat']}, {report['location']['lng']}")
+    
+    print(f"\n⏱️  Expected Resolution: {report['resolution_timeline']}")
+    print(f"🏢 Responsible Department: {report['department']}")
+    
+    print(f"\n💬 USER FEEDBACK:")
+    print(f"   {report['user_feedback']['message']}")
+    print(f"   {report['user_feedback']['action']}")
+    
+    print("\n" + "=" * 70)
+    print("📄 FORMAL COMPLAINT (AUTO-GENERATED)")
+    print("=" * 70)
+    print(report['complaint'])
+    
+    print("\n" + "=" * 70)
+    print("✅ Report processing complete!")
+    print("=" * 70)
+
+
+# ========================================
+# 7. API-READY FUNCTIONS FOR BACKEND
+# ========================================
+
+def get_report_json(image_filename, custom_location=None, classification=None, report_id=None,
+                    fields=None):
+    """
+    Returns report as JSON-serializable dictionary.
+    Perfect for FastAPI backend integration.
+    Pass `fields` to build only some top-level fields (see REPORT_FIELDS).
+    """
+    report = build_report(image_filename, custom_location, classification, report_id)
+    return report.to_dict(fields)
+
+
+def get_complaint_text(image_filename, custom_location=None, classification=None):
+    """
+    Returns only the complaint text.
+    Use this if backend only needs the complaint.
+    """
+    report = build_report(image_filename, custom_location, classification)
+    return report.complaint
+
+
+def quick_classify(image_filename, classification=None):
+    """
+    Quick classification without full report generation.
+    Use for real-time preview/feedback.
+    """
+    issue_type, confidence, category = classification or classify_issue(image_filename)
+    severity = detect_severity(confidence)
+    priority, timeline = assign_priority(issue_type, severity, category)
+    
+    return {
+        "issue_type": issue_type,
+        "confidence": round(confidence * 100, 1),
+        "severity": severity,
+        "priority": priority,
+        "timeline": timeline
+    }
+
+
+# ========================================
+# 8. EXPORT FUNCTIONS
+# ========================================
+
+def save_report_json(report, filename="report.json"):
+    """Save report as JSON file"""
+    with open(filename, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info("Report saved", extra={"path": filename})
+
+
+def save_complaint_text(report, filename="complaint.txt"):
+    """Save complaint as text file"""
+    with open(filename, 'w') as f:
+        f.write(report['complaint'])
+    logger.info("Complaint saved", extra={"path": filename})
+
+
+# ========================================
+# MAIN EXECUTION
+# ========================================
+
+if __name__ == "__main__":
+    """
+    Usage Examples:
+    
+    # Example 1: Get full report as JSON
+    report = get_report_json("pothole_road.jpg")
+    print(json.dumps(report, indent=2))
+    
+    # Example 2: Get only complaint text
+    complaint = get_complaint_text("garbage_dump.jpg")
+    print(complaint)
+    
+    # Example 3: Quick classification
+    result = quick_classify("streetlight_broken.jpg")
+    print(result)
+    
+    # Example 4: Process and display
+    report = process_civic_report("pothole_road.jpg")
+    display_report(report)
+    save_report_json(report)
+    save_complaint_text(report)
+    """
+    
+    # Test with a sample image
+    print("🚀 AI Civic Issue Reporter - Ready for Backend Integration\n")
+    print("Testing with sample image...\n")
+    
+    # Quick test
+    result = quick_classify("pothole_main_road.jpg")
+    print("Quick Classification Result:")
+    print(json.dumps(result, indent=2))
+    print("\n✅ System is ready to connect with FastAPI backend!")
     print("📝 See usage examples in the code comments above.")
\ No newline at end of file
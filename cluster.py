@@ -0,0 +1,240 @@
+"""
+Cross-worker coordination for the multi-worker server (server.py).
+
+Each forked worker is a separate process with its own in-memory state.
+server.py sets CIVIC_WORKERS and CIVIC_RUNTIME_DIR, a directory private
+to one server instance, and the workers share through it:
+
+  - metrics: every worker writes its registry dump to
+    metrics-<pid>.json every CIVIC_METRICS_SYNC_INTERVAL seconds; /metrics
+    sums the live workers' dumps, so counters and gauges cover the server
+    instead of whichever worker answered
+  - events: every worker binds a Unix datagram socket events-<pid>.sock;
+    EVENT_BUS relays each published frame to the other workers, so an SSE
+    client sees changes made through any worker
+  - report IDs: the launcher gives every worker it forks a distinct ID
+    worker component (report_ids.set_worker_id), never reused while the
+    launcher runs
+  - control messages: named commands with a JSON payload, sent over the
+    same sockets: "reload" after an offline job (rescore.py) rewrote
+    tables that the workers cache, and the duplicate index's adds and
+    removals (see WorkerCluster.on_control)
+  - worker count: admission limits are configured per server and split
+    between the live workers (see WorkerCluster.on_resize)
+
+Statistics and dispatch queues are reconciled with their tables instead,
+on short intervals (see StatsCounters.reload_interval and
+DispatchQueue.refresh_interval). With a single worker none of this runs.
+"""
+
+from pathlib import Path
+import json
+import os
+import socket
+import threading
+
+from events import EVENT_BUS
+from observability import METRICS, MetricsRegistry, logger
+
+
+RUNTIME_DIR = os.environ.get("CIVIC_RUNTIME_DIR")
+WORKERS = int(os.environ.get("CIVIC_WORKERS", 1))
+METRICS_SYNC_INTERVAL = float(os.environ.get("CIVIC_METRICS_SYNC_INTERVAL", 2))
+
+MAX_DATAGRAM = 60000
+_TOPIC_SEPARATOR = b"\x1f"
+_FRAME_SEPARATOR = b"\x1e"
+_CONTROL_PREFIX = b"\x00"
+
+
+def clustered():
+    """True inside a worker of a multi-worker server"""
+    return bool(RUNTIME_DIR) and WORKERS > 1
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class WorkerCluster:
+    """This worker's view of its siblings (one per process)"""
+
+    def __init__(self, runtime_dir=RUNTIME_DIR, sync_interval=METRICS_SYNC_INTERVAL):
+        self.runtime_dir = Path(runtime_dir) if runtime_dir else None
+        self.sync_interval = sync_interval
+        self.pid = None
+        self._socket = None
+        self._sender = None
+        self._stop = threading.Event()
+        self._threads = []
+        self._handlers = {}
+        self._resize_handlers = []
+        self.size = 1
+
+    def _path(self, kind, pid, suffix):
+        return self.runtime_dir / f"{kind}-{pid}{suffix}"
+
+    def start(self):
+        """Call in each worker after fork (app startup)"""
+        if self.runtime_dir is None:
+            return
+        self.pid = os.getpid()
+        self.size = WORKERS
+        self._stop.clear()
+
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(str(self._path("events", self.pid, ".sock")))
+        # Sends never block: a peer with a full buffer misses the event
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+        EVENT_BUS.relay = self.broadcast
+
+        for target, name in ((self._receive_events, "cluster-events"), (self._sync_metrics, "cluster-metrics")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Worker joined cluster", extra={"pid": self.pid, "runtime_dir": str(self.runtime_dir)})
+
+    def stop(self):
+        if self.pid is None:
+            return
+        self._stop.set()
+        EVENT_BUS.relay = None
+        for path in (self._path("events", self.pid, ".sock"), self._path("metrics", self.pid, ".json")):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        self._socket.close()
+        self._sender.close()
+        self.pid = None
+
+    # ---- events ----
+
+    def _peers(self, kind, suffix):
+        for path in self.runtime_dir.glob(f"{kind}-*{suffix}"):
+            pid = int(path.name[len(kind) + 1:-len(suffix)])
+            if pid != self.pid:
+                yield pid, path
+
+    def broadcast(self, topics, frame):
+        """Sends an encoded event frame to every other worker (any thread)"""
+        self._send(_TOPIC_SEPARATOR.join(topic.encode("utf-8") for topic in topics) + _FRAME_SEPARATOR + frame)
+
+    def _send(self, message):
+        if self.pid is None:
+            return
+        if len(message) > MAX_DATAGRAM:
+            METRICS.inc("civic_cluster_events_dropped_total", reason="too_large")
+            return
+        for pid, path in self._peers("events", ".sock"):
+            try:
+                self._sender.sendto(message, str(path))
+            except (ConnectionRefusedError, FileNotFoundError):
+                if not _alive(pid):
+                    path.unlink(missing_ok=True)
+            except (BlockingIOError, OSError):
+                METRICS.inc("civic_cluster_events_dropped_total", reason="peer_busy")
+
+    def _receive_events(self):
+        while not self._stop.is_set():
+            try:
+                message = self._socket.recv(MAX_DATAGRAM)
+            except OSError:
+                return  # socket closed at shutdown
+            if message.startswith(_CONTROL_PREFIX):
+                self._run_control(message[len(_CONTROL_PREFIX):])
+                continue
+            topics, _, frame = message.partition(_FRAME_SEPARATOR)
+            EVENT_BUS.deliver_threadsafe([topic.decode("utf-8") for topic in topics.split(_TOPIC_SEPARATOR)], frame)
+
+    # ---- control ----
+
+    def on_control(self, name, handler, inline=False):
+        """
+        Runs handler(data) in this worker whenever another worker sends
+        `name`. Handlers run on a thread of their own unless `inline`
+        (quick, non-blocking ones), which run on the receive thread.
+        """
+        self._handlers[name] = (handler, inline)
+
+    def send_control(self, name, data=None):
+        """Asks every other worker to run its `name` handler with `data` (JSON)"""
+        self._send(_CONTROL_PREFIX + name.encode("utf-8") + _TOPIC_SEPARATOR + json.dumps(data).encode("utf-8"))
+
+    def _run_control(self, message):
+        name, _, data = message.partition(_TOPIC_SEPARATOR)
+        name = name.decode("utf-8")
+        handler, inline = self._handlers.get(name, (None, False))
+        if handler is None:
+            logger.warning("Unknown cluster control message", extra={"control": name})
+            return
+
+        def run():
+            try:
+                handler(json.loads(data) if data else None)
+            except Exception:
+                logger.exception("Cluster control handler failed", extra={"control": name})
+
+        if inline:
+            run()
+        else:
+            # Off the receive thread, which must keep draining events
+            threading.Thread(target=run, name=f"cluster-{name}", daemon=True).start()
+
+    # ---- worker count ----
+
+    def on_resize(self, handler):
+        """Calls handler(live worker count) now and whenever it changes"""
+        self._resize_handlers.append(handler)
+        handler(self.size)
+
+    def _check_size(self):
+        size = 1 + sum(1 for pid, _path in self._peers("events", ".sock") if _alive(pid))
+        if size == self.size:
+            return
+        self.size = size
+        logger.info("Cluster size changed", extra={"workers": size})
+        for handler in self._resize_handlers:
+            handler(size)
+
+    # ---- metrics ----
+
+    def _sync_metrics(self):
+        while not self._stop.wait(self.sync_interval):
+            self.write_metrics()
+            self._check_size()
+
+    def write_metrics(self):
+        pid = self.pid
+        if pid is None or self._stop.is_set():
+            return
+        path = self._path("metrics", pid, ".json")
+        partial = path.with_suffix(".part")
+        partial.write_text(json.dumps(METRICS.dump()))
+        os.replace(partial, path)
+
+    def collect_metrics(self):
+        """Registry summing this worker's live metrics and the others' last dumps"""
+        if self.pid is None:
+            return METRICS
+        merged = MetricsRegistry()
+        merged.merge(METRICS.dump())
+        for pid, path in self._peers("metrics", ".json"):
+            if not _alive(pid):
+                path.unlink(missing_ok=True)
+                continue
+            try:
+                merged.merge(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue  # being replaced or removed
+        return merged
+
+
+CLUSTER = WorkerCluster(RUNTIME_DIR if clustered() else None)
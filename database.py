@@ -1,13 +1,95 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool
+
+DATABASE_URL = os.environ.get("CIVIC_DATABASE_URL", "sqlite:///./civic.db")
+
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+# DB endpoints are sync `def` routes, run on the server's worker threadpool
+# (resized to this at startup). Every thread may hold a session at once.
+THREADPOOL_SIZE = int(os.environ.get("CIVIC_THREADPOOL_SIZE", 40))
+# Background users of the pool: write-behind flusher, dispatch sweeps and
+# refreshes, stats reloads
+BACKGROUND_CONNECTIONS = 4
+
+# Pool sizing (per process). POOL_SIZE connections are kept open; overflow
+# covers the rest of the threadpool, so a request thread never waits for a
+# connection. Beyond POOL_SIZE + MAX_OVERFLOW, checkouts wait up to
+# POOL_TIMEOUT seconds.
+POOL_SIZE = int(os.environ.get("CIVIC_DB_POOL_SIZE", 10))
+MAX_OVERFLOW = int(os.environ.get(
+    "CIVIC_DB_MAX_OVERFLOW", max(0, THREADPOOL_SIZE + BACKGROUND_CONNECTIONS - POOL_SIZE)
+))
+POOL_TIMEOUT = float(os.environ.get("CIVIC_DB_POOL_TIMEOUT", 10))
+POOL_RECYCLE = int(os.environ.get("CIVIC_DB_POOL_RECYCLE", 1800))
+POOL_PRE_PING = os.environ.get("CIVIC_DB_POOL_PRE_PING", "1") == "1"
+# Compiled-SQL cache (SQLAlchemy)
+QUERY_CACHE_SIZE = int(os.environ.get("CIVIC_DB_QUERY_CACHE_SIZE", 1200))
+
+# "write_behind": reports are queued and group-committed in the background.
+# "sync": each submission waits for its own commit.
+DURABILITY = os.environ.get("CIVIC_DURABILITY", "write_behind")
+
+# NORMAL is safe with WAL (no corruption, last commits may roll back on power
+# loss); FULL makes every commit hit disk before returning.
+SQLITE_SYNCHRONOUS = os.environ.get(
+    "CIVIC_SQLITE_SYNCHRONOUS", "FULL" if DURABILITY == "sync" else "NORMAL"
+).upper()
+
+
+def _pool_options():
+    return {
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+        "query_cache_size": QUERY_CACHE_SIZE,
+    }
 
-DATABASE_URL = "sqlite:///./civic.db"
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-20000")
+    cursor.close()
+
+
+def create_db_engine(url=DATABASE_URL, **overrides):
+    """Engine with the configured pool; `overrides` replace pool options"""
+    options = _pool_options()
+    options.update(overrides)
+    sqlite = url.startswith("sqlite")
+    db_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False} if sqlite else {},
+        poolclass=QueuePool,
+        **options
+    )
+    if sqlite:
+        event.listen(db_engine, "connect", set_sqlite_pragmas)
+    return db_engine
+
+
+engine = create_db_engine()
+
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
+
+
+def get_session():
+    """FastAPI dependency: one sync session per request (threadpool endpoints)"""
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
@@ -0,0 +1,177 @@
+"""
+Near-duplicate detection for incoming reports.
+Keeps recent open reports in an in-memory uniform grid keyed by lat/lng
+cell, so "is there already an open <issue_type> report within R meters
+from the last T hours?" only looks at a handful of neighbouring cells.
+The grid is warm-started from the complaints table on startup, and
+resolved reports are removed (DispatchQueue.complete) so new reports are
+never attached to a closed complaint.
+
+Each worker of a multi-worker server holds its own grid. Adds and
+removals are mirrored to the other workers through `relay` (cluster.py).
+This is best-effort: two workers taking the same duplicate within the
+relay latency (well under a millisecond locally) may both register it,
+and a worker busy enough to drop datagrams can miss entries.
+"""
+
+import math
+import os
+import threading
+import time
+
+from models import Complaint
+from report_ids import decode_timestamp, lower_bound
+from spatial import METERS_PER_DEGREE_LAT, haversine_m
+from stats import OPEN_STATUS
+
+
+DEDUPE_RADIUS_M = float(os.environ.get("CIVIC_DEDUPE_RADIUS_M", 30))
+DEDUPE_WINDOW_SECONDS = float(os.environ.get("CIVIC_DEDUPE_WINDOW_SECONDS", 7 * 24 * 3600))
+
+
+class DuplicateIndex:
+    """
+    Uniform grid of open reports. Cells are `radius_m` tall; in longitude they
+    span the same number of degrees, which is never wider than radius_m, so
+    lookups scan ceil(1/cos(lat)) extra columns to cover the full radius.
+    """
+
+    def __init__(self, radius_m=DEDUPE_RADIUS_M, window_seconds=DEDUPE_WINDOW_SECONDS):
+        self.radius_m = radius_m
+        self.window_seconds = window_seconds
+        self.cell_deg = radius_m / METERS_PER_DEGREE_LAT
+        self._cells = {}
+        self._cell_of = {}
+        # report_id -> time removed; keeps a resolved report out if a
+        # concurrent warm_start or add still has it as open
+        self._closed = {}
+        self._lock = threading.Lock()
+        # relay(action, data): shares "add" and "remove" with the other
+        # worker processes; None with a single worker
+        self.relay = None
+
+    def __len__(self):
+        return len(self._cell_of)
+
+    def _cell(self, lat, lng):
+        return (math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg))
+
+    def add(self, report_id, issue_type, lat, lng, created=None):
+        created = created or time.time()
+        cell = self._cell(lat, lng)
+        with self._lock:
+            self._add_locked(cell, (report_id, issue_type, lat, lng, created))
+
+    def _add_locked(self, cell, entry):
+        if entry[0] in self._closed:
+            return
+        self._cells.setdefault(cell, []).append(entry)
+        self._cell_of[entry[0]] = cell
+
+    def remove(self, report_id, relay=True):
+        """
+        Forget a report once it is resolved; it is never matched again.
+        `relay=False` for removals relayed from another worker.
+        """
+        now = time.time()
+        with self._lock:
+            self._closed[report_id] = now
+            if len(self._closed) > len(self._cell_of) + 1024:
+                cutoff = now - self.window_seconds
+                self._closed = {closed_id: closed_at for closed_id, closed_at in self._closed.items()
+                                if closed_at >= cutoff}
+            cell = self._cell_of.pop(report_id, None)
+            if cell is None:
+                return
+            if cell is not None:
+                entries = [e for e in self._cells.get(cell, ()) if e[0] != report_id]
+                if entries:
+                    self._cells[cell] = entries
+                else:
+                    self._cells.pop(cell, None)
+        if relay and self.relay is not None:
+            self.relay("remove", report_id)
+
+    def _find_locked(self, issue_type, lat, lng, now):
+        row, col = self._cell(lat, lng)
+        span = math.ceil(1 / max(math.cos(math.radians(lat)), 1e-6))
+        cutoff = now - self.window_seconds
+        best = None
+        for r in (row - 1, row, row + 1):
+            for c in range(col - span, col + span + 1):
+                entries = self._cells.get((r, c))
+                if not entries:
+                    continue
+                if entries[0][4] < cutoff:
+                    entries = self._prune_locked((r, c), cutoff)
+                for report_id, entry_type, entry_lat, entry_lng, _created in entries:
+                    if entry_type != issue_type or report_id in self._closed:
+                        continue
+                    distance = haversine_m(lat, lng, entry_lat, entry_lng)
+                    if distance <= self.radius_m and (best is None or distance < best[1]):
+                        best = (report_id, distance)
+        return best[0] if best else None
+
+    def _prune_locked(self, cell, cutoff):
+        entries = [e for e in self._cells[cell] if e[4] >= cutoff]
+        for entry in self._cells[cell]:
+            if entry[4] < cutoff:
+                self._cell_of.pop(entry[0], None)
+        if entries:
+            self._cells[cell] = entries
+        else:
+            del self._cells[cell]
+        return entries
+
+    def find(self, issue_type, lat, lng, now=None):
+        """Report ID of the nearest open duplicate, or None"""
+        with self._lock:
+            return self._find_locked(issue_type, lat, lng, now or time.time())
+
+    def check_or_add(self, report_id, issue_type, lat, lng, now=None):
+        """
+        Atomically returns the existing open duplicate's report ID, or
+        registers `report_id` as a new open report and returns None.
+        Resolved reports are never returned.
+        """
+        now = now or time.time()
+        with self._lock:
+            existing = self._find_locked(issue_type, lat, lng, now)
+            if existing is None:
+                self._add_locked(self._cell(lat, lng), (report_id, issue_type, lat, lng, now))
+        if existing is None and self.relay is not None:
+            self.relay("add", [report_id, issue_type, lat, lng, now])
+        return existing
+
+    def warm_start(self, session):
+        """
+        Loads open, located complaints from inside the window. Returns count.
+        Resolved complaints are skipped, including ones resolved while loading.
+        """
+        # Report IDs are time-sortable, so the window is a range on report_id.
+        oldest_id = lower_bound(time.time() - self.window_seconds)
+        rows = (
+            session.query(Complaint.report_id, Complaint.issue_type,
+                          Complaint.latitude, Complaint.longitude)
+            .filter(Complaint.status == OPEN_STATUS)
+            .filter(Complaint.latitude.isnot(None), Complaint.longitude.isnot(None))
+            .filter(Complaint.report_id >= oldest_id)
+            .yield_per(10000)
+        )
+        loaded = 0
+        with self._lock:
+            for report_id, issue_type, lat, lng in rows:
+                try:
+                    created = decode_timestamp(report_id)
+                except ValueError:
+                    continue
+                if report_id in self._closed:
+                    continue
+                self._add_locked(self._cell(lat, lng), (report_id, issue_type, lat, lng, created))
+                loaded += 1
+            for entries in self._cells.values():
+                entries.sort(key=lambda entry: entry[4])
+        return loaded
+
+
+DUPLICATE_INDEX = DuplicateIndex()
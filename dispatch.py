@@ -0,0 +1,472 @@
+"""
+SLA-aware dispatch queues for department crews.
+
+Every persisted report becomes a task due at created_at + its resolution
+timeline ("24 hours", "7 days" from assign_priority). Tasks live in:
+
+  - `dispatch_tasks`, the source of truth, indexed by
+    (department, state, due_at) for queries and crash recovery
+  - one in-memory heap per department ordered by (due_at, priority rank),
+    so "next due" is O(1), claiming is O(log n), and "overdue" walks only
+    the overdue part of the heap
+
+Crews claim tasks with a lease. Each department has its own small lock
+held only for heap pushes/pops; the claim itself is a conditional UPDATE
+(state='queued' -> 'claimed'), so concurrent crews never block on each
+other while talking to the database and a task can't be claimed twice,
+even across processes. Expired leases are returned to the queue by a
+periodic sweep. Every state change is published on EVENT_BUS for the
+report's and department's live subscribers.
+"""
+
+from datetime import datetime, timedelta
+import heapq
+import os
+import re
+import threading
+import time
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from civic_issue_reporter import get_responsible_department
+from database import SessionLocal
+from dedupe import DUPLICATE_INDEX
+from events import EVENT_BUS
+from models import Complaint, DispatchTask
+from observability import METRICS, logger
+from stats import track_status_change
+
+
+PRIORITY_RANK = {"Critical": 0, "High": 1, "Medium": 2, "Low": 3}
+# Used when a timeline string can't be parsed
+DEFAULT_SLA = {
+    "Critical": timedelta(hours=24),
+    "High": timedelta(hours=72),
+    "Medium": timedelta(days=7),
+    "Low": timedelta(days=14),
+}
+
+LEASE_SECONDS = int(os.environ.get("CIVIC_DISPATCH_LEASE_SECONDS", 4 * 3600))
+SWEEP_INTERVAL = float(os.environ.get("CIVIC_DISPATCH_SWEEP_INTERVAL", 30))
+# Multi-worker servers: pick up tasks queued by other workers this often,
+# and rebuild the heaps from the table every RESYNC_INTERVAL (releases,
+# expiries and claims made elsewhere)
+REFRESH_INTERVAL = float(os.environ.get("CIVIC_DISPATCH_REFRESH_INTERVAL", 2))
+RESYNC_INTERVAL = float(os.environ.get("CIVIC_DISPATCH_RESYNC_INTERVAL", 30))
+MAX_LISTED = 200
+
+QUEUED, CLAIMED, DONE = "queued", "claimed", "done"
+RESOLVED_STATUS = "resolved"
+
+_TIMELINE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(minute|hour|day|week)s?\s*$", re.IGNORECASE)
+_UNITS = {"minute": "minutes", "hour": "hours", "day": "days", "week": "weeks"}
+
+_PENDING_KEY = "civic_dispatch_new"
+
+
+def parse_timeline(timeline):
+    """'24 hours' -> timedelta(hours=24). Raises ValueError if unrecognized."""
+    match = _TIMELINE.match(timeline or "")
+    if not match:
+        raise ValueError(f"Unrecognized resolution timeline: {timeline!r}")
+    amount, unit = match.groups()
+    return timedelta(**{_UNITS[unit.lower()]: float(amount)})
+
+
+def due_at_for(created_at, priority, timeline):
+    """Absolute SLA deadline for a report"""
+    try:
+        sla = parse_timeline(timeline)
+    except ValueError:
+        sla = DEFAULT_SLA.get(priority, DEFAULT_SLA["Low"])
+    return created_at + sla
+
+
+def task_to_dict(task):
+    return {
+        "report_id": task.report_id,
+        "department": task.department,
+        "priority": task.priority,
+        "due_at": task.due_at.isoformat(),
+        "state": task.state,
+        "claimed_by": task.claimed_by,
+        "lease_until": task.lease_until.isoformat() if task.lease_until else None,
+        "completed_at": task.completed_at.isoformat() if task.completed_at else None,
+    }
+
+
+class _DepartmentHeap:
+    __slots__ = ("entries", "lock")
+
+    def __init__(self):
+        self.entries = []  # (due_ts, rank, report_id, due_at, priority)
+        self.lock = threading.Lock()
+
+
+class DispatchQueue:
+    """Per-department SLA heaps backed by the dispatch_tasks table"""
+
+    def __init__(self, session_factory=SessionLocal, lease_seconds=LEASE_SECONDS,
+                 sweep_interval=SWEEP_INTERVAL):
+        self.session_factory = session_factory
+        self.lease_seconds = lease_seconds
+        self.sweep_interval = sweep_interval
+        self._heaps = {}
+        self._heaps_lock = threading.Lock()
+        self._last_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+        self.refresh_interval = None
+        self.resync_interval = RESYNC_INTERVAL
+        self._watermark = 0
+        self._local = set()
+        self._last_refresh = 0.0
+        self._last_resync = 0.0
+        self._refresh_lock = threading.Lock()
+
+    def _heap(self, department):
+        heap = self._heaps.get(department)
+        if heap is None:
+            with self._heaps_lock:
+                heap = self._heaps.setdefault(department, _DepartmentHeap())
+        return heap
+
+    @staticmethod
+    def entry_for(task):
+        """(department, heap entry) snapshot of a task, safe to keep after commit"""
+        return task.department, (task.due_at.timestamp(), task.priority_rank, task.report_id,
+                                 task.due_at, task.priority)
+
+    def push(self, department, entry):
+        heap = self._heap(department)
+        with heap.lock:
+            heapq.heappush(heap.entries, entry)
+
+    def departments(self):
+        return sorted(department for department, heap in self._heaps.items() if heap.entries)
+
+    def depth(self, department):
+        return len(self._heap(department).entries)
+
+    # ---- startup ----
+
+    @staticmethod
+    def _load_queued(session, after_id=0):
+        """({department: [entries]}, highest task id seen) for queued tasks"""
+        loaded = {}
+        highest = after_id
+        rows = session.execute(
+            select(DispatchTask.id, DispatchTask.department, DispatchTask.due_at,
+                   DispatchTask.priority_rank, DispatchTask.report_id, DispatchTask.priority)
+            .where(DispatchTask.state == QUEUED, DispatchTask.id > after_id)
+            .execution_options(yield_per=10000)
+        )
+        for task_id, department, due_at, rank, report_id, priority in rows:
+            loaded.setdefault(department, []).append(
+                (due_at.timestamp(), rank, report_id, due_at, priority)
+            )
+            highest = max(highest, task_id)
+        return loaded, highest
+
+    def warm_start(self, session):
+        """Loads queued tasks from the table into the heaps. Returns count."""
+        loaded, self._watermark = self._load_queued(session)
+        for department, entries in loaded.items():
+            heap = self._heap(department)
+            with heap.lock:
+                heap.entries.extend(entries)
+                heapq.heapify(heap.entries)
+        self._last_refresh = self._last_resync = time.monotonic()
+        return sum(len(entries) for entries in loaded.values())
+
+    # ---- multi-worker reconciliation ----
+
+    def note_local(self, report_id):
+        """Marks a task this process pushed itself, so refresh() skips it"""
+        if self.refresh_interval is not None:
+            self._local.add(report_id)
+
+    def _maybe_refresh(self):
+        if self.refresh_interval is None:
+            return
+        now = time.monotonic()
+        if now - self._last_refresh < self.refresh_interval:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            full = now - self._last_resync >= self.resync_interval
+            self._last_refresh = now
+            if full:
+                self._last_resync = now
+            self.refresh(full)
+        finally:
+            self._refresh_lock.release()
+
+    def refresh(self, full=False):
+        """
+        Picks up tasks queued by other processes since the last refresh
+        (by task id), or with `full` rebuilds every heap from the table.
+        Entries for tasks claimed elsewhere are dropped when a claim finds
+        them gone, so a stale heap never hands out a task twice.
+        """
+        session = self.session_factory()
+        try:
+            loaded, highest = self._load_queued(session, 0 if full else self._watermark)
+        finally:
+            session.close()
+        if full:
+            for department in set(self._heaps) | set(loaded):
+                entries = loaded.get(department, [])
+                heapq.heapify(entries)
+                heap = self._heap(department)
+                with heap.lock:
+                    heap.entries = entries
+            self._local.clear()
+        else:
+            for department, entries in loaded.items():
+                for entry in entries:
+                    if entry[2] in self._local:
+                        self._local.discard(entry[2])
+                    else:
+                        self.push(department, entry)
+        self._watermark = max(self._watermark, highest)
+
+    # ---- queries ----
+
+    def next_due(self, department, limit=10):
+        """Earliest-due queued tasks for a department, soonest first"""
+        self._maybe_refresh()
+        heap = self._heap(department)
+        with heap.lock:
+            entries = heapq.nsmallest(limit, heap.entries)
+        return [self._listing(department, entry) for entry in entries]
+
+    def overdue(self, department, now=None, limit=MAX_LISTED):
+        """
+        Queued tasks already past due, most overdue first. Best-first walk of
+        the heap tree from the root: O(k log k) for k results, independent
+        of the queue length.
+        """
+        self._maybe_refresh()
+        now_ts = (now or datetime.now()).timestamp()
+        heap = self._heap(department)
+        found = []
+        with heap.lock:
+            entries = heap.entries
+            frontier = [(entries[0], 0)] if entries else []
+            while frontier and len(found) < limit:
+                entry, index = heapq.heappop(frontier)
+                if entry[0] >= now_ts:
+                    break
+                found.append(entry)
+                for child in (2 * index + 1, 2 * index + 2):
+                    if child < len(entries):
+                        heapq.heappush(frontier, (entries[child], child))
+        return [self._listing(department, entry) for entry in found]
+
+    @staticmethod
+    def announce(event_type, department, entry, **data):
+        """Publishes a state change of the task behind `entry`"""
+        EVENT_BUS.publish(event_type, entry[2], department, priority=entry[4],
+                          due_at=entry[3].isoformat(), **data)
+
+    @staticmethod
+    def _listing(department, entry):
+        _due_ts, _rank, report_id, due_at, priority = entry
+        return {"report_id": report_id, "department": department, "priority": priority,
+                "due_at": due_at.isoformat(), "state": QUEUED}
+
+    # ---- claim / complete ----
+
+    def claim(self, department, worker, lease_seconds=None, now=None):
+        """
+        Claims the most urgent queued task for `worker`.
+        Returns the task dict, or None when the department queue is empty.
+        """
+        self._maybe_sweep()
+        self._maybe_refresh()
+        now = now or datetime.now()
+        lease_until = now + timedelta(seconds=lease_seconds or self.lease_seconds)
+        heap = self._heap(department)
+        while True:
+            with heap.lock:
+                if not heap.entries:
+                    return None
+                entry = heapq.heappop(heap.entries)
+            report_id = entry[2]
+            session = self.session_factory()
+            try:
+                result = session.execute(
+                    update(DispatchTask)
+                    .where(DispatchTask.report_id == report_id, DispatchTask.department == department,
+                           DispatchTask.state == QUEUED)
+                    .values(state=CLAIMED, claimed_by=worker, claimed_at=now, lease_until=lease_until)
+                )
+                session.commit()
+            except Exception:
+                session.rollback()
+                with heap.lock:
+                    heapq.heappush(heap.entries, entry)
+                raise
+            finally:
+                session.close()
+            if result.rowcount:
+                METRICS.inc("civic_dispatch_claims_total", department=department)
+                self.announce("claimed", department, entry, state=CLAIMED, claimed_by=worker,
+                              lease_until=lease_until.isoformat())
+                claimed = self._listing(department, entry)
+                claimed.update(state=CLAIMED, claimed_by=worker,
+                               lease_until=lease_until.isoformat(), completed_at=None)
+                return claimed
+            # Claimed, completed or moved to another department elsewhere
+            # (e.g. by rescore.py): drop it and try the next
+
+    def complete(self, report_id, worker, now=None):
+        """
+        Marks a task claimed by `worker` as done and resolves its complaint,
+        which stops new reports being attached to it as duplicates.
+        Returns the task dict, or None if `worker` does not hold the claim.
+        """
+        now = now or datetime.now()
+        session = self.session_factory()
+        try:
+            result = session.execute(
+                update(DispatchTask)
+                .where(DispatchTask.report_id == report_id, DispatchTask.state == CLAIMED,
+                       DispatchTask.claimed_by == worker)
+                .values(state=DONE, completed_at=now, lease_until=None)
+            )
+            if not result.rowcount:
+                session.rollback()
+                return None
+            complaint = session.execute(
+                select(Complaint).where(Complaint.report_id == report_id)
+            ).scalar_one_or_none()
+            if complaint is not None:
+                track_status_change(session, complaint, RESOLVED_STATUS)
+            task = session.execute(
+                select(DispatchTask).where(DispatchTask.report_id == report_id)
+            ).scalar_one()
+            completed = task_to_dict(task)
+            breached = task.due_at < now
+            session.commit()
+            DUPLICATE_INDEX.remove(report_id)
+            METRICS.inc("civic_dispatch_completed_total", department=completed["department"])
+            if breached:
+                METRICS.inc("civic_dispatch_sla_breached_total", department=completed["department"])
+            EVENT_BUS.publish("resolved", report_id, completed["department"], priority=completed["priority"],
+                              due_at=completed["due_at"], state=DONE, status=RESOLVED_STATUS,
+                              completed_at=completed["completed_at"], sla_breached=breached)
+            return completed
+        finally:
+            session.close()
+
+    def release(self, report_id, worker):
+        """Gives a claimed task back to the queue. Returns True if released."""
+        session = self.session_factory()
+        try:
+            result = session.execute(
+                update(DispatchTask)
+                .where(DispatchTask.report_id == report_id, DispatchTask.state == CLAIMED,
+                       DispatchTask.claimed_by == worker)
+                .values(state=QUEUED, claimed_by=None, claimed_at=None, lease_until=None)
+            )
+            if not result.rowcount:
+                session.rollback()
+                return False
+            task = session.execute(
+                select(DispatchTask).where(DispatchTask.report_id == report_id)
+            ).scalar_one()
+            department, entry = self.entry_for(task)
+            session.commit()
+            self.push(department, entry)
+            self.announce("released", department, entry, state=QUEUED)
+            return True
+        finally:
+            session.close()
+
+    # ---- lease expiry ----
+
+    def _maybe_sweep(self):
+        if time.monotonic() - self._last_sweep < self.sweep_interval:
+            return
+        if not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_sweep = time.monotonic()
+            self.requeue_expired()
+        finally:
+            self._sweep_lock.release()
+
+    def requeue_expired(self, now=None):
+        """Returns tasks whose claim lease ran out to the queue. Returns count."""
+        now = now or datetime.now()
+        session = self.session_factory()
+        try:
+            expired = session.execute(
+                select(DispatchTask)
+                .where(DispatchTask.state == CLAIMED, DispatchTask.lease_until < now)
+            ).scalars().all()
+            requeued = []
+            for task in expired:
+                result = session.execute(
+                    update(DispatchTask)
+                    .where(DispatchTask.id == task.id, DispatchTask.state == CLAIMED,
+                           DispatchTask.lease_until < now)
+                    .values(state=QUEUED, claimed_by=None, claimed_at=None, lease_until=None)
+                )
+                if result.rowcount:
+                    requeued.append(self.entry_for(task))
+            session.commit()
+        finally:
+            session.close()
+        for department, entry in requeued:
+            self.push(department, entry)
+            self.announce("requeued", department, entry, state=QUEUED)
+        if requeued:
+            METRICS.inc("civic_dispatch_leases_expired_total", len(requeued))
+            logger.info("Requeued expired dispatch claims", extra={"count": len(requeued)})
+        return len(requeued)
+
+
+DISPATCH_QUEUE = DispatchQueue()
+
+
+# ========================================
+# WRITE PATH
+# ========================================
+
+def enqueue_new(session, complaints):
+    """
+    Adds dispatch tasks for newly inserted complaints (call before commit).
+    They join the in-memory heaps once the transaction commits.
+    """
+    tasks = []
+    for complaint in complaints:
+        created_at = complaint.created_at or datetime.now()
+        task = DispatchTask(
+            report_id=complaint.report_id,
+            department=complaint.department or get_responsible_department(complaint.issue_type),
+            priority=complaint.priority,
+            priority_rank=PRIORITY_RANK.get(complaint.priority, len(PRIORITY_RANK)),
+            due_at=due_at_for(created_at, complaint.priority, complaint.resolution_timeline),
+            state=QUEUED,
+        )
+        tasks.append(task)
+    session.add_all(tasks)
+    session.info.setdefault(_PENDING_KEY, []).extend(DispatchQueue.entry_for(task) for task in tasks)
+
+
+@event.listens_for(Session, "after_commit")
+def _push_committed(session):
+    entries = session.info.pop(_PENDING_KEY, None)
+    for department, entry in entries or ():
+        DISPATCH_QUEUE.note_local(entry[2])
+        DISPATCH_QUEUE.push(department, entry)
+        DISPATCH_QUEUE.announce("dispatched", department, entry, state=QUEUED)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,237 @@
+"""
+Server-push report status updates (Server-Sent Events).
+
+Clients subscribe to topics, either a report (`report:<report_id>`) or a
+department (`department:<name>`), and receive an event whenever a report
+is dispatched, claimed, released, requeued or resolved. This replaces
+polling.
+
+Fan-out is in-process. Publishers (dispatch, running on worker threads
+or after a commit) encode each event as one SSE frame. The frame is handed
+to the event loop and appended to every matching subscriber's buffer, so
+encoding happens once however many subscribers there are. Each subscriber
+keeps at most CIVIC_EVENTS_BUFFER undelivered frames. On overflow the
+oldest frames are dropped and the client gets an `overflow` event telling
+it to refetch. Idle connections get a heartbeat comment every
+CIVIC_EVENTS_HEARTBEAT seconds, which also detects dead peers.
+
+An idle subscriber is a slotted object with no buffer allocated until
+the first event arrives, so tens of thousands of open streams cost little
+memory apart from the connections themselves.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+
+from observability import METRICS, logger
+
+
+HEARTBEAT_SECONDS = float(os.environ.get("CIVIC_EVENTS_HEARTBEAT", 15))
+SUBSCRIBER_BUFFER = int(os.environ.get("CIVIC_EVENTS_BUFFER", 16))
+MAX_SUBSCRIBERS = int(os.environ.get("CIVIC_EVENTS_MAX_SUBSCRIBERS", 100000))
+MAX_TOPICS = 20
+RETRY_MS = 5000
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+HEARTBEAT_FRAME = b": ping\n\n"
+
+
+def report_topic(report_id):
+    return f"report:{report_id}"
+
+
+def department_topic(department):
+    return f"department:{department}"
+
+
+class SubscriberLimit(Exception):
+    """Raised when MAX_SUBSCRIBERS streams are already open"""
+
+
+class Subscriber:
+    """One open stream: its topics and a bounded buffer of encoded frames"""
+
+    __slots__ = ("topics", "limit", "frames", "dropped", "waiter", "closed")
+
+    def __init__(self, topics, limit=SUBSCRIBER_BUFFER):
+        self.topics = topics
+        self.limit = limit
+        self.frames = None  # allocated on first event
+        self.dropped = 0
+        self.waiter = None
+        self.closed = False
+
+    def push(self, frame):
+        """Event-loop side: buffers a frame, dropping the oldest when full"""
+        if self.frames is None:
+            self.frames = [frame]
+        else:
+            if len(self.frames) >= self.limit:
+                del self.frames[0]
+                self.dropped += 1
+            self.frames.append(frame)
+        self._wake()
+
+    def close(self):
+        self.closed = True
+        self._wake()
+
+    def _wake(self):
+        waiter = self.waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def next_frames(self, timeout):
+        """
+        Waits up to `timeout` seconds. Returns the buffered frames (and
+        clears them), [] on timeout, or None once the subscriber is closed.
+        """
+        if not self.frames and not self.closed:
+            self.waiter = asyncio.get_running_loop().create_future()
+            try:
+                await asyncio.wait_for(self.waiter, timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self.waiter = None
+        if self.closed:
+            return None
+        frames, self.frames = self.frames or [], None
+        return frames
+
+
+class EventBus:
+    """Topic -> subscribers fan-out, owned by the server's event loop"""
+
+    def __init__(self, max_subscribers=MAX_SUBSCRIBERS):
+        self.max_subscribers = max_subscribers
+        self._topics = {}
+        self._count = 0
+        self._loop = None
+        self._loop_thread = None
+        self._ids = itertools.count(1)
+        self._ids_lock = threading.Lock()
+        # relay(topics, frame): forwards events to other worker processes
+        self.relay = None
+
+    def bind(self, loop):
+        """Attaches the bus to the running server loop (call at startup)"""
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+
+    def close(self):
+        """Ends every open stream (shutdown)"""
+        for subscribers in list(self._topics.values()):
+            for subscriber in list(subscribers):
+                subscriber.close()
+        self._loop = None
+
+    @property
+    def subscriber_count(self):
+        return self._count
+
+    # ---- subscribe (event-loop side) ----
+
+    def subscribe(self, topics, buffer=SUBSCRIBER_BUFFER):
+        if self._count >= self.max_subscribers:
+            raise SubscriberLimit(f"Too many open event streams ({self.max_subscribers})")
+        subscriber = Subscriber(tuple(topics), buffer)
+        for topic in subscriber.topics:
+            self._topics.setdefault(topic, set()).add(subscriber)
+        self._count += 1
+        METRICS.set_gauge("civic_event_subscribers", self._count)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        for topic in subscriber.topics:
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._topics[topic]
+        self._count -= 1
+        METRICS.set_gauge("civic_event_subscribers", self._count)
+
+    # ---- publish (any thread) ----
+
+    def publish(self, event_type, report_id, department=None, **data):
+        """
+        Sends an event to the report's and department's subscribers, here
+        and (through `relay`) in the other workers. Safe to call from any
+        thread; a no-op when nobody can be listening.
+        """
+        loop = self._loop
+        topics = [report_topic(report_id)]
+        if department:
+            topics.append(department_topic(department))
+        if loop is None or (self.relay is None and not any(topic in self._topics for topic in topics)):
+            return
+        with self._ids_lock:
+            event_id = next(self._ids)
+        payload = {"type": event_type, "report_id": report_id, "department": department,
+                   "at": time.time(), **data}
+        frame = (f"id: {event_id}\nevent: {event_type}\n"
+                 f"data: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n").encode("utf-8")
+        METRICS.inc("civic_events_published_total", type=event_type)
+        if self.relay is not None:
+            self.relay(topics, frame)
+        if threading.get_ident() == self._loop_thread:
+            self._deliver(topics, frame)
+        else:
+            try:
+                loop.call_soon_threadsafe(self._deliver, topics, frame)
+            except RuntimeError:  # loop closed during shutdown
+                pass
+
+    def deliver_threadsafe(self, topics, frame):
+        """Delivers an already encoded frame (relayed from another worker)"""
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._deliver, topics, frame)
+
+    def _deliver(self, topics, frame):
+        delivered = set()
+        for topic in topics:
+            for subscriber in self._topics.get(topic, ()):
+                if subscriber not in delivered:
+                    delivered.add(subscriber)
+                    subscriber.push(frame)
+
+    # ---- streaming ----
+
+    def has_capacity(self):
+        return self._count < self.max_subscribers
+
+    async def stream(self, topics, heartbeat=HEARTBEAT_SECONDS):
+        """
+        SSE body for one client. Subscribes on first iteration (so a client
+        that is gone before the body starts never holds a subscription) and
+        unsubscribes when the response is cancelled or the bus is closed.
+        """
+        subscriber = self.subscribe(topics)
+        try:
+            yield f"retry: {RETRY_MS}\n: subscribed {' '.join(subscriber.topics)}\n\n".encode("utf-8")
+            while True:
+                frames = await subscriber.next_frames(heartbeat)
+                if frames is None:
+                    return
+                if not frames:
+                    yield HEARTBEAT_FRAME
+                    continue
+                if subscriber.dropped:
+                    METRICS.inc("civic_event_frames_dropped_total", subscriber.dropped)
+                    logger.debug("Slow event subscriber; frames dropped", extra={"dropped": subscriber.dropped})
+                    overflow = json.dumps({"type": "overflow", "dropped": subscriber.dropped})
+                    subscriber.dropped = 0
+                    frames.insert(0, f"event: overflow\ndata: {overflow}\n\n".encode("utf-8"))
+                yield b"".join(frames)
+        finally:
+            self.unsubscribe(subscriber)
+
+
+EVENT_BUS = EventBus()
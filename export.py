@@ -0,0 +1,292 @@
+"""
+Streaming bulk export of stored complaints to NDJSON, CSV or Parquet.
+
+Rows are read with `yield_per` (a server-side cursor where the driver has
+one) and encoded chunk by chunk, so memory stays flat however many rows
+match. Output is produced as a stream of byte chunks, optionally gzip or
+zstd compressed, which the CLI writes to a file and /api/export sends as
+a streaming download.
+
+    python -m export --format csv --compression gzip \\
+        --since 2026-01-01 --until 2026-02-01 --department "Roads & Highways Department" \\
+        -o complaints-2026-01.csv.gz
+
+Parquet needs pyarrow and zstd needs zstandard; both are optional.
+"""
+
+from datetime import date, datetime
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+import zlib
+
+from sqlalchemy import select
+
+from database import SessionLocal
+from models import Complaint
+from observability import METRICS, configure_logging, logger
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only the Parquet format needs it
+    pa = None
+
+try:
+    import zstandard
+except ImportError:  # optional: only zstd compression needs it
+    zstandard = None
+
+
+EXPORT_CHUNK_SIZE = int(os.environ.get("CIVIC_EXPORT_CHUNK_SIZE", 5000))
+
+FORMATS = ("ndjson", "csv", "parquet")
+COMPRESSIONS = ("none", "gzip", "zstd")
+
+COLUMNS = (
+    "id", "report_id", "created_at", "issue_type", "category", "confidence",
+    "severity", "priority", "department", "status", "confirmations",
+    "last_confirmed_at", "latitude", "longitude", "address", "ward",
+    "resolution_timeline", "complaint_text",
+)
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXTENSIONS = {"ndjson": ".ndjson", "csv": ".csv", "parquet": ".parquet"}
+COMPRESSED_MEDIA_TYPES = {"gzip": "application/gzip", "zstd": "application/zstd"}
+COMPRESSED_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def parse_date(value):
+    """ISO date or datetime string -> datetime (None passes through)"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError as e:
+        raise ValueError(f"Invalid date: {value!r} (use YYYY-MM-DD or ISO datetime)") from e
+
+
+def validate_options(fmt, compression):
+    """Raises ValueError for unknown or unavailable format/compression"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt} (choose from {', '.join(FORMATS)})")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression} (choose from {', '.join(COMPRESSIONS)})")
+    if fmt == "parquet" and pa is None:
+        raise ValueError("Parquet export requires pyarrow")
+    if compression == "zstd" and fmt != "parquet" and zstandard is None:
+        raise ValueError("zstd compression requires the zstandard package")
+
+
+def export_filename(fmt, compression, stem="complaints"):
+    name = stem + EXTENSIONS[fmt]
+    if fmt != "parquet" and compression != "none":
+        name += COMPRESSED_EXTENSIONS[compression]
+    return name
+
+
+def export_media_type(fmt, compression):
+    if fmt != "parquet" and compression != "none":
+        return COMPRESSED_MEDIA_TYPES[compression]
+    return MEDIA_TYPES[fmt]
+
+
+# ========================================
+# ROW SOURCE
+# ========================================
+
+def iter_row_chunks(session, since=None, until=None, department=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yields lists of row tuples (COLUMNS order), oldest first; `until` is exclusive"""
+    query = select(*(getattr(Complaint, column) for column in COLUMNS))
+    if since:
+        query = query.where(Complaint.created_at >= since)
+    if until:
+        query = query.where(Complaint.created_at < until)
+    if department:
+        query = query.where(Complaint.department == department)
+    query = query.order_by(Complaint.created_at, Complaint.id).execution_options(yield_per=chunk_size)
+    yield from session.execute(query).partitions()
+
+
+# ========================================
+# ENCODERS
+# ========================================
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+
+def _encode_ndjson(rows):
+    lines = [
+        json.dumps({column: _json_value(value) for column, value in zip(COLUMNS, row)}, ensure_ascii=False)
+        for row in rows
+    ]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _CsvEncoder:
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._writer.writerow(COLUMNS)
+
+    def __call__(self, rows):
+        self._writer.writerows(
+            [_json_value(value) if value is not None else "" for value in row] for row in rows
+        )
+        data = self._buffer.getvalue().encode("utf-8")
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to a generator"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_schema():
+    types = {
+        "id": pa.int64(), "confidence": pa.float64(), "confirmations": pa.int64(),
+        "latitude": pa.float64(), "longitude": pa.float64(),
+        "created_at": pa.timestamp("us"), "last_confirmed_at": pa.timestamp("us"),
+    }
+    return pa.schema([(column, types.get(column, pa.string())) for column in COLUMNS])
+
+
+def _iter_parquet(chunks, compression):
+    """One Parquet row group per chunk; compression uses Parquet's own codecs"""
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    codec = {"none": "none", "gzip": "gzip", "zstd": "zstd"}[compression]
+    writer = pq.ParquetWriter(sink, schema, compression=codec)
+    try:
+        for rows in chunks:
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def _compressor(compression):
+    if compression == "gzip":
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    return None
+
+
+# ========================================
+# EXPORT
+# ========================================
+
+def export_chunks(fmt="ndjson", compression="none", since=None, until=None, department=None,
+                  session_factory=SessionLocal, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Iterator of output byte chunks for the whole export. Options are
+    validated here (ValueError); the returned generator holds one session
+    (one read transaction) until it is exhausted or closed.
+    """
+    validate_options(fmt, compression)
+    return _generate(fmt, compression, since, until, department, session_factory, chunk_size)
+
+
+def _generate(fmt, compression, since, until, department, session_factory, chunk_size):
+    start = time.perf_counter()
+    exported = 0
+    session = session_factory()
+    try:
+        def counted(chunks):
+            nonlocal exported
+            for rows in chunks:
+                exported += len(rows)
+                yield rows
+
+        chunks = counted(iter_row_chunks(session, since, until, department, chunk_size))
+        if fmt == "parquet":
+            yield from _iter_parquet(chunks, compression)
+            return
+
+        encode = _CsvEncoder() if fmt == "csv" else _encode_ndjson
+        compressor = _compressor(compression)
+        if fmt == "csv":
+            # Header even when nothing matches
+            yield _maybe_compress(compressor, encode([]))
+        for rows in chunks:
+            data = _maybe_compress(compressor, encode(rows))
+            if data:
+                yield data
+        if compressor is not None:
+            yield compressor.flush()
+    finally:
+        session.close()
+        METRICS.inc("civic_exported_rows_total", exported, format=fmt)
+        METRICS.observe("civic_stage_seconds", time.perf_counter() - start, stage="export")
+        logger.info("Export finished", extra={"format": fmt, "compression": compression, "rows": exported})
+
+
+def _maybe_compress(compressor, data):
+    return compressor.compress(data) if compressor is not None else data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export stored complaints")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--compression", choices=COMPRESSIONS, default="none")
+    parser.add_argument("--since", help="created at or after (YYYY-MM-DD or ISO datetime)")
+    parser.add_argument("--until", help="created before (exclusive)")
+    parser.add_argument("--department")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    try:
+        chunks = export_chunks(args.format, args.compression, parse_date(args.since),
+                               parse_date(args.until), args.department, chunk_size=args.chunk_size)
+    except ValueError as e:
+        parser.error(str(e))
+
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for data in chunks:
+            output.write(data)
+    finally:
+        if args.output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
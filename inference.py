@@ -0,0 +1,327 @@
+"""
+Pluggable image classifier backends.
+
+    RuleBasedBackend   the filename heuristic from civic_issue_reporter
+                       (default, and fallback for the model backends)
+    NumpyModelBackend  a small NumPy-only softmax model evaluated on CPU,
+                       with concurrent requests micro-batched into a
+                       process pool
+
+Select with CIVIC_CLASSIFIER_BACKEND=rules|numpy and CIVIC_MODEL_PATH.
+`generate_tiny_model()` writes a random model file so the NumPy backend
+can be exercised offline.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import os
+import time
+
+from civic_issue_reporter import CLASSIFICATION_RULES, DEFAULT_CLASSIFICATION, classify_issue
+from observability import METRICS, logger
+
+try:
+    import numpy as np
+except ImportError:  # optional: only the NumPy backend needs it
+    np = None
+
+
+BACKEND_NAME = os.environ.get("CIVIC_CLASSIFIER_BACKEND", "rules")
+MODEL_PATH = os.environ.get("CIVIC_MODEL_PATH", "models/classifier.npz")
+MAX_BATCH_SIZE = int(os.environ.get("CIVIC_INFERENCE_MAX_BATCH", 16))
+MAX_BATCH_WAIT_MS = float(os.environ.get("CIVIC_INFERENCE_MAX_WAIT_MS", 5))
+INFERENCE_WORKERS = int(os.environ.get("CIVIC_INFERENCE_WORKERS", 2))
+MIN_MODEL_CONFIDENCE = float(os.environ.get("CIVIC_MIN_MODEL_CONFIDENCE", 0.5))
+
+# Model output classes: every rule-table issue type plus the default
+MODEL_CLASSES = [rule[1:] for rule in CLASSIFICATION_RULES] + [DEFAULT_CLASSIFICATION]
+
+FEATURE_SIZE = 256
+_HEAD_BYTES = 4 * 1024 * 1024
+
+
+# ========================================
+# BACKEND INTERFACE
+# ========================================
+
+class ClassifierBackend:
+    """
+    Interface for image classifiers.
+    Results are (issue_type, confidence, category) tuples, like classify_issue().
+    """
+
+    name = "base"
+    # Ask preprocessing for a decoded RGB tensor (see preprocessing.py)
+    uses_pixels = False
+    # Results depend on the client filename, not only the image bytes, so
+    # cached results must be keyed by both (see uploads.classification_key)
+    uses_filename = True
+
+    def preload(self):
+        """
+        Load read-only state (model weights) in the multi-worker launcher
+        before it forks, so workers share it copy-on-write.
+        """
+
+    def start(self):
+        """Acquire resources (pools, model weights). Called on app startup."""
+
+    def stop(self):
+        """Release resources. Called on app shutdown."""
+
+    def classify(self, image_name, image_path=None, tensor=None):
+        """`tensor`: decoded RGB pixels from preprocessing, when uses_pixels"""
+        raise NotImplementedError
+
+    def classify_batch(self, items):
+        """items: list of (image_name, image_path) or (image_name, image_path, tensor)"""
+        return [self.classify(*item) for item in items]
+
+    async def classify_async(self, image_name, image_path=None, tensor=None):
+        return self.classify(image_name, image_path, tensor)
+
+
+class RuleBasedBackend(ClassifierBackend):
+    """Filename keyword rules (microseconds, no model needed)"""
+
+    name = "rules"
+
+    def classify(self, image_name, image_path=None, tensor=None):
+        return classify_issue(image_name, image_path)
+
+
+# ========================================
+# NUMPY MODEL
+# ========================================
+
+def image_features(data):
+    """
+    Fixed-size feature vector for a model: a histogram of byte values scaled
+    to mean 1. Over a decoded RGB tensor this is the pixel intensity
+    histogram; over raw file bytes (no tensor available) a coarse stand-in.
+    """
+    counts = np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=FEATURE_SIZE)
+    return counts.astype(np.float32) * (FEATURE_SIZE / max(len(data), 1))
+
+
+def load_model(path):
+    """Loads weights (W: features x classes, b: classes) from an .npz file"""
+    with np.load(path) as model:
+        return model["W"].astype(np.float32), model["b"].astype(np.float32)
+
+
+def generate_tiny_model(path, seed=0, feature_size=FEATURE_SIZE, classes=len(MODEL_CLASSES)):
+    """Writes a small random model for offline testing and benchmarks"""
+    if np is None:
+        raise RuntimeError("NumPy is required to generate a model")
+    rng = np.random.default_rng(seed)
+    weights = rng.normal(0, 4.0, size=(feature_size, classes)).astype(np.float32)
+    bias = rng.normal(0, 0.1, size=classes).astype(np.float32)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    np.savez(path, W=weights, b=bias)
+    return path
+
+
+def predict(weights, bias, features):
+    """Batched softmax: features (n x f) -> (class indices, probabilities)"""
+    logits = features @ weights + bias
+    logits -= logits.max(axis=1, keepdims=True)
+    probs = np.exp(logits)
+    probs /= probs.sum(axis=1, keepdims=True)
+    best = probs.argmax(axis=1)
+    return best, probs[np.arange(len(best)), best]
+
+
+# Worker-process state: the model is loaded once per pool process
+_worker_model = None
+
+
+def _init_worker(model_path):
+    global _worker_model
+    _worker_model = load_model(model_path)
+
+
+def _read_head(path):
+    with open(path, "rb") as f:
+        return f.read(_HEAD_BYTES)
+
+
+def _input_features(path, tensor):
+    # The preprocessed tensor when there is one; the file is not read again
+    return image_features(tensor if tensor is not None else _read_head(path))
+
+
+def _predict_inputs(inputs):
+    """Runs in a pool process: one forward pass for the whole batch"""
+    weights, bias = _worker_model
+    features = np.stack([_input_features(path, tensor) for path, tensor in inputs])
+    best, confidence = predict(weights, bias, features)
+    return best.tolist(), confidence.tolist()
+
+
+class MicroBatcher:
+    """
+    Collects concurrent classify requests for up to `max_wait_ms` or
+    `max_batch` images, then runs them as one batch in the process pool.
+    """
+
+    def __init__(self, run_batch, max_batch=MAX_BATCH_SIZE, max_wait_ms=MAX_BATCH_WAIT_MS):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending = []
+        self._timer = None
+        self._running = set()
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._dispatch)
+        return await future
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch):
+        items = [item for item, _future in batch]
+        try:
+            results = await self.run_batch(items)
+        except Exception as e:
+            for _item, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_item, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class NumpyModelBackend(ClassifierBackend):
+    """
+    CPU inference with a NumPy softmax model. Async callers are
+    micro-batched into a process pool; low-confidence predictions and
+    unreadable files fall back to the rule backend. Takes the pixel tensor
+    decoded by preprocessing; without one it reads the file head instead.
+    """
+
+    name = "numpy"
+    uses_pixels = True
+
+    def __init__(self, model_path=MODEL_PATH, workers=INFERENCE_WORKERS, max_batch=MAX_BATCH_SIZE,
+                 max_wait_ms=MAX_BATCH_WAIT_MS, min_confidence=MIN_MODEL_CONFIDENCE):
+        if np is None:
+            raise RuntimeError("The numpy classifier backend requires NumPy")
+        self.model_path = model_path
+        self.workers = workers
+        self.min_confidence = min_confidence
+        self.fallback = RuleBasedBackend()
+        self.batcher = MicroBatcher(self._run_batch, max_batch, max_wait_ms)
+        self._model = None
+        self._pool = None
+
+    def preload(self):
+        self._model = load_model(self.model_path)
+
+    def start(self):
+        if self._model is None:
+            self._model = load_model(self.model_path)
+        self._pool = self._new_pool()
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(
+            self.workers, initializer=_init_worker, initargs=(self.model_path,)
+        )
+
+    def _replace_broken_pool(self, broken):
+        """A pool process died: swap in a fresh pool for later batches"""
+        if self._pool is not broken:
+            return  # already replaced, or stopped
+        self._pool = self._new_pool()
+        broken.shutdown(wait=False, cancel_futures=True)
+        METRICS.inc("civic_pool_restarts_total", pool="inference")
+        logger.warning("Inference pool broken, restarted")
+
+    def stop(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def _to_result(self, name, path, index, confidence):
+        if confidence < self.min_confidence:
+            return self.fallback.classify(name, path)
+        issue_type, _rule_confidence, category = MODEL_CLASSES[index]
+        return issue_type, round(float(confidence), 2), category
+
+    def classify_batch(self, items):
+        """In-process batch prediction (no pool); used by sync callers"""
+        if self._model is None:
+            self._model = load_model(self.model_path)
+        items = [(item + (None,))[:3] for item in items]
+        readable = [index for index, (_name, path, tensor) in enumerate(items) if path or tensor is not None]
+        results = [None] * len(items)
+        if readable:
+            features = np.stack([_input_features(items[i][1], items[i][2]) for i in readable])
+            best, confidence = predict(*self._model, features)
+            for i, index, conf in zip(readable, best.tolist(), confidence.tolist()):
+                results[i] = self._to_result(items[i][0], items[i][1], index, conf)
+        return [result or self.fallback.classify(name, path)
+                for result, (name, path, _tensor) in zip(results, items)]
+
+    def classify(self, image_name, image_path=None, tensor=None):
+        return self.classify_batch([(image_name, image_path, tensor)])[0]
+
+    async def _run_batch(self, items):
+        start = time.perf_counter()
+        inputs = [(str(path), tensor) for _name, path, tensor in items]
+        loop = asyncio.get_running_loop()
+        pool = self._pool
+        try:
+            best, confidence = await loop.run_in_executor(pool, _predict_inputs, inputs)
+        except BrokenProcessPool:
+            # This batch falls back to the rules (classify_async); later ones
+            # get the new pool
+            self._replace_broken_pool(pool)
+            raise
+        METRICS.inc("civic_inference_batches_total")
+        METRICS.inc("civic_inference_images_total", len(items))
+        METRICS.inc("civic_inference_tensor_inputs_total", sum(tensor is not None for _path, tensor in inputs))
+        METRICS.observe("civic_stage_seconds", time.perf_counter() - start, stage="inference")
+        return [self._to_result(name, path, index, conf)
+                for (name, path, _tensor), index, conf in zip(items, best, confidence)]
+
+    async def classify_async(self, image_name, image_path=None, tensor=None):
+        if (image_path is None and tensor is None) or self._pool is None:
+            return self.classify(image_name, image_path, tensor)
+        try:
+            return await self.batcher.submit((image_name, image_path, tensor))
+        except Exception:
+            logger.exception("Model inference failed, using rule fallback", extra={"image": image_name})
+            return self.fallback.classify(image_name, image_path)
+
+
+# ========================================
+# BACKEND SELECTION
+# ========================================
+
+def create_backend(name=BACKEND_NAME):
+    if name == "rules":
+        return RuleBasedBackend()
+    if name == "numpy":
+        return NumpyModelBackend()
+    raise ValueError(f"Unknown classifier backend: {name}")
+
+
+CLASSIFIER = create_backend()
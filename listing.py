@@ -0,0 +1,89 @@
+"""
+Keyset (cursor) pagination over stored complaints, newest first.
+
+Pages are ordered by (created_at, id) descending and continue from the last
+row of the previous page with a row-value comparison, so every page is an
+index range scan on one of the composite (filter, created_at, id) indexes
+in models.py. Deep pages cost the same as the first; OFFSET would read and
+discard every skipped row.
+"""
+
+from datetime import datetime
+import base64
+
+from sqlalchemy import select, tuple_
+
+from models import Complaint
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+FILTERS = ("department", "priority", "severity", "issue_type")
+
+_COLUMNS = (
+    Complaint.id, Complaint.report_id, Complaint.created_at, Complaint.issue_type,
+    Complaint.category, Complaint.severity, Complaint.priority, Complaint.department,
+    Complaint.status, Complaint.address, Complaint.latitude, Complaint.longitude,
+    Complaint.confirmations,
+)
+
+
+def encode_cursor(created_at, complaint_id):
+    """Opaque cursor for the position after (created_at, id)"""
+    raw = f"{created_at.isoformat()}|{complaint_id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from a cursor. Raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+        created_at, complaint_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(complaint_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _row_to_dict(row):
+    return {
+        "id": row.id,
+        "report_id": row.report_id,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "issue_type": row.issue_type,
+        "category": row.category,
+        "severity": row.severity,
+        "priority": row.priority,
+        "department": row.department,
+        "status": row.status,
+        "address": row.address,
+        "lat": row.latitude,
+        "lng": row.longitude,
+        "confirmations": row.confirmations or 0,
+    }
+
+
+def list_complaints(session, cursor=None, limit=DEFAULT_PAGE_SIZE, **filters):
+    """
+    One page of complaints, newest first, optionally filtered by equality on
+    department, priority, severity and issue_type.
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    """
+    query = select(*_COLUMNS)
+    for field in FILTERS:
+        value = filters.get(field)
+        if value:
+            query = query.where(getattr(Complaint, field) == value)
+    if cursor:
+        created_at, complaint_id = decode_cursor(cursor)
+        query = query.where(tuple_(Complaint.created_at, Complaint.id) < (created_at, complaint_id))
+
+    # One extra row tells us whether another page exists
+    query = query.order_by(Complaint.created_at.desc(), Complaint.id.desc()).limit(limit + 1)
+    rows = session.execute(query).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return [_row_to_dict(row) for row in rows], next_cursor
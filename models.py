@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, Float
 from database import Base
 
 class Complaint(Base):
@@ -14,6 +16,53 @@ class Complaint(Base):
     latitude = Column(Float)
     longitude = Column(Float)
     address = Column(String)
+    ward = Column(String)
     resolution_timeline = Column(String)
     department = Column(String)
     complaint_text = Column(String)
+    status = Column(String, default="open", index=True)
+    confirmations = Column(Integer, default=0)
+    last_confirmed_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
+    rules_version = Column(String)
+
+    # Keyset pagination (newest first) over the whole table and per filter
+    __table_args__ = (
+        Index("ix_complaints_created", "created_at", "id"),
+        Index("ix_complaints_department_created", "department", "created_at", "id"),
+        Index("ix_complaints_priority_created", "priority", "created_at", "id"),
+        Index("ix_complaints_severity_created", "severity", "created_at", "id"),
+        Index("ix_complaints_issue_type_created", "issue_type", "created_at", "id"),
+    )
+
+
+class ComplaintStat(Base):
+    """Materialized count of open complaints per (dimension, value); see stats.py"""
+    __tablename__ = "complaint_stats"
+
+    dimension = Column(String, primary_key=True)
+    value = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class DispatchTask(Base):
+    """Department work queue entry mirrored from dispatch.DISPATCH_QUEUE"""
+    __tablename__ = "dispatch_tasks"
+
+    id = Column(Integer, primary_key=True)
+    report_id = Column(String, unique=True, nullable=False)
+    department = Column(String, nullable=False)
+    priority = Column(String)
+    priority_rank = Column(Integer, nullable=False)
+    due_at = Column(DateTime, nullable=False)
+    state = Column(String, nullable=False, default="queued")
+    claimed_by = Column(String)
+    claimed_at = Column(DateTime)
+    lease_until = Column(DateTime)
+    completed_at = Column(DateTime)
+
+    __table_args__ = (
+        # next-due / overdue per department, and the expired-lease sweep
+        Index("ix_dispatch_department_state_due", "department", "state", "due_at", "priority_rank"),
+        Index("ix_dispatch_state_lease", "state", "lease_until"),
+    )
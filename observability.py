@@ -0,0 +1,308 @@
+"""
+Logging and in-process metrics.
+
+Logging goes through a QueueHandler, so request threads only enqueue log
+records; a QueueListener thread formats and writes them. Per-stage timers
+feed latency histograms that /metrics exposes in Prometheus text format.
+"""
+
+from contextlib import contextmanager
+import atexit
+import bisect
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+
+LOG_LEVEL = os.environ.get("CIVIC_LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("CIVIC_LOG_FORMAT", "json")
+
+# Latency buckets in seconds (upper bounds)
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+logger = logging.getLogger("civic")
+
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+# ========================================
+# LOGGING
+# ========================================
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra=` fields are included as keys"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+_listener = None
+_config_lock = threading.Lock()
+
+
+def configure_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, stream=None):
+    """
+    Routes the "civic" logger through a non-blocking queue handler.
+    Safe to call more than once; only the first call installs handlers.
+    """
+    global _listener
+    with _config_lock:
+        if _listener is not None:
+            return
+        handler = logging.StreamHandler(stream)
+        if fmt == "json":
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        logger.setLevel(level)
+        logger.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def _restart_logging_after_fork():
+    """The listener thread does not survive fork(); start a fresh one"""
+    global _config_lock
+    _config_lock = threading.Lock()
+    if _listener is not None:
+        _listener._thread = None
+        _listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_logging_after_fork)
+
+
+def shutdown_logging():
+    """Flushes and stops the log listener thread"""
+    global _listener
+    with _config_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+# ========================================
+# METRICS
+# ========================================
+
+class Histogram:
+    """Cumulative-bucket latency histogram (thread-safe)"""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Approximate quantile (upper bound of the bucket it falls in)"""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= rank:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+
+class MetricsRegistry:
+    """Named counters, gauges and histograms, keyed by (name, label tuple)"""
+
+    def __init__(self):
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def histogram(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+        return histogram
+
+    def observe(self, name, value, **labels):
+        self.histogram(name, **labels).observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        histogram = self.histogram(name, **labels)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+    def stage(self, stage):
+        """Times one pipeline stage into civic_stage_seconds{stage=...}"""
+        return self.timer("civic_stage_seconds", stage=stage)
+
+    def counter_value(self, name, **labels):
+        return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def gauge_value(self, name, **labels):
+        return self._gauges.get((name, tuple(sorted(labels.items()))), 0)
+
+    def snapshot(self):
+        """JSON-friendly view: counters, gauges, and count/sum/p50/p95/p99 per histogram"""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = dict(self._histograms)
+        return {
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(counters.items())
+            ],
+            "gauges": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(gauges.items())
+            ],
+            "histograms": [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": h.count,
+                    "sum": h.sum,
+                    "p50": h.quantile(0.50),
+                    "p95": h.quantile(0.95),
+                    "p99": h.quantile(0.99),
+                }
+                for (name, labels), h in sorted(histograms.items())
+            ],
+        }
+
+    def dump(self):
+        """Raw counters, gauges and histogram buckets (JSON-serializable)"""
+        with self._lock:
+            counters = list(self._counters.items())
+            gauges = list(self._gauges.items())
+            histograms = list(self._histograms.items())
+        dumped_histograms = []
+        for (name, labels), h in histograms:
+            with h._lock:
+                dumped_histograms.append([name, labels, list(h.counts), h.sum, h.count])
+        return {
+            "counters": [[name, labels, value] for (name, labels), value in counters],
+            "gauges": [[name, labels, value] for (name, labels), value in gauges],
+            "histograms": dumped_histograms,
+        }
+
+    def merge(self, state):
+        """Adds another registry's dump() into this one (gauges are summed)"""
+        def key(name, labels):
+            return name, tuple(tuple(pair) for pair in labels)
+
+        with self._lock:
+            for name, labels, value in state["counters"]:
+                k = key(name, labels)
+                self._counters[k] = self._counters.get(k, 0) + value
+            for name, labels, value in state["gauges"]:
+                k = key(name, labels)
+                self._gauges[k] = self._gauges.get(k, 0) + value
+        for name, labels, counts, total, count in state["histograms"]:
+            histogram = self.histogram(name, **dict(key(name, labels)[1]))
+            with histogram._lock:
+                if len(counts) != len(histogram.counts):
+                    continue
+                histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+                histogram.sum += total
+                histogram.count += count
+
+    def render_prometheus(self):
+        """Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(self._histograms.items())
+
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for (name, labels), value in gauges:
+            if name not in typed:
+                lines.append(f"# TYPE {name} gauge")
+                typed.add(name)
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for (name, labels), h in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            with h._lock:
+                counts, total, count = list(h.counts), h.sum, h.count
+            cumulative = 0
+            for bound, bucket_count in zip(h.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_labels(labels, le=repr(bound))} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(labels, le='+Inf')} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {total}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ""
+    body = ",".join(f'{key}="{_escape_label(value)}"' for key, value in pairs)
+    return "{" + body + "}"
+
+
+METRICS = MetricsRegistry()
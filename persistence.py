@@ -0,0 +1,333 @@
+"""
+Write-behind persistence of finished reports into the Complaint table.
+Reports (CivicReport objects or report dicts) are queued in memory and flushed by a background thread in group
+commits (by batch size or flush interval), one SessionLocal per batch.
+Duplicate submissions are queued as ReportConfirmation items, which only
+bump the counters on the original complaint. The original may not be
+committed yet when its confirmation is written (it can still be in another
+worker's queue, see dedupe.py), so unmatched confirmations are retried
+until it appears, for up to CIVIC_CONFIRMATION_MAX_WAIT seconds. Open-complaint statistics
+(stats.py) and department dispatch tasks (dispatch.py) are written in the
+same transaction. Transient database errors (a locked SQLite file, a
+dropped connection) are retried with backoff before a batch counts as
+failed, since its reports were already acknowledged to the reporters.
+"""
+
+from collections import Counter
+from datetime import datetime
+import asyncio
+import os
+import queue
+import threading
+import time
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from database import DURABILITY, SessionLocal
+from dispatch import enqueue_new
+from models import Complaint
+from observability import METRICS, logger
+from report_ids import decode_timestamp
+from rules import RULES
+from stats import track_new
+
+
+QUEUE_SIZE = int(os.environ.get("CIVIC_WRITE_QUEUE_SIZE", 10000))
+BATCH_SIZE = int(os.environ.get("CIVIC_WRITE_BATCH_SIZE", 200))
+FLUSH_INTERVAL = float(os.environ.get("CIVIC_WRITE_FLUSH_INTERVAL", 0.25))
+WRITE_RETRIES = int(os.environ.get("CIVIC_WRITE_RETRIES", 5))
+WRITE_RETRY_BACKOFF = float(os.environ.get("CIVIC_WRITE_RETRY_BACKOFF", 0.1))
+CONFIRMATION_MAX_WAIT = float(os.environ.get("CIVIC_CONFIRMATION_MAX_WAIT", 30))
+
+_STOP = object()
+
+
+class ReportConfirmation:
+    """A duplicate submission confirming an existing open report"""
+
+    __slots__ = ("report_id", "confirmed_at")
+
+    def __init__(self, report_id, confirmed_at=None):
+        self.report_id = report_id
+        self.confirmed_at = confirmed_at or datetime.now()
+
+
+def _item_report_id(item):
+    if isinstance(item, dict):
+        return item["report_id"]
+    return item.report_id
+
+
+def _created_at(report_id):
+    """Creation time from the (time-sortable) report ID, not the flush time"""
+    try:
+        return datetime.fromtimestamp(decode_timestamp(report_id))
+    except (ValueError, OverflowError, OSError):
+        return datetime.now()
+
+
+def report_to_complaint(report):
+    """
+    Maps a CivicReport or get_report_json() dict onto a Complaint row.
+    A simulated location (no coordinates were submitted) is stored as NULL,
+    so it never shows up in spatial queries or duplicate detection.
+    """
+    if isinstance(report, dict):
+        simulated = report.get("location_simulated", False)
+    else:
+        simulated = report.location_simulated
+        report = report.to_dict()
+    issue = report["issue"]
+    location = {} if simulated else report.get("location") or {}
+    return Complaint(
+        report_id=report["report_id"],
+        created_at=_created_at(report["report_id"]),
+        issue_type=issue["type"],
+        category=issue["category"],
+        confidence=issue["confidence"],
+        severity=issue["severity"],
+        priority=issue["priority"],
+        latitude=location.get("lat"),
+        longitude=location.get("lng"),
+        address=location.get("address"),
+        ward=location.get("ward"),
+        resolution_timeline=report["resolution_timeline"],
+        department=report["department"],
+        complaint_text=report["complaint"],
+        rules_version=RULES.version,
+    )
+
+
+class ReportWriter:
+    """
+    Bounded queue + background flusher for report persistence.
+    In "sync" durability mode submissions are committed before returning.
+    """
+
+    def __init__(self, session_factory=SessionLocal, durability=DURABILITY,
+                 queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.session_factory = session_factory
+        self.durability = durability
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.failed = 0
+        self.confirmed = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+
+    # ---- lifecycle ----
+
+    def start(self):
+        if self.durability == "sync" or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="report-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Flushes everything still queued, then stops the flusher thread"""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def flush(self):
+        """Blocks until every report queued so far has been written"""
+        self._queue.join()
+
+    # ---- submission ----
+
+    def submit(self, report):
+        """Queues a report (blocks while the queue is full) or writes it in sync mode"""
+        if self.durability == "sync":
+            pending = self.write_retrying([report])
+            while pending:
+                time.sleep(self.flush_interval)
+                pending = self.write_retrying(pending)
+        else:
+            self._queue.put(report)
+
+    async def submit_async(self, report):
+        """Event-loop friendly submit: never waits on disk in write-behind mode
+        unless the queue is full, and then waits on a worker thread."""
+        if self.durability != "sync":
+            try:
+                self._queue.put_nowait(report)
+                return
+            except queue.Full:
+                pass
+        await asyncio.to_thread(self.submit, report)
+
+    # ---- flushing ----
+
+    def write_batch(self, items):
+        """
+        Group-commits reports and confirmations in one session.
+        New complaints are inserted before confirmations are applied, so a
+        confirmation can land in the same batch as its original report.
+        Bad rows are isolated by retrying one by one on conflict.
+        Returns the confirmations whose original is not stored yet, to be
+        written again later.
+        """
+        if not items:
+            return []
+        reports = [item for item in items if not isinstance(item, ReportConfirmation)]
+        confirmations = [item for item in items if isinstance(item, ReportConfirmation)]
+        start = time.perf_counter()
+        session = self.session_factory()
+        try:
+            complaints = [report_to_complaint(r) for r in reports]
+            session.add_all(complaints)
+            session.flush()
+            unmatched = self._apply_confirmations(session, confirmations)
+            track_new(session, complaints)
+            enqueue_new(session, complaints)
+            session.commit()
+            applied = len(confirmations) - len(unmatched)
+            self.written += len(reports)
+            self.confirmed += applied
+            METRICS.inc("civic_persisted_reports_total", len(reports))
+            METRICS.inc("civic_persisted_confirmations_total", applied)
+            METRICS.observe("civic_stage_seconds", time.perf_counter() - start, stage="persistence")
+            return self._still_pending(unmatched)
+        except IntegrityError:
+            session.rollback()
+            if len(items) == 1:
+                self.failed += 1
+                METRICS.inc("civic_persist_failed_total")
+                logger.error("Could not persist report", extra={"report_id": _item_report_id(items[0])})
+                return []
+            pending = []
+            for item in items:
+                # Retried and counted one by one: re-running the whole batch
+                # after some items committed would apply confirmations twice
+                try:
+                    pending += self.write_retrying([item])
+                except Exception:
+                    self._count_failed([item])
+            return pending
+        finally:
+            session.close()
+
+    def write_retrying(self, items):
+        """write_batch, retrying OperationalError with exponential backoff"""
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                return self.write_batch(items)
+            except OperationalError as e:
+                if attempt == WRITE_RETRIES:
+                    raise
+                delay = WRITE_RETRY_BACKOFF * 2 ** attempt
+                METRICS.inc("civic_persist_retries_total")
+                logger.warning("Retrying report batch after database error",
+                               extra={"batch_size": len(items), "attempt": attempt + 1, "error": str(e.orig)})
+                time.sleep(delay)
+
+    def _count_failed(self, items):
+        self.failed += len(items)
+        METRICS.inc("civic_persist_failed_total", len(items))
+        logger.exception("Failed to persist report batch", extra={"batch_size": len(items)})
+
+    def _apply_confirmations(self, session, confirmations):
+        """Applies confirmations; returns those whose original isn't stored"""
+        counts = Counter(c.report_id for c in confirmations)
+        latest = {}
+        for confirmation in confirmations:
+            latest[confirmation.report_id] = max(
+                confirmation.confirmed_at, latest.get(confirmation.report_id, confirmation.confirmed_at)
+            )
+        missing = set()
+        for report_id, count in counts.items():
+            result = session.execute(
+                update(Complaint)
+                .where(Complaint.report_id == report_id)
+                .values(
+                    confirmations=func.coalesce(Complaint.confirmations, 0) + count,
+                    last_confirmed_at=latest[report_id],
+                )
+            )
+            if not result.rowcount:
+                missing.add(report_id)
+        return [c for c in confirmations if c.report_id in missing]
+
+    def _still_pending(self, unmatched, now=None):
+        """Unmatched confirmations still worth retrying; gives up on the rest"""
+        now = now or datetime.now()
+        pending = []
+        for confirmation in unmatched:
+            if (now - confirmation.confirmed_at).total_seconds() < CONFIRMATION_MAX_WAIT:
+                pending.append(confirmation)
+            else:
+                self.failed += 1
+                METRICS.inc("civic_persist_failed_total")
+                logger.error("Confirmed report was never stored", extra={"report_id": confirmation.report_id})
+        if pending:
+            METRICS.inc("civic_confirmations_deferred_total", len(pending))
+        return pending
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                break
+            batch = [item]
+            stopping = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._flush(batch, requeue=not stopping)
+            if stopping:
+                self._drain()
+                self._queue.task_done()
+                break
+
+    def _drain(self):
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            self._flush(batch, requeue=False)
+
+    def _flush(self, batch, requeue=True):
+        try:
+            pending = self.write_retrying(batch)
+        except Exception:
+            self._count_failed(batch)
+        else:
+            for confirmation in pending:
+                # Written again with a later batch; not while shutting down,
+                # when nothing else may ever store the original
+                if requeue:
+                    try:
+                        self._queue.put_nowait(confirmation)
+                        continue
+                    except queue.Full:
+                        pass
+                self.failed += 1
+                METRICS.inc("civic_persist_failed_total")
+                logger.error("Dropped confirmation of a report not stored yet",
+                             extra={"report_id": confirmation.report_id})
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+
+REPORT_WRITER = ReportWriter()
@@ -0,0 +1,203 @@
+"""
+Image preprocessing for uploaded photos, off the request thread.
+
+One pass over each file, in a process pool:
+  - EXIF GPS coordinates (used when the form has no latitude/longitude)
+  - reduced-size JPEG decode via Pillow's draft mode (DCT scaling), so a
+    12 MP phone photo is decoded at 1/2, 1/4 or 1/8 resolution
+  - a dashboard thumbnail, stored next to the upload in the content store
+  - optionally the model input tensor (RGB uint8, HWC) for pixel models
+
+Each worker has a pixel budget and, on Linux, an address-space limit, so
+one hostile or huge image cannot take the server down; a pool whose worker
+was killed is replaced for the next request. Pillow is optional;
+without it preprocessing is skipped and the rest of the pipeline runs as
+before.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import os
+import tempfile
+
+from observability import METRICS, logger
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional: preprocessing is skipped without Pillow
+    Image = None
+
+
+PREPROCESS_WORKERS = int(os.environ.get("CIVIC_PREPROCESS_WORKERS", 2))
+PREPROCESS_MEMORY_MB = int(os.environ.get("CIVIC_PREPROCESS_MEMORY_MB", 1024))
+MAX_IMAGE_PIXELS = int(os.environ.get("CIVIC_MAX_IMAGE_PIXELS", 50_000_000))
+MODEL_INPUT_SIZE = int(os.environ.get("CIVIC_MODEL_INPUT_SIZE", 224))
+THUMBNAIL_SIZE = int(os.environ.get("CIVIC_THUMBNAIL_SIZE", 320))
+THUMBNAIL_QUALITY = 80
+
+THUMBNAIL_SUFFIX = ".thumb.jpg"
+
+_GPS_IFD = 0x8825
+
+
+class PreprocessResult:
+    """Output of one preprocessing pass"""
+
+    __slots__ = ("gps", "thumbnail_path", "tensor", "tensor_shape", "original_size")
+
+    def __init__(self, gps=None, thumbnail_path=None, tensor=None, tensor_shape=None, original_size=None):
+        self.gps = gps
+        self.thumbnail_path = thumbnail_path
+        self.tensor = tensor
+        self.tensor_shape = tensor_shape
+        self.original_size = original_size
+
+
+def thumbnail_path_for(image_path):
+    return str(image_path) + THUMBNAIL_SUFFIX
+
+
+# ========================================
+# WORKER SIDE
+# ========================================
+
+def _init_worker(max_pixels, memory_mb):
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    if memory_mb:
+        try:
+            import resource
+            limit = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError):
+            pass
+
+
+def _to_degrees(value, ref):
+    degrees, minutes, seconds = (float(part) for part in value)
+    result = degrees + minutes / 60.0 + seconds / 3600.0
+    return -result if ref in ("S", "W") else result
+
+
+def extract_gps(image):
+    """(lat, lng) from EXIF GPSInfo, or None"""
+    try:
+        gps = image.getexif().get_ifd(_GPS_IFD)
+        if not gps or 2 not in gps or 4 not in gps:
+            return None
+        lat = _to_degrees(gps[2], gps.get(1, "N"))
+        lng = _to_degrees(gps[4], gps.get(3, "E"))
+    except (KeyError, TypeError, ValueError, ZeroDivisionError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180) or (lat == 0 and lng == 0):
+        return None
+    return round(lat, 6), round(lng, 6)
+
+
+def preprocess_file(image_path, thumbnail_path, want_tensor=False,
+                    model_size=MODEL_INPUT_SIZE, thumbnail_size=THUMBNAIL_SIZE):
+    """
+    Opens the image once and produces GPS, thumbnail and (optionally) the
+    model tensor. Runs inside a pool worker. Returns a PreprocessResult.
+    """
+    with Image.open(image_path) as image:
+        original_size = image.size
+        if original_size[0] * original_size[1] > Image.MAX_IMAGE_PIXELS:
+            raise ValueError(f"Image too large: {original_size[0]}x{original_size[1]}")
+        gps = extract_gps(image)
+
+        # Decode JPEGs at the smallest DCT scale still >= what we need
+        target = max(model_size if want_tensor else 0, thumbnail_size)
+        image.draft("RGB", (target, target))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+
+        tensor = tensor_shape = None
+        if want_tensor:
+            model_input = ImageOps.fit(image, (model_size, model_size), Image.BILINEAR)
+            tensor = model_input.tobytes()
+            tensor_shape = (model_size, model_size, 3)
+
+        image.thumbnail((thumbnail_size, thumbnail_size), Image.BILINEAR)
+        # Thumbnails are content-addressed, so concurrent uploads of the same
+        # image write the same path: each writes its own temp file first
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(thumbnail_path) or ".", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                image.save(f, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+            os.replace(temp_path, thumbnail_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    return PreprocessResult(gps, thumbnail_path, tensor, tensor_shape, original_size)
+
+
+# ========================================
+# POOL
+# ========================================
+
+class Preprocessor:
+    """Process pool wrapper; `await preprocess(upload)` from async endpoints"""
+
+    def __init__(self, workers=PREPROCESS_WORKERS, memory_mb=PREPROCESS_MEMORY_MB,
+                 max_pixels=MAX_IMAGE_PIXELS):
+        self.workers = workers
+        self.memory_mb = memory_mb
+        self.max_pixels = max_pixels
+        self._pool = None
+
+    @property
+    def available(self):
+        return Image is not None
+
+    def start(self):
+        if not self.available:
+            logger.warning("Pillow not installed; image preprocessing disabled")
+            return
+        if self._pool is None:
+            self._pool = self._new_pool()
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(
+            self.workers, initializer=_init_worker, initargs=(self.max_pixels, self.memory_mb)
+        )
+
+    def _replace_broken_pool(self, broken):
+        """A worker died (OOM, memory limit): swap in a fresh pool"""
+        if self._pool is not broken:
+            return  # already replaced, or stopped
+        self._pool = self._new_pool()
+        broken.shutdown(wait=False, cancel_futures=True)
+        METRICS.inc("civic_pool_restarts_total", pool="preprocess")
+        logger.warning("Preprocessing pool broken, restarted")
+
+    def stop(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def preprocess(self, upload, want_tensor=False):
+        """PreprocessResult for an IngestedUpload, or None if unavailable/failed"""
+        pool = self._pool
+        if pool is None:
+            return None
+        thumbnail_path = thumbnail_path_for(upload.path)
+        loop = asyncio.get_running_loop()
+        try:
+            with METRICS.stage("preprocess"):
+                return await loop.run_in_executor(
+                    pool, preprocess_file, str(upload.path), thumbnail_path, want_tensor
+                )
+        except BrokenProcessPool:
+            # Not retried: the image may be what killed the worker
+            self._replace_broken_pool(pool)
+            METRICS.inc("civic_preprocess_failed_total")
+            logger.warning("Image preprocessing failed", extra={"sha256": upload.sha256, "error": "worker died"})
+            return None
+        except Exception as e:
+            METRICS.inc("civic_preprocess_failed_total")
+            logger.warning("Image preprocessing failed", extra={"sha256": upload.sha256, "error": str(e)})
+            return None
+
+
+PREPROCESSOR = Preprocessor()
@@ -0,0 +1,112 @@
+"""
+Collision-free, k-sortable report IDs.
+
+IDs look like CIV01JAB3... : "CIV" followed by 26 Crockford base32 chars
+encoding 128 bits, ULID-style:
+
+    48 bits  milliseconds since the Unix epoch
+    40 bits  worker component (per process, re-drawn after fork)
+    40 bits  per-process sequence, strictly increasing
+
+IDs sort by creation time, are strictly monotonic within a process and
+cannot collide across processes unless two workers draw the same 40-bit
+worker value. Set CIVIC_WORKER_ID to pin the worker component explicitly.
+"""
+
+import base64
+import os
+import secrets
+import threading
+import time
+
+
+PREFIX = "CIV"
+
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_TO_CROCKFORD = bytes.maketrans(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ234567", _ALPHABET.encode())
+_FROM_CROCKFORD = bytes.maketrans(_ALPHABET.encode(), b"ABCDEFGHIJKLMNOPQRSTUVWXYZ234567")
+_WORKER_BITS = 40
+_SEQUENCE_BITS = 40
+_SEQUENCE_MASK = (1 << _SEQUENCE_BITS) - 1
+
+
+class ReportIdGenerator:
+    """Thread-safe monotonic ID generator for one process"""
+
+    def __init__(self, worker_id=None):
+        self._lock = threading.Lock()
+        self._fixed_worker = worker_id
+        self._reset()
+
+    def _reset(self):
+        if self._fixed_worker is not None:
+            self.worker_id = int(self._fixed_worker) & ((1 << _WORKER_BITS) - 1)
+        else:
+            self.worker_id = secrets.randbits(_WORKER_BITS)
+        self._last_ms = 0
+        self._sequence = secrets.randbits(_SEQUENCE_BITS - 8)
+
+    def after_fork(self):
+        """Child processes must not share the parent's worker component"""
+        self._lock = threading.Lock()
+        self._reset()
+
+    def next_int(self):
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+            # Clock went backwards or same millisecond: keep the last
+            # timestamp; the sequence keeps IDs strictly increasing.
+            self._sequence = (self._sequence + 1) & _SEQUENCE_MASK
+            if self._sequence == 0:
+                self._last_ms += 1
+            ms = self._last_ms
+            sequence = self._sequence
+        return (ms << (_WORKER_BITS + _SEQUENCE_BITS)) | (self.worker_id << _SEQUENCE_BITS) | sequence
+
+    def next_id(self):
+        return PREFIX + encode(self.next_int())
+
+
+def encode(value):
+    """128-bit integer -> 26 char Crockford base32 (fixed width, sortable)"""
+    encoded = base64.b32encode(value.to_bytes(16, "big"))[:26]
+    return encoded.translate(_TO_CROCKFORD).decode("ascii")
+
+
+def decode(report_id):
+    """Report ID -> 128-bit integer"""
+    encoded = report_id[len(PREFIX):].encode("ascii").translate(_FROM_CROCKFORD)
+    return int.from_bytes(base64.b32decode(encoded + b"======"), "big")
+
+
+def lower_bound(timestamp):
+    """Smallest possible report ID created at or after `timestamp` (seconds)"""
+    return PREFIX + encode(int(timestamp * 1000) << (_WORKER_BITS + _SEQUENCE_BITS))
+
+
+def decode_timestamp(report_id):
+    """Creation time (seconds since epoch) encoded in a report ID"""
+    return (decode(report_id) >> (_WORKER_BITS + _SEQUENCE_BITS)) / 1000.0
+
+
+_GENERATOR = ReportIdGenerator(os.environ.get("CIVIC_WORKER_ID"))
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_GENERATOR.after_fork)
+
+
+def set_worker_id(worker_id):
+    """
+    Sets this process's worker component (the multi-worker launcher hands
+    each forked worker a distinct value instead of a random draw). Not
+    inherited: processes this one forks still draw their own.
+    """
+    with _GENERATOR._lock:
+        _GENERATOR.worker_id = int(worker_id) & ((1 << _WORKER_BITS) - 1)
+
+
+def new_report_id():
+    """Next report ID from the process-wide generator"""
+    return _GENERATOR.next_id()
@@ -0,0 +1,186 @@
+"""
+Re-scores stored complaints against the current decision table.
+
+When config/decision_table.json changes (a new severity cutoff, a new
+department mapping), historical complaints keep the severity, priority,
+timeline and department they were scored with. This job walks the table in
+id-ordered chunks, evaluates each chunk with NumPy
+(DecisionTable.evaluate_arrays), and bulk-updates only the rows whose
+outcome or rules_version changed. Queued dispatch tasks are re-prioritized
+to match, and the open-complaint statistics are rebuilt at the end.
+
+    python -m rescore [--chunk-size 50000] [--dry-run] [--notify http://localhost:8000]
+
+Running API servers cache the dispatch queues and statistics in memory.
+With --notify (or CIVIC_RELOAD_URLS, comma-separated) each server's
+POST /api/admin/reload is called after a run that changed rows, and every
+worker of that server reloads both from the tables. CIVIC_ADMIN_TOKEN is
+sent as X-Admin-Token when set.
+"""
+
+from collections import Counter
+import argparse
+import os
+import time
+import urllib.request
+
+from sqlalchemy import bindparam, select, update
+
+from database import SessionLocal
+from dispatch import DONE, PRIORITY_RANK, due_at_for
+from models import Complaint, DispatchTask
+from observability import METRICS, configure_logging, logger
+from rules import RULES, np
+from stats import rebuild as rebuild_stats
+
+
+RESCORE_CHUNK_SIZE = int(os.environ.get("CIVIC_RESCORE_CHUNK", 50000))
+RELOAD_URLS = [url.strip() for url in os.environ.get("CIVIC_RELOAD_URLS", "").split(",") if url.strip()]
+NOTIFY_TIMEOUT = 30
+
+_SCORED = ("severity", "priority", "resolution_timeline", "department")
+
+_UPDATE_TASKS = (
+    update(DispatchTask.__table__)
+    .where(DispatchTask.__table__.c.report_id == bindparam("b_report_id"),
+           DispatchTask.__table__.c.state != DONE)
+    .values(
+        department=bindparam("b_department"),
+        priority=bindparam("b_priority"),
+        priority_rank=bindparam("b_priority_rank"),
+        due_at=bindparam("b_due_at"),
+    )
+)
+
+
+def _load_chunk(session, after_id, chunk_size):
+    return session.execute(
+        select(Complaint.id, Complaint.report_id, Complaint.issue_type, Complaint.confidence,
+               Complaint.created_at, Complaint.rules_version,
+               *(getattr(Complaint, column) for column in _SCORED))
+        .where(Complaint.id > after_id)
+        .order_by(Complaint.id)
+        .limit(chunk_size)
+    ).all()
+
+
+def rescore_chunk(rows, table=RULES):
+    """
+    Evaluates one chunk. Returns (complaint updates, dispatch task updates,
+    Counter of changed fields) for the rows that need writing.
+    """
+    columns = list(zip(*rows))
+    ids, report_ids, issue_types, confidences, created, versions = columns[:6]
+    current = dict(zip(_SCORED, (np.array(values, dtype=object) for values in columns[6:])))
+
+    # Stored confidence is a percentage (report["issue"]["confidence"])
+    ratio = np.array([c if c is not None else 0.0 for c in confidences], dtype=np.float64) / 100.0
+    scored = dict(zip(_SCORED, table.evaluate_arrays(issue_types, ratio)))
+
+    changed = np.zeros(len(rows), dtype=bool)
+    counts = Counter()
+    for column in _SCORED:
+        differs = scored[column] != current[column]
+        counts[column] = int(differs.sum())
+        changed |= differs
+    stale_version = np.array(versions, dtype=object) != table.version
+
+    complaint_updates = []
+    task_updates = []
+    for i in np.flatnonzero(changed | stale_version).tolist():
+        values = {column: scored[column][i] for column in _SCORED}
+        complaint_updates.append({"id": ids[i], "rules_version": table.version, **values})
+        if changed[i]:
+            task_updates.append({
+                "b_report_id": report_ids[i],
+                "b_department": values["department"],
+                "b_priority": values["priority"],
+                "b_priority_rank": PRIORITY_RANK.get(values["priority"], len(PRIORITY_RANK)),
+                "b_due_at": due_at_for(created[i], values["priority"], values["resolution_timeline"]),
+            })
+    counts["rows_changed"] = int(changed.sum())
+    return complaint_updates, task_updates, counts
+
+
+def rescore_backlog(session_factory=SessionLocal, table=RULES, chunk_size=RESCORE_CHUNK_SIZE, dry_run=False):
+    """Re-scores every stored complaint. Returns a Counter of changes."""
+    if np is None:
+        raise RuntimeError("Re-scoring requires NumPy")
+    start = time.perf_counter()
+    totals = Counter()
+    last_id = 0
+    while True:
+        session = session_factory()
+        try:
+            rows = _load_chunk(session, last_id, chunk_size)
+            if not rows:
+                break
+            last_id = rows[-1].id
+            complaint_updates, task_updates, counts = rescore_chunk(rows, table)
+            totals.update(counts)
+            totals["rows_scanned"] += len(rows)
+            if not dry_run:
+                if complaint_updates:
+                    session.execute(update(Complaint), complaint_updates)
+                if task_updates:
+                    session.connection().execute(_UPDATE_TASKS, task_updates)
+                session.commit()
+        finally:
+            session.close()
+        logger.info("Re-scored chunk", extra={"last_id": last_id, **totals})
+
+    if totals["rows_changed"] and not dry_run:
+        rebuild_stats(session_factory)
+    elapsed = time.perf_counter() - start
+    METRICS.observe("civic_stage_seconds", elapsed, stage="rescore")
+    logger.info("Backlog re-scored", extra={"version": table.version, "seconds": round(elapsed, 2), **totals})
+    return totals
+
+
+def notify_servers(base_urls, token=None, timeout=NOTIFY_TIMEOUT):
+    """
+    Asks each running server to reload its cached queues and statistics.
+    Returns the base URLs that could not be notified.
+    """
+    failed = []
+    for base_url in base_urls:
+        request = urllib.request.Request(base_url.rstrip("/") + "/api/admin/reload", data=b"", method="POST")
+        if token:
+            request.add_header("X-Admin-Token", token)
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+        except OSError as e:
+            logger.warning("Could not notify server to reload", extra={"url": base_url, "error": str(e)})
+            failed.append(base_url)
+        else:
+            logger.info("Server reloaded", extra={"url": base_url})
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score stored complaints with the current decision table")
+    parser.add_argument("--chunk-size", type=int, default=RESCORE_CHUNK_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="report changes without writing them")
+    parser.add_argument("--notify", action="append", default=None, metavar="URL",
+                        help="base URL of a running server to reload afterwards (repeatable; "
+                             "default: CIVIC_RELOAD_URLS)")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    totals = rescore_backlog(chunk_size=args.chunk_size, dry_run=args.dry_run)
+    print(f"Decision table {RULES.version}: scanned {totals['rows_scanned']}, "
+          f"changed {totals['rows_changed']}"
+          + (" (dry run, nothing written)" if args.dry_run else ""))
+    for column in _SCORED:
+        print(f"  {column}: {totals[column]}")
+
+    base_urls = args.notify if args.notify is not None else RELOAD_URLS
+    if totals["rows_changed"] and not args.dry_run and base_urls:
+        failed = notify_servers(base_urls, os.environ.get("CIVIC_ADMIN_TOKEN"))
+        if failed:
+            print("Not reloaded (restart them or POST /api/admin/reload): " + ", ".join(failed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Versioned decision table for severity, priority/timeline and department.
+
+The rules that used to be if-chains in civic_issue_reporter live in
+config/decision_table.json (override with CIVIC_RULES_PATH):
+
+    severity     first row whose min_confidence <= confidence (last row: default)
+    priority     first row whose issue_types / severities both match
+                 (an omitted list matches anything)
+    departments  issue type -> department, with default_department
+
+Two evaluators share one table:
+  - DecisionTable.severity() / priority() / department() for the request
+    path (dict lookups, precomputed per known issue type)
+  - DecisionTable.evaluate_arrays() for re-scoring the stored backlog with
+    NumPy, a chunk at a time (see rescore.py)
+
+Every persisted complaint records the table `version` it was scored with.
+"""
+
+from pathlib import Path
+import json
+import os
+
+try:
+    import numpy as np
+except ImportError:  # optional: only the vectorized evaluator needs it
+    np = None
+
+
+RULES_PATH = Path(os.environ.get(
+    "CIVIC_RULES_PATH", Path(__file__).resolve().parent / "config" / "decision_table.json"
+))
+
+
+class DecisionTable:
+    """Parsed, validated decision table. Raises ValueError on bad config."""
+
+    def __init__(self, version, severity_rules, priority_rules, departments, default_department):
+        self.version = version
+        self.severity_rules = severity_rules
+        self.priority_rules = priority_rules
+        self.departments = departments
+        self.default_department = default_department
+        self.severity_labels = tuple(dict.fromkeys(rule["severity"] for rule in severity_rules))
+
+        # Precomputed (issue_type, severity) -> (priority, timeline) for every
+        # issue type the table knows; others fall back to a rule scan.
+        known = set(departments)
+        for rule in priority_rules:
+            known.update(rule["issue_types"] or ())
+        self._priorities = {
+            (issue_type, severity): self._match_priority(issue_type, severity)
+            for issue_type in known for severity in self.severity_labels
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        try:
+            version = str(data["version"])
+            severity_rules = [
+                {"min_confidence": float(rule["min_confidence"]) if "min_confidence" in rule else None,
+                 "severity": str(rule["severity"])}
+                for rule in data["severity"]
+            ]
+            priority_rules = [
+                {"issue_types": frozenset(rule["issue_types"]) if "issue_types" in rule else None,
+                 "severities": frozenset(rule["severities"]) if "severities" in rule else None,
+                 "priority": str(rule["priority"]),
+                 "timeline": str(rule["timeline"])}
+                for rule in data["priority"]
+            ]
+            departments = {str(k): str(v) for k, v in data.get("departments", {}).items()}
+            default_department = str(data.get("default_department", "General Administration"))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid decision table: {e!r}") from e
+        if not severity_rules or severity_rules[-1]["min_confidence"] is not None:
+            raise ValueError("Invalid decision table: the last severity row must be a default (no min_confidence)")
+        last = priority_rules[-1] if priority_rules else None
+        if last is None or last["issue_types"] is not None or last["severities"] is not None:
+            raise ValueError("Invalid decision table: the last priority row must match everything")
+        return cls(version, severity_rules, priority_rules, departments, default_department)
+
+    @classmethod
+    def load(cls, path=RULES_PATH):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    # ---- scalar evaluator (request path) ----
+
+    def severity(self, confidence):
+        for rule in self.severity_rules:
+            if rule["min_confidence"] is None or confidence >= rule["min_confidence"]:
+                return rule["severity"]
+
+    def _match_priority(self, issue_type, severity):
+        for rule in self.priority_rules:
+            if rule["issue_types"] is not None and issue_type not in rule["issue_types"]:
+                continue
+            if rule["severities"] is not None and severity not in rule["severities"]:
+                continue
+            return rule["priority"], rule["timeline"]
+
+    def priority(self, issue_type, severity):
+        """(priority, timeline)"""
+        result = self._priorities.get((issue_type, severity))
+        return result if result is not None else self._match_priority(issue_type, severity)
+
+    def department(self, issue_type):
+        return self.departments.get(issue_type, self.default_department)
+
+    def evaluate(self, issue_type, confidence):
+        """(severity, priority, timeline, department) for one report"""
+        severity = self.severity(confidence)
+        priority, timeline = self.priority(issue_type, severity)
+        return severity, priority, timeline, self.department(issue_type)
+
+    # ---- vectorized evaluator (backlog re-scoring) ----
+
+    def evaluate_arrays(self, issue_types, confidences):
+        """
+        Vectorized evaluate() over aligned arrays (confidence in 0..1).
+        Returns object arrays (severity, priority, timeline, department).
+        Apart from factorizing the issue types, per-row work is NumPy; the
+        rule lookups run once per distinct issue type, not per row.
+        """
+        if np is None:
+            raise RuntimeError("Vectorized rule evaluation requires NumPy")
+        confidences = np.asarray(confidences, dtype=np.float64)
+        labels = self.severity_labels
+        label_index = {label: i for i, label in enumerate(labels)}
+
+        # Severity: first matching threshold row (np.select is first-match)
+        conditions = [confidences >= rule["min_confidence"] for rule in self.severity_rules[:-1]]
+        choices = [label_index[rule["severity"]] for rule in self.severity_rules[:-1]]
+        severity_codes = np.select(conditions, choices, default=label_index[self.severity_rules[-1]["severity"]])
+
+        # Priority: (distinct issue type x severity) lookup table, then gather
+        distinct, issue_codes = _factorize(issue_types)
+        outcomes = []
+        outcome_index = {}
+        lookup = np.empty((len(distinct), len(labels)), dtype=np.int64)
+        for i, issue_type in enumerate(distinct):
+            for j, label in enumerate(labels):
+                outcome = self.priority(issue_type, label)
+                if outcome not in outcome_index:
+                    outcome_index[outcome] = len(outcomes)
+                    outcomes.append(outcome)
+                lookup[i, j] = outcome_index[outcome]
+        outcome_codes = lookup[issue_codes, severity_codes]
+
+        priorities = np.array([outcome[0] for outcome in outcomes], dtype=object)
+        timelines = np.array([outcome[1] for outcome in outcomes], dtype=object)
+        departments = np.array([self.department(issue_type) for issue_type in distinct], dtype=object)
+        return (
+            np.array(labels, dtype=object)[severity_codes],
+            priorities[outcome_codes],
+            timelines[outcome_codes],
+            departments[issue_codes],
+        )
+
+
+def _factorize(values):
+    """(distinct values, int codes). Hashing beats np.unique's sort on strings."""
+    index = {}
+    codes = np.fromiter((index.setdefault(value, len(index)) for value in values),
+                        dtype=np.int64, count=len(values))
+    return list(index), codes
+
+
+RULES = DecisionTable.load()
@@ -0,0 +1,231 @@
+"""
+Full-text search over stored complaints.
+A SQLite FTS5 external-content table indexes complaints.complaint_text,
+address and issue_type without storing a second copy of the text. Triggers
+keep it in sync, so every insert made by the persistence path (and any
+later edit or delete) updates the index in the same transaction. Matches
+are ranked with BM25, with address and issue type weighted above the long
+generated complaint text, and can be combined with the structured filters
+the dashboard listing uses.
+
+    python -m search rebuild      # re-index everything, then merge segments
+
+Other databases fall back to an unranked substring scan.
+"""
+
+import argparse
+import re
+
+from sqlalchemy import DateTime, and_, bindparam, func, or_, select, text
+
+from models import Complaint
+from observability import logger
+
+
+FTS_TABLE = "complaints_fts"
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_OFFSET = 1000
+MAX_TERMS = 16
+
+FILTERS = ("department", "priority", "severity", "issue_type", "status", "ward")
+
+# bm25() weights in FTS column order: complaint_text, address, issue_type
+WEIGHTS = (1.0, 4.0, 2.0)
+SNIPPET_MARKERS = ("[", "]")
+SNIPPET_TOKENS = 12
+
+_TERM_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE}
+        USING fts5(complaint_text, address, issue_type,
+                   content='complaints', content_rowid='id',
+                   tokenize='porter unicode61 remove_diacritics 2', prefix='2 3')""",
+    f"""CREATE TRIGGER IF NOT EXISTS complaints_fts_insert
+        AFTER INSERT ON complaints
+        BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, complaint_text, address, issue_type)
+                VALUES (new.id, new.complaint_text, new.address, new.issue_type);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS complaints_fts_update
+        AFTER UPDATE OF complaint_text, address, issue_type ON complaints
+        BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, complaint_text, address, issue_type)
+                VALUES ('delete', old.id, old.complaint_text, old.address, old.issue_type);
+            INSERT INTO {FTS_TABLE}(rowid, complaint_text, address, issue_type)
+                VALUES (new.id, new.complaint_text, new.address, new.issue_type);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS complaints_fts_delete
+        AFTER DELETE ON complaints
+        BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, complaint_text, address, issue_type)
+                VALUES ('delete', old.id, old.complaint_text, old.address, old.issue_type);
+        END""",
+]
+
+_EXISTS = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+
+_COLUMNS = """c.id, c.report_id, c.created_at, c.issue_type, c.severity, c.priority,
+              c.department, c.status, c.address, c.ward, c.latitude, c.longitude"""
+
+_FTS_QUERY = f"""
+    SELECT {_COLUMNS},
+           bm25({FTS_TABLE}, {', '.join(str(w) for w in WEIGHTS)}) AS score,
+           snippet({FTS_TABLE}, -1, :mark_open, :mark_close, '…', {SNIPPET_TOKENS}) AS snippet
+    FROM {FTS_TABLE} JOIN complaints c ON c.id = {FTS_TABLE}.rowid
+    WHERE {FTS_TABLE} MATCH :query
+"""
+
+
+def _is_sqlite(bind):
+    return bind.dialect.name == "sqlite"
+
+
+def ensure_search_index(engine):
+    """
+    Creates the FTS5 table and sync triggers. A newly created index is built
+    from the existing rows. Returns True if it was (re)built.
+    No-op on non-SQLite databases.
+    """
+    if not _is_sqlite(engine):
+        return False
+    with engine.begin() as connection:
+        created = connection.execute(text(_EXISTS), {"name": FTS_TABLE}).first() is None
+        for statement in _SCHEMA:
+            connection.execute(text(statement))
+        if created:
+            connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    return created
+
+
+def rebuild_search_index(engine, optimize=True):
+    """Re-indexes every complaint from the content table, then merges segments"""
+    built = ensure_search_index(engine)
+    if not _is_sqlite(engine):
+        return
+    with engine.begin() as connection:
+        if not built:
+            connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        if optimize:
+            connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"))
+
+
+def search_terms(query):
+    """Words of a free-text query (lower-cased). Raises ValueError if none."""
+    terms = _TERM_PATTERN.findall(query.lower())[:MAX_TERMS]
+    if not terms:
+        raise ValueError("Search query has no searchable words")
+    return terms
+
+
+def match_expression(terms):
+    """
+    FTS5 MATCH string: all terms required, each quoted so user input is never
+    parsed as query syntax; the last term also matches as a prefix, which
+    suits search-as-you-type.
+    """
+    quoted = ['"' + term.replace('"', '""') + '"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _row_to_dict(row, score=None, snippet=None):
+    created_at = row.created_at
+    return {
+        "id": row.id,
+        "report_id": row.report_id,
+        "created_at": created_at.isoformat() if created_at else None,
+        "issue_type": row.issue_type,
+        "severity": row.severity,
+        "priority": row.priority,
+        "department": row.department,
+        "status": row.status,
+        "address": row.address,
+        "ward": row.ward,
+        "lat": row.latitude,
+        "lng": row.longitude,
+        # bm25() is lower-is-better; flip it so clients sort descending
+        "score": round(-score, 4) if score is not None else None,
+        "snippet": snippet,
+    }
+
+
+def _search_fts(session, terms, limit, offset, since, until, filters):
+    sql = _FTS_QUERY
+    params = {
+        "query": match_expression(terms),
+        "mark_open": SNIPPET_MARKERS[0],
+        "mark_close": SNIPPET_MARKERS[1],
+    }
+    for field in FILTERS:
+        value = filters.get(field)
+        if value:
+            sql += f" AND c.{field} = :{field}"
+            params[field] = value
+    if since:
+        sql += " AND c.created_at >= :since"
+        params["since"] = since
+    if until:
+        sql += " AND c.created_at < :until"
+        params["until"] = until
+    sql += " ORDER BY score, c.id DESC LIMIT :limit OFFSET :offset"
+    params["limit"] = limit
+    params["offset"] = offset
+    query = text(sql).columns(created_at=DateTime())
+    # Bind dates with the column type so they compare as stored
+    query = query.bindparams(*(bindparam(name, type_=DateTime()) for name in ("since", "until") if name in params))
+    rows = session.execute(query, params).all()
+    return [_row_to_dict(row, row.score, row.snippet) for row in rows]
+
+
+def _search_like(session, terms, limit, offset, since, until, filters):
+    """Unranked fallback: every term must appear in one of the columns"""
+    searched = (Complaint.complaint_text, Complaint.address, Complaint.issue_type)
+    query = select(Complaint).where(and_(*(
+        or_(*(func.lower(column).contains(term, autoescape=True) for column in searched))
+        for term in terms
+    )))
+    for field in FILTERS:
+        value = filters.get(field)
+        if value:
+            query = query.where(getattr(Complaint, field) == value)
+    if since:
+        query = query.where(Complaint.created_at >= since)
+    if until:
+        query = query.where(Complaint.created_at < until)
+    query = query.order_by(Complaint.created_at.desc(), Complaint.id.desc()).limit(limit).offset(offset)
+    return [_row_to_dict(row) for row in session.execute(query).scalars()]
+
+
+def search_complaints(session, query, limit=DEFAULT_LIMIT, offset=0, since=None, until=None, **filters):
+    """
+    Complaints matching every word of `query`, best match first, optionally
+    narrowed by equality on department, priority, severity, issue_type,
+    status and ward and by created date range [since, until).
+    Raises ValueError for a query with no searchable words.
+    """
+    terms = search_terms(query)
+    search = _search_fts if _is_sqlite(session.get_bind()) else _search_like
+    return search(session, terms, limit, offset, since, until, filters)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Complaint full-text index maintenance")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = subcommands.add_parser("rebuild", help="re-index all complaints")
+    rebuild_parser.add_argument("--no-optimize", action="store_true", help="skip merging index segments")
+    args = parser.parse_args(argv)
+
+    from database import engine
+    from observability import configure_logging
+    configure_logging()
+    if args.command == "rebuild":
+        rebuild_search_index(engine, optimize=not args.no_optimize)
+        logger.info("Search index rebuilt", extra={"table": FTS_TABLE})
+        print(f"Rebuilt {FTS_TABLE}")
+
+
+if __name__ == "__main__":
+    main()
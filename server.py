@@ -0,0 +1,301 @@
+"""
+Production launcher: N uvicorn workers forked from one preloaded master.
+
+    python -m server --workers 4 [--host 0.0.0.0] [--port 8000]
+
+The master imports the app and builds everything read-only before
+forking: classifier tables, the decision table, ward polygons, complaint
+templates and model weights. The heap is then frozen (gc.freeze) so the
+workers share those pages copy-on-write instead of each building and
+holding its own copy. Per-process resources (database pools, writer
+threads, process pools) are still created in each worker's startup.
+
+Sockets: with SO_REUSEPORT (the default where the OS has it) every
+worker binds its own listening socket on the same port and the kernel
+spreads connections across them. Otherwise the master binds one socket
+and the workers accept on it.
+
+Signals to the master:
+    TERM / INT   graceful stop (workers finish in-flight requests)
+    HUP          rolling restart: one worker at a time, the replacement
+                 must be serving before the old one is stopped
+    TTIN / TTOU  one more / one fewer worker
+
+Each worker gets a distinct report ID worker component, and workers share
+metrics, SSE events and duplicate-index updates through CIVIC_RUNTIME_DIR
+and split the admission limits between them (see cluster.py). Code
+changes need a master restart: forks reuse the preloaded modules.
+"""
+
+import argparse
+import gc
+import os
+import secrets
+import select
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import time
+
+from observability import configure_logging, logger
+
+
+DEFAULT_WORKERS = int(os.environ.get("CIVIC_WORKERS", os.cpu_count() or 1))
+GRACEFUL_TIMEOUT = float(os.environ.get("CIVIC_GRACEFUL_TIMEOUT", 30))
+READY_TIMEOUT = float(os.environ.get("CIVIC_READY_TIMEOUT", 60))
+BACKLOG = int(os.environ.get("CIVIC_LISTEN_BACKLOG", 2048))
+
+# Respawning a worker that died sooner than this counts as a crash loop
+MIN_WORKER_LIFETIME = 5.0
+MAX_CRASH_LOOP = 5
+
+_WORKER_SEQUENCE_BITS = 16
+
+
+def listen_socket(host, port, reuse_port, backlog=BACKLOG):
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload():
+    """Imports the app and builds shared read-only state. Returns the app."""
+    import backend_api
+    from civic_issue_reporter import ISSUE_DESCRIPTIONS, _complaint_parts
+    from inference import CLASSIFIER
+
+    for issue_type in ISSUE_DESCRIPTIONS:
+        _complaint_parts(issue_type)
+    CLASSIFIER.preload()
+    # Keep the collector from touching (and so copying) preloaded objects
+    gc.collect()
+    gc.freeze()
+    return backend_api.app
+
+
+class _Worker:
+    __slots__ = ("pid", "worker_id", "started_at")
+
+    def __init__(self, pid, worker_id):
+        self.pid = pid
+        self.worker_id = worker_id
+        self.started_at = time.monotonic()
+
+
+class Launcher:
+    """Forks and supervises uvicorn workers (runs in the master process)"""
+
+    def __init__(self, app, workers, host, port, reuse_port, graceful_timeout=GRACEFUL_TIMEOUT,
+                 ready_timeout=READY_TIMEOUT, uvicorn_options=None):
+        self.app = app
+        self.target_workers = workers
+        self.host = host
+        self.port = port
+        self.reuse_port = reuse_port
+        self.graceful_timeout = graceful_timeout
+        self.ready_timeout = ready_timeout
+        self.uvicorn_options = uvicorn_options or {}
+        self.workers = {}
+        self._socket = None if reuse_port else listen_socket(host, port, False)
+        self._worker_base = secrets.randbits(40 - _WORKER_SEQUENCE_BITS) << _WORKER_SEQUENCE_BITS
+        self._spawned = 0
+        self._signals = []
+        self._crashes = 0
+
+    # ---- worker process ----
+
+    def _worker_main(self, worker_id, ready_fd):
+        import uvicorn
+        from report_ids import set_worker_id
+
+        for signum in (signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, signal.SIG_DFL)
+        set_worker_id(worker_id)
+
+        sock = listen_socket(self.host, self.port, True) if self.reuse_port else self._socket
+        config = uvicorn.Config(
+            self.app, log_config=None, lifespan="on",
+            timeout_graceful_shutdown=self.graceful_timeout, **self.uvicorn_options
+        )
+        server = uvicorn.Server(config)
+
+        def report_ready():
+            while not server.started and not server.should_exit:
+                time.sleep(0.05)
+            try:
+                os.write(ready_fd, b"1" if server.started else b"0")
+            finally:
+                os.close(ready_fd)
+
+        threading.Thread(target=report_ready, name="ready-notify", daemon=True).start()
+        server.run(sockets=[sock])
+        return 0
+
+    # ---- master ----
+
+    def spawn(self):
+        """Forks one worker; returns (pid, ready pipe fd)"""
+        self._spawned += 1
+        worker_id = self._worker_base | (self._spawned & ((1 << _WORKER_SEQUENCE_BITS) - 1))
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            code = 1
+            try:
+                code = self._worker_main(worker_id, write_fd)
+            except BaseException:
+                logger.exception("Worker failed")
+            finally:
+                os._exit(code)
+        os.close(write_fd)
+        self.workers[pid] = _Worker(pid, worker_id)
+        logger.info("Worker started", extra={"pid": pid, "worker_id": worker_id})
+        return pid, read_fd
+
+    def wait_ready(self, read_fd, timeout=None):
+        """True once the worker reports it is serving"""
+        try:
+            ready, _, _ = select.select([read_fd], [], [], self.ready_timeout if timeout is None else timeout)
+            return bool(ready) and os.read(read_fd, 1) == b"1"
+        finally:
+            os.close(read_fd)
+
+    def terminate(self, pid):
+        """Graceful stop of one worker; killed if it overruns the timeout"""
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while time.monotonic() < deadline:
+            try:
+                done, _status = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if done:
+                break
+            time.sleep(0.05)
+        else:
+            logger.warning("Worker did not stop in time; killing it", extra={"pid": pid})
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self.workers.pop(pid, None)
+
+    def rolling_restart(self):
+        logger.info("Rolling restart", extra={"workers": len(self.workers)})
+        for old_pid in list(self.workers):
+            pid, ready_fd = self.spawn()
+            if not self.wait_ready(ready_fd):
+                logger.error("Replacement worker failed to start; restart aborted", extra={"pid": pid})
+                self.terminate(pid)
+                return
+            self.terminate(old_pid)
+        logger.info("Rolling restart finished", extra={"workers": len(self.workers)})
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            lifetime = time.monotonic() - worker.started_at
+            logger.warning("Worker exited unexpectedly",
+                           extra={"pid": pid, "status": status, "lifetime_s": round(lifetime, 1)})
+            self._crashes = self._crashes + 1 if lifetime < MIN_WORKER_LIFETIME else 0
+            if self._crashes >= MAX_CRASH_LOOP:
+                raise SystemExit("Workers keep crashing at startup; giving up")
+
+    def _scale(self):
+        while len(self.workers) < self.target_workers:
+            _pid, ready_fd = self.spawn()
+            self.wait_ready(ready_fd)
+        while len(self.workers) > self.target_workers:
+            self.terminate(max(self.workers, key=lambda pid: self.workers[pid].started_at))
+
+    def _on_signal(self, signum, _frame):
+        self._signals.append(signum)
+
+    def run(self):
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(signum, self._on_signal)
+        logger.info("Starting workers", extra={"workers": self.target_workers, "port": self.port,
+                                               "reuse_port": self.reuse_port})
+        pending = [self.spawn() for _ in range(self.target_workers)]
+        for pid, ready_fd in pending:
+            if not self.wait_ready(ready_fd):
+                logger.error("Worker failed to start", extra={"pid": pid})
+        try:
+            while True:
+                while self._signals:
+                    signum = self._signals.pop(0)
+                    if signum in (signal.SIGTERM, signal.SIGINT):
+                        return
+                    if signum == signal.SIGHUP:
+                        self.rolling_restart()
+                    elif signum == signal.SIGTTIN:
+                        self.target_workers += 1
+                    elif signum == signal.SIGTTOU:
+                        self.target_workers = max(1, self.target_workers - 1)
+                self._reap()
+                self._scale()
+                time.sleep(0.2)
+        finally:
+            self.stop()
+
+    def stop(self):
+        logger.info("Stopping workers", extra={"workers": len(self.workers)})
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in list(self.workers):
+            self.terminate(pid)
+        if self._socket is not None:
+            self._socket.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the API with several preloaded worker processes")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--no-reuse-port", action="store_true",
+                        help="share one listening socket instead of SO_REUSEPORT")
+    parser.add_argument("--graceful-timeout", type=float, default=GRACEFUL_TIMEOUT)
+    parser.add_argument("--runtime-dir", help="coordination directory (default: a fresh temp dir)")
+    args = parser.parse_args(argv)
+
+    runtime_dir = args.runtime_dir or tempfile.mkdtemp(prefix="civic-run-")
+    os.makedirs(runtime_dir, exist_ok=True)
+    # Read by cluster.py when the app is imported below
+    os.environ["CIVIC_WORKERS"] = str(max(1, args.workers))
+    os.environ["CIVIC_RUNTIME_DIR"] = runtime_dir
+
+    configure_logging()
+    reuse_port = hasattr(socket, "SO_REUSEPORT") and not args.no_reuse_port
+    app = preload()
+    launcher = Launcher(app, max(1, args.workers), args.host, args.port, reuse_port, args.graceful_timeout)
+    try:
+        launcher.run()
+    finally:
+        if not args.runtime_dir:
+            shutil.rmtree(runtime_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
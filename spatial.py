@@ -0,0 +1,157 @@
+"""
+Spatial index over complaint locations.
+A SQLite R*Tree virtual table mirrors complaints.latitude/longitude and is
+kept in sync by triggers, so radius and bounding-box lookups touch only the
+rows in the box instead of scanning the whole table. R*Tree coordinates are
+stored as 32-bit floats, so the index is used as an overlap prefilter and
+the exact columns are checked afterwards.
+"""
+
+import math
+
+from sqlalchemy import text
+
+
+RTREE_TABLE = "complaints_rtree"
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE_LAT = 111320.0
+
+MAX_RESULTS = 500
+
+_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {RTREE_TABLE}
+        USING rtree(id, min_lat, max_lat, min_lng, max_lng)""",
+    f"""CREATE TRIGGER IF NOT EXISTS complaints_rtree_insert
+        AFTER INSERT ON complaints
+        WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL
+        BEGIN
+            INSERT INTO {RTREE_TABLE} VALUES
+                (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS complaints_rtree_update
+        AFTER UPDATE OF latitude, longitude ON complaints
+        BEGIN
+            DELETE FROM {RTREE_TABLE} WHERE id = old.id;
+            INSERT INTO {RTREE_TABLE}
+                SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude
+                WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS complaints_rtree_delete
+        AFTER DELETE ON complaints
+        BEGIN
+            DELETE FROM {RTREE_TABLE} WHERE id = old.id;
+        END""",
+]
+
+_BACKFILL = f"""
+    INSERT INTO {RTREE_TABLE}
+        SELECT c.id, c.latitude, c.latitude, c.longitude, c.longitude
+        FROM complaints c
+        WHERE c.latitude IS NOT NULL AND c.longitude IS NOT NULL
+          AND c.id NOT IN (SELECT id FROM {RTREE_TABLE})
+"""
+
+_COLUMNS = """c.id, c.report_id, c.issue_type, c.severity, c.priority,
+              c.latitude, c.longitude, c.address, c.department"""
+
+_RTREE_BBOX_QUERY = f"""
+    SELECT {_COLUMNS}
+    FROM {RTREE_TABLE} r JOIN complaints c ON c.id = r.id
+    WHERE r.max_lat >= :min_lat AND r.min_lat <= :max_lat
+      AND r.max_lng >= :min_lng AND r.min_lng <= :max_lng
+      AND c.latitude BETWEEN :min_lat AND :max_lat
+      AND c.longitude BETWEEN :min_lng AND :max_lng
+"""
+
+_PLAIN_BBOX_QUERY = f"""
+    SELECT {_COLUMNS}
+    FROM complaints c
+    WHERE c.latitude BETWEEN :min_lat AND :max_lat
+      AND c.longitude BETWEEN :min_lng AND :max_lng
+"""
+
+
+def ensure_spatial_index(engine):
+    """
+    Creates the R*Tree table and sync triggers, and indexes any existing rows.
+    No-op on non-SQLite databases (queries fall back to the plain columns).
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as connection:
+        for statement in _SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(text(_BACKFILL))
+
+
+def bounding_box(lat, lng, radius_m):
+    """(min_lat, min_lng, max_lat, max_lng) enclosing a circle of radius_m"""
+    dlat = radius_m / METERS_PER_DEGREE_LAT
+    dlng = radius_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    return lat - dlat, lng - dlng, lat + dlat, lng + dlng
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """Great-circle distance in meters"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def _row_to_dict(row):
+    return {
+        "id": row.id,
+        "report_id": row.report_id,
+        "issue_type": row.issue_type,
+        "severity": row.severity,
+        "priority": row.priority,
+        "lat": row.latitude,
+        "lng": row.longitude,
+        "address": row.address,
+        "department": row.department,
+    }
+
+
+def _query_bbox(session, min_lat, min_lng, max_lat, max_lng, issue_type, priority, limit):
+    use_rtree = session.get_bind().dialect.name == "sqlite"
+    sql = _RTREE_BBOX_QUERY if use_rtree else _PLAIN_BBOX_QUERY
+    params = {"min_lat": min_lat, "max_lat": max_lat, "min_lng": min_lng, "max_lng": max_lng}
+    if issue_type:
+        sql += " AND c.issue_type = :issue_type"
+        params["issue_type"] = issue_type
+    if priority:
+        sql += " AND c.priority = :priority"
+        params["priority"] = priority
+    if limit:
+        sql += " LIMIT :limit"
+        params["limit"] = limit
+    return session.execute(text(sql), params).all()
+
+
+def find_in_bbox(session, min_lat, min_lng, max_lat, max_lng,
+                 issue_type=None, priority=None, limit=MAX_RESULTS):
+    """Complaints inside a bounding box, optionally filtered"""
+    rows = _query_bbox(session, min_lat, min_lng, max_lat, max_lng, issue_type, priority, limit)
+    return [_row_to_dict(row) for row in rows]
+
+
+def find_nearby(session, lat, lng, radius_m, issue_type=None, priority=None, limit=MAX_RESULTS):
+    """
+    Complaints within radius_m of (lat, lng), nearest first.
+    The index narrows to the bounding box; exact distance is checked here.
+    """
+    min_lat, min_lng, max_lat, max_lng = bounding_box(lat, lng, radius_m)
+    rows = _query_bbox(session, min_lat, min_lng, max_lat, max_lng, issue_type, priority, None)
+
+    results = []
+    for row in rows:
+        distance = haversine_m(lat, lng, row.latitude, row.longitude)
+        if distance <= radius_m:
+            item = _row_to_dict(row)
+            item["distance_m"] = round(distance, 1)
+            results.append(item)
+    results.sort(key=lambda item: item["distance_m"])
+    return results[:limit] if limit else results
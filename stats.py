@@ -0,0 +1,309 @@
+"""
+Live counts of open complaints by department, priority, ward and issue type.
+
+Counters are maintained incrementally instead of running GROUP BY over
+`complaints` on every dashboard refresh:
+
+  - the write path calls `track_new(session, complaints)` or
+    `track_status_change(session, complaint, new_status)`; the deltas are
+    written to the `complaint_stats` table in the same transaction and
+    applied to the in-memory counters only once that transaction commits
+  - `/api/stats` serves a snapshot that is serialized once per change,
+    with an ETag so pollers get 304s while nothing changed. The ETag is a
+    hash of the counts, so every worker of a multi-worker server gives
+    the same one for the same counts
+  - `rebuild()` recomputes everything from `complaints` in id-ordered
+    chunks (after a restore, or if counts are suspected to drift); it is
+    safe to run while the servers are taking writes
+
+    python -m stats rebuild [--chunk-size 10000]
+"""
+
+from collections import Counter
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+
+from sqlalchemy import delete, event, select, text, update
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import Complaint, ComplaintStat
+from observability import METRICS, logger
+
+
+DIMENSIONS = ("department", "priority", "ward", "issue_type")
+OPEN_STATUS = "open"
+UNKNOWN = "unknown"
+
+REBUILD_CHUNK_SIZE = int(os.environ.get("CIVIC_STATS_REBUILD_CHUNK", 10000))
+# Multi-worker servers: re-read complaint_stats this often (seconds) to see
+# other workers' commits
+RELOAD_INTERVAL = float(os.environ.get("CIVIC_STATS_RELOAD_INTERVAL", 1))
+
+_PENDING_KEY = "civic_stats_deltas"
+
+
+def _dimension_values(row):
+    return [(dimension, getattr(row, dimension) or UNKNOWN) for dimension in DIMENSIONS]
+
+
+class StatsCounters:
+    """
+    In-memory open-complaint counters. Reads are O(1): the JSON body and
+    ETag are rebuilt only when a committed change bumps the version.
+    The version is local to the process; the ETag depends only on the counts.
+    """
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self.version = 0
+        self._snapshot = None
+        self.reload_interval = None
+        self._last_reload = 0.0
+        self._reload_lock = threading.Lock()
+
+    def apply(self, deltas):
+        if not deltas:
+            return
+        with self._lock:
+            for key, amount in deltas.items():
+                self._counts[key] += amount
+                if self._counts[key] <= 0:
+                    del self._counts[key]
+            self.version += 1
+            self._snapshot = None
+
+    def replace(self, counts):
+        counts = Counter({key: n for key, n in counts.items() if n > 0})
+        with self._lock:
+            if counts == self._counts and self.version:
+                return
+            self._counts = counts
+            self.version += 1
+            self._snapshot = None
+
+    def load(self, session):
+        """Loads counters from complaint_stats. Returns number of rows."""
+        rows = session.execute(select(ComplaintStat.dimension, ComplaintStat.value, ComplaintStat.count)).all()
+        self.replace({(dimension, value): count for dimension, value, count in rows})
+        return len(rows)
+
+    def warm_start(self, session, session_factory=SessionLocal):
+        """Loads the counters at startup; rebuilds them if the table is new"""
+        if self.load(session) == 0 and session.execute(select(Complaint.id).limit(1)).first():
+            rebuild(session_factory, counters=self)
+
+    def maybe_reload(self, session_factory=SessionLocal):
+        """
+        With `reload_interval` set (multi-worker), reloads from complaint_stats
+        when the last load is older than that. Unchanged counts keep the
+        version, so ETags stay valid.
+        """
+        if self.reload_interval is None or time.monotonic() - self._last_reload < self.reload_interval:
+            return
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_reload = time.monotonic()
+            session = session_factory()
+            try:
+                self.load(session)
+            finally:
+                session.close()
+        finally:
+            self._reload_lock.release()
+
+    def get(self, dimension, value):
+        return self._counts.get((dimension, value), 0)
+
+    def snapshot(self):
+        """(etag, JSON body bytes) for the current counters"""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            by_dimension = {dimension: {} for dimension in DIMENSIONS}
+            for (dimension, value), count in self._counts.items():
+                by_dimension[dimension][value] = count
+            body = {
+                "success": True,
+                "version": self.version,
+                "total_open": sum(by_dimension["priority"].values()),
+                "open": {dimension: dict(sorted(values.items())) for dimension, values in by_dimension.items()},
+                "generated_at": time.time(),
+            }
+            # Weak: equal counts give equal ETags, though version and
+            # generated_at in the body differ between workers
+            digest = hashlib.blake2b(repr(sorted(self._counts.items())).encode("utf-8"), digest_size=12)
+            snapshot = (f'W/"{digest.hexdigest()}"', json.dumps(body, ensure_ascii=False).encode("utf-8"))
+            self._snapshot = snapshot
+        return snapshot
+
+
+STATS = StatsCounters()
+
+
+# ========================================
+# WRITE PATH
+# ========================================
+
+def _persist(session, deltas):
+    """Adds deltas to complaint_stats inside the caller's transaction"""
+    for (dimension, value), amount in deltas.items():
+        result = session.execute(
+            update(ComplaintStat)
+            .where(ComplaintStat.dimension == dimension, ComplaintStat.value == value)
+            .values(count=ComplaintStat.count + amount)
+        )
+        if result.rowcount == 0:
+            session.add(ComplaintStat(dimension=dimension, value=value, count=amount))
+    pending = session.info.setdefault(_PENDING_KEY, Counter())
+    pending.update(deltas)
+
+
+def track_new(session, complaints):
+    """Counts newly inserted complaints (call before commit)"""
+    deltas = Counter()
+    for complaint in complaints:
+        if (complaint.status or OPEN_STATUS) == OPEN_STATUS:
+            deltas.update(_dimension_values(complaint))
+    _persist(session, deltas)
+
+
+def track_status_change(session, complaint, new_status):
+    """Sets complaint.status and adjusts the open counts (call before commit)"""
+    was_open = (complaint.status or OPEN_STATUS) == OPEN_STATUS
+    is_open = new_status == OPEN_STATUS
+    complaint.status = new_status
+    if was_open != is_open:
+        sign = 1 if is_open else -1
+        _persist(session, Counter({key: sign for key in _dimension_values(complaint)}))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed(session):
+    deltas = session.info.pop(_PENDING_KEY, None)
+    if deltas:
+        STATS.apply(deltas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# ========================================
+# REBUILD
+# ========================================
+
+def _count_open(session, after_id, chunk_size):
+    rows = session.execute(
+        select(Complaint.id, *(getattr(Complaint, dimension) for dimension in DIMENSIONS))
+        .where(Complaint.status == OPEN_STATUS, Complaint.id > after_id)
+        .order_by(Complaint.id)
+        .limit(chunk_size)
+    ).all()
+    counts = Counter()
+    for row in rows:
+        counts.update(_dimension_values(row))
+    return counts, (rows[-1].id if rows else None), len(rows)
+
+
+def _stored_counts(session):
+    rows = session.execute(select(ComplaintStat.dimension, ComplaintStat.value, ComplaintStat.count)).all()
+    return Counter({(dimension, value): count for dimension, value, count in rows})
+
+
+def _begin_snapshot(session):
+    """Starts a read transaction whose queries all see the same snapshot"""
+    if session.get_bind().dialect.name == "sqlite":
+        # pysqlite only opens transactions before writes; an explicit BEGIN
+        # pins one WAL snapshot for every read that follows
+        session.connection().exec_driver_sql("BEGIN")
+    else:
+        session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+
+def _lock_stats(session):
+    """Starts a transaction that holds off every counter write until commit"""
+    dialect = session.get_bind().dialect.name
+    if dialect == "sqlite":
+        session.connection().exec_driver_sql("BEGIN IMMEDIATE")
+    elif dialect == "postgresql":
+        session.execute(text("LOCK TABLE complaint_stats IN EXCLUSIVE MODE"))
+    else:
+        session.execute(select(ComplaintStat.dimension).with_for_update()).all()
+
+
+def rebuild(session_factory=SessionLocal, chunk_size=REBUILD_CHUNK_SIZE, counters=STATS):
+    """
+    Recomputes complaint_stats from complaints without pausing writes.
+
+    The complaints are counted in id-ordered chunks inside one read
+    snapshot, which also records complaint_stats as of that snapshot.
+    Every write path adds its deltas to complaint_stats in its own
+    transaction (track_new, track_status_change), so the changes committed
+    during the scan are the difference between complaint_stats now and at
+    the snapshot. That difference is added to the scanned counts while
+    counter writes are locked out, and the table contents are swapped in
+    the same transaction. Returns the number of open complaints.
+    """
+    start = time.perf_counter()
+    counts = Counter()
+    last_id = 0
+    session = session_factory()
+    try:
+        _begin_snapshot(session)
+        stored_at_snapshot = _stored_counts(session)
+        while True:
+            chunk, next_id, size = _count_open(session, last_id, chunk_size)
+            if not size:
+                break
+            counts.update(chunk)
+            last_id = next_id
+    finally:
+        session.close()
+
+    session = session_factory()
+    try:
+        _lock_stats(session)
+        stored = _stored_counts(session)
+        for key in stored.keys() | stored_at_snapshot.keys():
+            counts[key] += stored[key] - stored_at_snapshot[key]
+        counts = Counter({key: count for key, count in counts.items() if count > 0})
+        session.execute(delete(ComplaintStat))
+        session.add_all(ComplaintStat(dimension=dimension, value=value, count=count)
+                        for (dimension, value), count in counts.items())
+        session.info.pop(_PENDING_KEY, None)
+        session.commit()
+    finally:
+        session.close()
+
+    counters.replace(counts)
+    open_complaints = sum(count for (dimension, _value), count in counts.items() if dimension == DIMENSIONS[0])
+    METRICS.observe("civic_stage_seconds", time.perf_counter() - start, stage="stats_rebuild")
+    logger.info("Statistics rebuilt", extra={"open_complaints": open_complaints, "counters": len(counts)})
+    return open_complaints
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Complaint statistics maintenance")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = subcommands.add_parser("rebuild", help="recompute counters from complaints")
+    rebuild_parser.add_argument("--chunk-size", type=int, default=REBUILD_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    from observability import configure_logging
+    configure_logging()
+    if args.command == "rebuild":
+        count = rebuild(chunk_size=args.chunk_size)
+        print(f"Rebuilt statistics from {count} open complaints")
+
+
+if __name__ == "__main__":
+    main()
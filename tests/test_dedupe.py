@@ -0,0 +1,82 @@
+from dedupe import DuplicateIndex
+from spatial import METERS_PER_DEGREE_LAT
+
+
+LAT, LNG = 17.385, 78.4867
+NOW = 1_800_000_000.0
+
+
+def _north(meters):
+    return LAT + meters / METERS_PER_DEGREE_LAT
+
+
+def _index():
+    return DuplicateIndex(radius_m=30, window_seconds=3600)
+
+
+def test_report_within_radius_is_a_duplicate():
+    index = _index()
+    assert index.check_or_add("A", "Pothole", LAT, LNG, now=NOW) is None
+    assert index.check_or_add("B", "Pothole", _north(20), LNG, now=NOW + 1) == "A"
+    # Duplicates are not registered themselves
+    assert len(index) == 1
+
+
+def test_report_outside_radius_or_of_another_type_is_new():
+    index = _index()
+    index.check_or_add("A", "Pothole", LAT, LNG, now=NOW)
+
+    assert index.check_or_add("B", "Pothole", _north(45), LNG, now=NOW) is None
+    assert index.check_or_add("C", "Garbage Accumulation", LAT, LNG, now=NOW) is None
+    assert len(index) == 3
+
+
+def test_nearest_open_report_wins():
+    index = _index()
+    index.add("far", "Pothole", _north(25), LNG, created=NOW)
+    index.add("near", "Pothole", _north(5), LNG, created=NOW)
+
+    assert index.find("Pothole", LAT, LNG, now=NOW) == "near"
+
+
+def test_radius_holds_across_cell_columns_at_high_latitude():
+    index = DuplicateIndex(radius_m=30, window_seconds=3600)
+    lat = 60.0
+    # 25 m east at 60°N is about twice as many degrees of longitude as of latitude
+    east = 25 / (METERS_PER_DEGREE_LAT * 0.5)
+    index.add("A", "Pothole", lat, 10.0, created=NOW)
+
+    assert index.find("Pothole", lat, 10.0 + east, now=NOW) == "A"
+
+
+def test_reports_older_than_window_are_not_duplicates():
+    index = _index()
+    index.check_or_add("A", "Pothole", LAT, LNG, now=NOW)
+
+    assert index.find("Pothole", LAT, LNG, now=NOW + 3599) == "A"
+    assert index.check_or_add("B", "Pothole", LAT, LNG, now=NOW + 3601) is None
+    assert index.find("Pothole", LAT, LNG, now=NOW + 3602) == "B"
+
+
+def test_resolved_report_is_never_matched_again():
+    index = _index()
+    index.check_or_add("A", "Pothole", LAT, LNG, now=NOW)
+    index.remove("A")
+
+    assert index.check_or_add("B", "Pothole", LAT, LNG, now=NOW + 1) is None
+    # A late add of the resolved report (e.g. a racing warm start) is ignored
+    index.add("A", "Pothole", LAT, LNG, created=NOW)
+    assert index.find("Pothole", LAT, LNG, now=NOW + 2) == "B"
+
+
+def test_relay_sees_adds_and_removals():
+    index = _index()
+    relayed = []
+    index.relay = lambda action, data: relayed.append((action, data))
+
+    index.check_or_add("A", "Pothole", LAT, LNG, now=NOW)
+    index.check_or_add("B", "Pothole", LAT, LNG, now=NOW)
+    index.remove("A")
+    index.remove("A", relay=False)
+
+    assert relayed == [("add", ["A", "Pothole", LAT, LNG, NOW]), ("remove", "A")]
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, create_db_engine
+from listing import decode_cursor, encode_cursor, list_complaints
+from models import Complaint
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'listing.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 1, 15, 9, 30, 12, 345678)
+    cursor = encode_cursor(created_at, 42)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", encode_cursor(datetime(2026, 1, 1), 1)[:-3], "MjAyNnwx"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_pages_cover_every_row_once_newest_first(session):
+    start = datetime(2026, 1, 1)
+    # Pairs of rows share a created_at, so the id tie-break decides the order
+    session.add_all(
+        Complaint(report_id=f"R{i}", created_at=start + timedelta(minutes=i // 2),
+                  department="Roads & Highways Department" if i % 3 else "Horticulture Department")
+        for i in range(25)
+    )
+    session.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        items, cursor = list_complaints(session, cursor, limit=4)
+        assert len(items) <= 4
+        seen += items
+        if cursor is None:
+            break
+
+    keys = [(item["created_at"], item["id"]) for item in seen]
+    assert len(seen) == 25
+    assert keys == sorted(keys, reverse=True)
+    assert len(set(item["report_id"] for item in seen)) == 25
+
+
+def test_filtered_pages(session):
+    session.add_all(
+        Complaint(report_id=f"R{i}", created_at=datetime(2026, 1, 1) + timedelta(hours=i),
+                  priority="High" if i % 2 else "Low")
+        for i in range(9)
+    )
+    session.commit()
+
+    first, cursor = list_complaints(session, limit=3, priority="High")
+    second, last = list_complaints(session, cursor, limit=3, priority="High")
+
+    assert [item["report_id"] for item in first] == ["R7", "R5", "R3"]
+    assert [item["report_id"] for item in second] == ["R1"]
+    assert last is None
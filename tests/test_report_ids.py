@@ -0,0 +1,50 @@
+import time
+
+from report_ids import PREFIX, ReportIdGenerator, decode, decode_timestamp, encode, lower_bound, new_report_id
+
+
+def test_ids_are_unique_and_strictly_increasing():
+    generator = ReportIdGenerator()
+    ids = [generator.next_id() for _ in range(20000)]
+
+    assert len(set(ids)) == len(ids)
+    assert ids == sorted(ids)
+    assert all(report_id.startswith(PREFIX) and len(report_id) == len(PREFIX) + 26 for report_id in ids)
+
+
+def test_process_wide_generator_is_monotonic():
+    ids = [new_report_id() for _ in range(1000)]
+    assert ids == sorted(set(ids))
+
+
+def test_workers_never_collide_in_the_same_millisecond():
+    first, second = ReportIdGenerator(worker_id=1), ReportIdGenerator(worker_id=2)
+    ids = [generator.next_id() for _ in range(1000) for generator in (first, second)]
+
+    assert len(set(ids)) == len(ids)
+
+
+def test_ids_sort_by_creation_time():
+    generator = ReportIdGenerator(worker_id=(1 << 40) - 1)
+    earlier = generator.next_id()
+    time.sleep(0.002)
+    later = ReportIdGenerator(worker_id=0).next_id()
+
+    assert earlier < later
+
+
+def test_timestamp_round_trip_and_lower_bound():
+    before = time.time()
+    report_id = ReportIdGenerator().next_id()
+    after = time.time()
+
+    assert before - 0.001 <= decode_timestamp(report_id) <= after + 0.001
+    assert lower_bound(before - 1) <= report_id < lower_bound(after + 1)
+
+
+def test_encoding_is_fixed_width_and_reversible():
+    for value in (0, 1, 12345678901234567890, (1 << 128) - 1):
+        encoded = encode(value)
+        assert len(encoded) == 26
+        assert decode(PREFIX + encoded) == value
+    assert encode(1) < encode(2) < encode(1 << 127)
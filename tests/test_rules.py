@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+from rules import RULES, DecisionTable
+
+
+np = pytest.importorskip("numpy")
+
+
+def test_vectorized_evaluation_matches_scalar():
+    rng = random.Random(5)
+    issue_types = list(RULES.departments) + ["Unlisted Issue"]
+    thresholds = [rule["min_confidence"] for rule in RULES.severity_rules if rule["min_confidence"] is not None]
+    confidences = [rng.random() for _ in range(2000)] + thresholds + [t - 1e-9 for t in thresholds] + [0.0, 1.0]
+    rows = [(rng.choice(issue_types), confidence) for confidence in confidences]
+
+    columns = RULES.evaluate_arrays([issue for issue, _ in rows], [confidence for _, confidence in rows])
+
+    assert [tuple(values) for values in zip(*columns)] == [RULES.evaluate(*row) for row in rows]
+
+
+def test_baseline_table_outcomes():
+    assert RULES.evaluate("Pothole", 0.9) == ("High", "Critical", "24 hours", "Roads & Highways Department")
+    assert RULES.evaluate("Pothole", 0.7) == ("Medium", "Medium", "7 days", "Roads & Highways Department")
+    assert RULES.evaluate("Unlisted Issue", 0.1) == ("Low", "Low", "14 days", "General Administration")
+
+
+def test_table_without_default_rows_is_rejected():
+    data = {
+        "version": "x",
+        "severity": [{"min_confidence": 0.5, "severity": "High"}],
+        "priority": [{"priority": "Low", "timeline": "14 days"}],
+    }
+    with pytest.raises(ValueError):
+        DecisionTable.from_dict(data)
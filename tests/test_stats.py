@@ -0,0 +1,92 @@
+from collections import Counter
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, create_db_engine
+from models import Complaint, ComplaintStat
+from stats import STATS, StatsCounters, rebuild, track_new, track_status_change
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _complaint(report_id, priority="High"):
+    return Complaint(report_id=report_id, issue_type="Pothole", priority=priority,
+                     department="Roads & Highways Department", ward="Ward 1")
+
+
+def _stored(session):
+    return {(row.dimension, row.value): row.count for row in session.query(ComplaintStat)}
+
+
+def test_apply_adds_and_drops_counts():
+    counters = StatsCounters()
+    counters.apply(Counter({("priority", "High"): 2, ("priority", "Low"): 1}))
+    counters.apply(Counter({("priority", "Low"): -1}))
+
+    assert counters.get("priority", "High") == 2
+    assert counters.get("priority", "Low") == 0
+    assert counters.version == 2
+
+
+def test_etag_follows_counts_not_version():
+    first, second = StatsCounters(), StatsCounters()
+    first.replace({("priority", "High"): 2})
+    second.apply({("priority", "High"): 1})
+    second.apply({("priority", "High"): 1})
+    etag, _body = first.snapshot()
+
+    assert second.snapshot()[0] == etag
+    second.apply({("priority", "Low"): 1})
+    assert second.snapshot()[0] != etag
+
+
+def test_deltas_reach_counters_only_on_commit(sessions):
+    before = STATS.get("priority", "Medium")
+
+    session = sessions()
+    complaint = _complaint("R-rolled-back", priority="Medium")
+    session.add(complaint)
+    session.flush()
+    track_new(session, [complaint])
+    session.rollback()
+    session.close()
+    assert STATS.get("priority", "Medium") == before
+
+    session = sessions()
+    complaint = _complaint("R-committed", priority="Medium")
+    session.add(complaint)
+    session.flush()
+    track_new(session, [complaint])
+    session.commit()
+    assert STATS.get("priority", "Medium") == before + 1
+    assert _stored(session)[("priority", "Medium")] == 1
+
+    track_status_change(session, complaint, "resolved")
+    session.commit()
+    session.close()
+    assert STATS.get("priority", "Medium") == before
+
+
+def test_rebuild_matches_stored_complaints(sessions):
+    session = sessions()
+    complaints = [_complaint(f"R{i}", "High" if i % 2 else "Low") for i in range(7)]
+    session.add_all(complaints)
+    session.flush()
+    complaints[0].status = "resolved"
+    # Drifted table: rebuild must replace it, not add to it
+    session.add(ComplaintStat(dimension="priority", value="High", count=100))
+    session.commit()
+
+    counters = StatsCounters()
+    assert rebuild(sessions, chunk_size=2, counters=counters) == 6
+    assert _stored(session)[("priority", "High")] == 3
+    assert _stored(session)[("priority", "Low")] == 3
+    assert counters.get("ward", "Ward 1") == 6
+    session.close()
@@ -0,0 +1,39 @@
+import asyncio
+import io
+
+from uploads import CLASSIFICATION_CACHE, ContentStore, classify_upload, classify_upload_async, ingest_upload
+
+
+class _File:
+    def __init__(self, filename, data):
+        self.filename = filename
+        self.file = io.BytesIO(data)
+        self.content_type = "image/jpeg"
+
+
+def _ingest(store, filename, data):
+    return asyncio.run(ingest_upload(_File(filename, data), store=store))
+
+
+def test_same_bytes_under_different_names_are_classified_separately(tmp_path):
+    CLASSIFICATION_CACHE.clear()
+    store = ContentStore(tmp_path / "uploads")
+    data = b"\xff\xd8\xff\xe0" + bytes(range(256)) * 4 + b"\xff\xd9"
+
+    pothole = _ingest(store, "pothole.jpg", data)
+    garbage = _ingest(store, "garbage_dump.jpg", data)
+
+    assert pothole.sha256 == garbage.sha256
+    assert classify_upload(pothole)[0] == "Pothole"
+    assert classify_upload(garbage)[0] == "Garbage Accumulation"
+    assert asyncio.run(classify_upload_async(garbage))[0] == "Garbage Accumulation"
+
+
+def test_identical_upload_reuses_cached_classification(tmp_path):
+    CLASSIFICATION_CACHE.clear()
+    store = ContentStore(tmp_path / "uploads")
+    first = _ingest(store, "pothole.jpg", b"same bytes")
+    second = _ingest(store, "pothole.jpg", b"same bytes")
+
+    assert classify_upload(first) == classify_upload(second)
+    assert CLASSIFICATION_CACHE.hits == 1
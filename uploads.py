@@ -0,0 +1,290 @@
+"""
+Upload ingestion for the FastAPI endpoints.
+Streams uploaded images to disk in fixed-size chunks on a worker thread,
+so large phone photos never block the event loop.
+
+Uploads are stored content-addressed (uploads/ab/cd/<sha256>), so identical
+images are kept once and client filenames can never overwrite each other.
+Classification results are cached by the same content hash, plus the
+filename for backends whose result depends on it (the rule backend).
+"""
+
+from collections import OrderedDict
+from pathlib import Path
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from inference import CLASSIFIER
+from observability import METRICS
+
+
+UPLOAD_DIR = Path(os.environ.get("CIVIC_UPLOAD_DIR", "uploads"))
+CHUNK_SIZE = int(os.environ.get("CIVIC_UPLOAD_CHUNK_SIZE", 1024 * 1024))
+MAX_UPLOAD_BYTES = int(os.environ.get("CIVIC_MAX_UPLOAD_BYTES", 25 * 1024 * 1024))
+
+# Retention policy for the content store
+RETENTION_MAX_BYTES = int(os.environ.get("CIVIC_UPLOAD_RETENTION_BYTES", 5 * 1024 ** 3))
+RETENTION_MAX_AGE = int(os.environ.get("CIVIC_UPLOAD_RETENTION_SECONDS", 30 * 24 * 3600))
+EVICT_EVERY = int(os.environ.get("CIVIC_UPLOAD_EVICT_EVERY", 500))
+
+CLASSIFICATION_CACHE_SIZE = int(os.environ.get("CIVIC_CLASSIFICATION_CACHE_SIZE", 10000))
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the configured size limit"""
+
+    def __init__(self, limit):
+        super().__init__(f"Upload exceeds the maximum allowed size of {limit} bytes")
+        self.limit = limit
+
+
+class IngestedUpload:
+    """
+    Handle for an upload that has been written to disk.
+    `filename` is what the classifier works on; `path`, `size` and `sha256`
+    describe the stored bytes.
+    """
+
+    __slots__ = ("filename", "path", "size", "sha256", "content_type", "deduplicated")
+
+    def __init__(self, filename, path, size, sha256, content_type=None, deduplicated=False):
+        self.filename = filename
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.content_type = content_type
+        self.deduplicated = deduplicated
+
+    def __repr__(self):
+        return f"IngestedUpload(filename={self.filename!r}, size={self.size}, sha256={self.sha256[:12]}...)"
+
+
+# ========================================
+# CONTENT-ADDRESSED STORE
+# ========================================
+
+class ContentStore:
+    """
+    SHA-256 addressed file store with a two-level shard layout.
+    Old or excess blobs are evicted oldest-first (by last access time),
+    keeping the store under `max_bytes` and `max_age` seconds.
+    """
+
+    def __init__(self, root, max_bytes=RETENTION_MAX_BYTES, max_age=RETENTION_MAX_AGE,
+                 evict_every=EVICT_EVERY):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.evict_every = evict_every
+        self._commits = 0
+        self._lock = threading.Lock()
+
+    def path_for(self, sha256):
+        """Sharded location of a blob: root/ab/cd/abcd..."""
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    def commit(self, temp_path, sha256):
+        """
+        Moves a fully written temp file into place.
+        Returns (path, deduplicated); duplicates are discarded and the
+        existing blob's access time is refreshed for retention.
+        """
+        path = self.path_for(sha256)
+        if path.exists():
+            os.unlink(temp_path)
+            os.utime(path)
+            deduplicated = True
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(temp_path, path)
+            deduplicated = False
+
+        with self._lock:
+            self._commits += 1
+            due = self.evict_every and self._commits % self.evict_every == 0
+        if due:
+            self.evict()
+        return path, deduplicated
+
+    def evict(self, now=None):
+        """Applies the retention policy. Returns number of blobs removed."""
+        now = now or time.time()
+        blobs = []
+        for shard in self.root.glob("??/??"):
+            with os.scandir(shard) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        blobs.append((stat.st_mtime, stat.st_size, entry.path))
+        blobs.sort()
+
+        total = sum(size for _mtime, size, _path in blobs)
+        removed = 0
+        for mtime, size, path in blobs:
+            expired = self.max_age and now - mtime > self.max_age
+            over_budget = self.max_bytes and total > self.max_bytes
+            if not (expired or over_budget):
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+
+# ========================================
+# CLASSIFICATION CACHE
+# ========================================
+
+class ClassificationCache:
+    """Thread-safe bounded LRU of classification results (see classification_key)"""
+
+    def __init__(self, maxsize=CLASSIFICATION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Cached value or None (counts a hit or a miss)"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        METRICS.inc("civic_classification_cache_total", result="hit" if value is not None else "miss")
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+CONTENT_STORE = ContentStore(UPLOAD_DIR)
+CLASSIFICATION_CACHE = ClassificationCache()
+
+
+def classification_key(upload, backend=None):
+    """
+    Cache key for an upload's classification: the backend and the content
+    hash, plus the filename when the backend reads it. The same bytes
+    uploaded as "pothole.jpg" and "garbage_dump.jpg" are different reports.
+    """
+    backend = backend or CLASSIFIER
+    if backend.uses_filename:
+        return backend.name, upload.sha256, upload.filename
+    return backend.name, upload.sha256
+
+
+def classify_upload(upload, tensor=None):
+    """
+    Classifies an ingested upload, reusing the cached result for identical bytes.
+    `tensor` is the preprocessed pixel input for backends that use pixels.
+    Returns: (issue_type, confidence, category)
+    """
+    def compute():
+        with METRICS.stage("classification"):
+            return CLASSIFIER.classify(upload.filename, upload.path, tensor)
+
+    return CLASSIFICATION_CACHE.get_or_compute(classification_key(upload), compute)
+
+
+async def classify_upload_async(upload, tensor=None):
+    """
+    classify_upload() for async endpoints: model backends micro-batch
+    concurrent requests instead of classifying one image at a time.
+    """
+    key = classification_key(upload)
+    classification = CLASSIFICATION_CACHE.get(key)
+    if classification is None:
+        with METRICS.stage("classification"):
+            classification = await CLASSIFIER.classify_async(upload.filename, upload.path, tensor)
+        CLASSIFICATION_CACHE.put(key, classification)
+    return classification
+
+
+# ========================================
+# INGESTION
+# ========================================
+
+def safe_filename(filename):
+    """Strips any client-supplied directory components from a filename"""
+    name = Path(filename or "").name
+    return name or "upload"
+
+
+def _copy_stream(source, destination_dir, max_bytes, chunk_size):
+    """
+    Copies `source` into a temp file under `destination_dir`, hashing as it goes.
+    Runs on a worker thread. Returns (temp_path, size, sha256_hex).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=destination_dir, prefix=".ingest-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                digest.update(chunk)
+                buffer.write(chunk)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return Path(temp_path), size, digest.hexdigest()
+
+
+async def ingest_upload(file, store=None, max_bytes=None, chunk_size=None):
+    """
+    Streams a FastAPI UploadFile into the content store off the event loop.
+    Enforces the size limit and computes the SHA-256 while writing.
+    Returns an IngestedUpload.
+    """
+    store = store or CONTENT_STORE
+    store.root.mkdir(parents=True, exist_ok=True)
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    chunk_size = chunk_size or CHUNK_SIZE
+
+    with METRICS.stage("ingest"):
+        temp_path, size, sha256 = await asyncio.to_thread(
+            _copy_stream, file.file, store.root, max_bytes, chunk_size
+        )
+        path, deduplicated = await asyncio.to_thread(store.commit, temp_path, sha256)
+    METRICS.inc("civic_upload_bytes_total", size)
+
+    return IngestedUpload(
+        filename=safe_filename(file.filename),
+        path=path,
+        size=size,
+        sha256=sha256,
+        content_type=getattr(file, "content_type", None),
+        deduplicated=deduplicated,
+    )
@@ -0,0 +1,271 @@
+"""
+Ward/zone lookup from municipal boundary polygons.
+
+Boundaries are read from a local GeoJSON FeatureCollection
+(config/wards.geojson, override with CIVIC_WARDS_PATH); each feature's
+`ward` and optional `zone` properties form the label ("Ward 12, Zone 3").
+Lookups go through three layers:
+
+  - a uniform grid over the city: each cell lists the polygons whose
+    bounding box overlaps it, so a point is tested against a handful of
+    candidates instead of every ward
+  - a bounding-box check per candidate
+  - an exact even-odd point-in-polygon test, with each polygon's edges
+    bucketed into latitude bands so only the edges level with the point
+    are crossed
+
+Results are cached on coordinates rounded to CIVIC_WARD_PRECISION decimals
+(5 = ~1 m). Without a boundary file every lookup returns None.
+
+    python -m wards backfill [--all]   # fill ward for stored complaints
+"""
+
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+import argparse
+import json
+import math
+import os
+import time
+
+from observability import METRICS, logger
+
+
+WARDS_PATH = Path(os.environ.get(
+    "CIVIC_WARDS_PATH", Path(__file__).resolve().parent / "config" / "wards.geojson"
+))
+WARD_PROPERTY = os.environ.get("CIVIC_WARD_PROPERTY", "ward")
+ZONE_PROPERTY = os.environ.get("CIVIC_ZONE_PROPERTY", "zone")
+
+CACHE_SIZE = int(os.environ.get("CIVIC_WARD_CACHE_SIZE", 65536))
+PRECISION = int(os.environ.get("CIVIC_WARD_PRECISION", 5))
+BACKFILL_CHUNK_SIZE = int(os.environ.get("CIVIC_WARD_BACKFILL_CHUNK", 5000))
+
+GRID_CELLS_PER_POLYGON = 4
+EDGES_PER_BAND = 8
+
+
+class _Polygon:
+    """One polygon (outer ring plus holes) with band-bucketed edges"""
+
+    __slots__ = ("label", "min_lat", "min_lng", "max_lat", "max_lng", "band_height", "bands")
+
+    def __init__(self, label, rings):
+        self.label = label
+        edges = []
+        lats = []
+        lngs = []
+        for ring in rings:
+            points = [(float(lat), float(lng)) for lng, lat, *_ in ring]
+            lats.extend(lat for lat, _ in points)
+            lngs.extend(lng for _, lng in points)
+            for (lat1, lng1), (lat2, lng2) in zip(points, points[1:] + points[:1]):
+                if lat1 != lat2:  # horizontal edges never cross the ray
+                    edges.append((lat1, lng1, lat2, lng2))
+        if not edges:
+            raise ValueError(f"Ward {label!r} has an empty or degenerate polygon")
+        self.min_lat, self.max_lat = min(lats), max(lats)
+        self.min_lng, self.max_lng = min(lngs), max(lngs)
+
+        band_count = max(1, len(edges) // EDGES_PER_BAND)
+        self.band_height = (self.max_lat - self.min_lat) / band_count
+        self.bands = [[] for _ in range(band_count)]
+        for edge in edges:
+            low, high = sorted((edge[0], edge[2]))
+            for band in range(self._band(low), self._band(high) + 1):
+                self.bands[band].append(edge)
+
+    def _band(self, lat):
+        return min(len(self.bands) - 1, max(0, int((lat - self.min_lat) / self.band_height)))
+
+    def contains(self, lat, lng):
+        if not (self.min_lat <= lat <= self.max_lat and self.min_lng <= lng <= self.max_lng):
+            return False
+        inside = False
+        for lat1, lng1, lat2, lng2 in self.bands[self._band(lat)]:
+            if (lat1 > lat) != (lat2 > lat):
+                if lng < lng1 + (lat - lat1) * (lng2 - lng1) / (lat2 - lat1):
+                    inside = not inside
+        return inside
+
+
+def _feature_label(properties):
+    ward = properties.get(WARD_PROPERTY) or properties.get("name")
+    if ward is None:
+        return None
+    zone = properties.get(ZONE_PROPERTY)
+    return f"{ward}, {zone}" if zone else str(ward)
+
+
+def _feature_polygons(label, geometry):
+    kind = geometry.get("type")
+    if kind == "Polygon":
+        return [_Polygon(label, geometry["coordinates"])]
+    if kind == "MultiPolygon":
+        return [_Polygon(label, rings) for rings in geometry["coordinates"]]
+    raise ValueError(f"Ward {label!r}: unsupported geometry type {kind!r}")
+
+
+class WardIndex:
+    """Grid-indexed ward polygons. resolve() is safe to call from any thread."""
+
+    def __init__(self, polygons=(), cache_size=CACHE_SIZE, precision=PRECISION):
+        self.polygons = list(polygons)
+        self.labels = sorted({polygon.label for polygon in self.polygons})
+        self.precision = precision
+        self._cached = lru_cache(maxsize=cache_size)(self._lookup)
+        self._build_grid()
+
+    @classmethod
+    def from_geojson(cls, data, **options):
+        """Raises ValueError for malformed GeoJSON"""
+        polygons = []
+        skipped = 0
+        try:
+            for feature in data["features"]:
+                label = _feature_label(feature.get("properties") or {})
+                geometry = feature.get("geometry")
+                if label is None or not geometry:
+                    skipped += 1
+                    continue
+                polygons.extend(_feature_polygons(label, geometry))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid ward boundaries: {e}") from e
+        if skipped:
+            logger.warning("Ward features without a label or geometry skipped", extra={"skipped": skipped})
+        return cls(polygons, **options)
+
+    @classmethod
+    def load(cls, path=WARDS_PATH, **options):
+        """Index from a GeoJSON file; empty (resolves nothing) if it is missing"""
+        if not os.path.exists(path):
+            logger.warning("Ward boundary file not found; wards will not be resolved", extra={"path": str(path)})
+            return cls(**options)
+        with open(path, encoding="utf-8") as f:
+            index = cls.from_geojson(json.load(f), **options)
+        logger.info("Ward boundaries loaded", extra={"wards": len(index.labels), "polygons": len(index.polygons)})
+        return index
+
+    def _build_grid(self):
+        self._grid = {}
+        if not self.polygons:
+            return
+        self._min_lat = min(p.min_lat for p in self.polygons)
+        self._min_lng = min(p.min_lng for p in self.polygons)
+        max_lat = max(p.max_lat for p in self.polygons)
+        max_lng = max(p.max_lng for p in self.polygons)
+        side = max(1, math.ceil(math.sqrt(len(self.polygons) * GRID_CELLS_PER_POLYGON)))
+        self._rows = self._cols = side
+        self._cell_lat = (max_lat - self._min_lat) / side or 1.0
+        self._cell_lng = (max_lng - self._min_lng) / side or 1.0
+        for index, polygon in enumerate(self.polygons):
+            row_low, col_low = self._cell(polygon.min_lat, polygon.min_lng)
+            row_high, col_high = self._cell(polygon.max_lat, polygon.max_lng)
+            for row in range(row_low, row_high + 1):
+                for col in range(col_low, col_high + 1):
+                    self._grid.setdefault((row, col), []).append(index)
+        self._grid = {cell: tuple(indices) for cell, indices in self._grid.items()}
+
+    def _cell(self, lat, lng):
+        row = min(self._rows - 1, max(0, int((lat - self._min_lat) / self._cell_lat)))
+        col = min(self._cols - 1, max(0, int((lng - self._min_lng) / self._cell_lng)))
+        return row, col
+
+    def _lookup(self, lat, lng):
+        for index in self._grid.get(self._cell(lat, lng), ()):
+            polygon = self.polygons[index]
+            if polygon.contains(lat, lng):
+                return polygon.label
+        return None
+
+    def resolve(self, lat, lng):
+        """Ward label containing (lat, lng), or None"""
+        if lat is None or lng is None or not self._grid:
+            return None
+        return self._cached(round(float(lat), self.precision), round(float(lng), self.precision))
+
+    def resolve_many(self, points):
+        """Ward labels for an iterable of (lat, lng) pairs"""
+        return [self.resolve(lat, lng) for lat, lng in points]
+
+    def cache_info(self):
+        return self._cached.cache_info()
+
+
+WARDS = WardIndex.load()
+
+
+# ========================================
+# BACKFILL
+# ========================================
+
+def backfill_wards(session_factory=None, index=WARDS, chunk_size=BACKFILL_CHUNK_SIZE, overwrite=False):
+    """
+    Resolves the ward of stored complaints that have coordinates (only those
+    with no ward unless `overwrite`), in id-ordered chunks committed one at a
+    time, then rebuilds the open-complaint statistics. Returns a Counter.
+    """
+    from sqlalchemy import select, update
+
+    from database import SessionLocal
+    from models import Complaint
+    from stats import rebuild as rebuild_stats
+
+    session_factory = session_factory or SessionLocal
+    start = time.perf_counter()
+    totals = Counter()
+    last_id = 0
+    while True:
+        query = (
+            select(Complaint.id, Complaint.latitude, Complaint.longitude, Complaint.ward)
+            .where(Complaint.id > last_id,
+                   Complaint.latitude.is_not(None), Complaint.longitude.is_not(None))
+            .order_by(Complaint.id)
+            .limit(chunk_size)
+        )
+        if not overwrite:
+            query = query.where(Complaint.ward.is_(None))
+        session = session_factory()
+        try:
+            rows = session.execute(query).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            wards = index.resolve_many((row.latitude, row.longitude) for row in rows)
+            updates = [{"id": row.id, "ward": ward} for row, ward in zip(rows, wards) if ward != row.ward]
+            if updates:
+                session.execute(update(Complaint), updates)
+                session.commit()
+        finally:
+            session.close()
+        totals["scanned"] += len(rows)
+        totals["updated"] += len(updates)
+        totals["unresolved"] += wards.count(None)
+
+    if totals["updated"]:
+        rebuild_stats(session_factory)
+    elapsed = time.perf_counter() - start
+    METRICS.observe("civic_stage_seconds", elapsed, stage="ward_backfill")
+    logger.info("Ward backfill finished", extra={"seconds": round(elapsed, 2), **totals})
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ward boundary maintenance")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    backfill_parser = subcommands.add_parser("backfill", help="resolve wards for stored complaints")
+    backfill_parser.add_argument("--all", action="store_true", help="re-resolve complaints that already have a ward")
+    backfill_parser.add_argument("--chunk-size", type=int, default=BACKFILL_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    from observability import configure_logging
+    configure_logging()
+    if args.command == "backfill":
+        totals = backfill_wards(chunk_size=args.chunk_size, overwrite=args.all)
+        print(f"Scanned {totals['scanned']}, updated {totals['updated']}, "
+              f"outside every ward {totals['unresolved']}")
+
+
+if __name__ == "__main__":
+    main()